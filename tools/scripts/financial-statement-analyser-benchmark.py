@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+
+"""
+financial-statement-analyser-benchmark.py
+
+Benchmark harness for financial-statement-analyser.py.
+
+Generates synthetic Lloyds-format statements together with a matching
+control file, rules file and data file, then times each stage of the
+analyser separately on them:
+
+    * load_control    - load the control file and compile the rules
+    * parse           - read every statement CSV
+    * verify          - transaction type, order, tax year and balance checks
+    * analyse         - analyse_transactions on each statement
+    * merge           - merge_analysis_results over the statements
+    * facet_summary   - the --facet-report summary (all owners)
+    * monthly_totals  - monthly totals over the merged table
+
+Each (transactions, rules) combination is one dataset; every stage is
+run --repeat times and the individual, minimum and median wall times are
+written to a JSON results file, together with the git revision of the
+analyser, so that runs from different revisions can be compared with
+--compare.
+
+Command-line options:
+
+  --transactions N [N ...]
+        Total transactions per dataset (split across the statements).
+        Default: 1000 10000 100000
+
+  --rules N [N ...]
+        Number of rules per dataset.
+        Default: 10 100 1000
+
+  --statements N
+        Number of statements (CSV files) per dataset; each covers its own
+        tax year.
+        Default: 4
+
+  --repeat N
+        Number of timed runs of each stage.
+        Default: 3
+
+  --seed N
+        Random seed for the synthetic data.
+        Default: 1
+
+  --engine {python,vectorised}
+        Analysis backend to benchmark (see financial-statement-analyser.py).
+        Default: python
+
+  --fixed-point / --no-fixed-point
+        Benchmark the integer-pence aggregation path.
+        Default: --no-fixed-point
+
+  --analyser PATH
+        The financial-statement-analyser.py to benchmark.
+        Default: the one next to this script
+
+  --work-dir DIR
+        Where the synthetic datasets are written. Datasets already present
+        there are reused. Without this option a temporary directory is
+        used and removed afterwards.
+
+  --generate-only
+        Write the synthetic datasets (requires --work-dir) and exit.
+
+  --output FILE
+        Write the JSON results to FILE.
+        Default: benchmark-results.json
+
+  --compare FILE
+        Compare the median stage times with an earlier results file.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import yaml
+
+
+RESULTS_FORMAT_VERSION = 1
+
+STAGES = (
+    "load_control",
+    "parse",
+    "verify",
+    "analyse",
+    "merge",
+    "facet_summary",
+    "monthly_totals",
+)
+
+CSV_HEADER = (
+    "Transaction Date,Transaction Type,Sort Code,Account Number,"
+    "Transaction Description,Debit Amount,Credit Amount,Balance\n"
+)
+
+# Transaction types by direction; TFR may go either way
+CREDIT_TYPES = ("BGC", "FPI")
+DEBIT_TYPES = ("DEB", "DD", "FPO", "CPT", "SO")
+EITHER_TYPES = ("TFR",)
+
+CATEGORIES = {
+    "uncategorised": "IHT_UNKNOWN",
+    "groceries": "IHT_EXP",
+    "utilities": "IHT_EXP",
+    "household": "IHT_EXP",
+    "travel": "IHT_EXP",
+    "income": "IHT_INC",
+    "gifts": "IHT_GIFT",
+    "transfers": "IHT_XFER",
+}
+
+FACET_CODES = ("IHT_EXP", "IHT_INC", "IHT_GIFT", "IHT_UNKNOWN", "IHT_XFER")
+
+FIRST_TAX_YEAR = 2000
+
+
+# ------------------------------------------------------------
+# Synthetic data
+# ------------------------------------------------------------
+
+def merchant_name(index):
+    return f"MERCHANT {index:05d}"
+
+def format_pence(pence):
+    """Format pence as a Lloyds amount string."""
+    sign = "-" if pence < 0 else ""
+    pence = abs(pence)
+    return f"{sign}{pence // 100}.{pence % 100:02d}"
+
+def generate_rules(rule_count, rng):
+    """
+    Return a list of rule dicts, one per merchant, cycling through the
+    match and "when" forms the analyser supports.
+    """
+    categories = [c for c in CATEGORIES if c != "uncategorised"]
+    rules = []
+
+    for index in range(rule_count):
+        merchant = merchant_name(index)
+        form = index % 6
+        rule = {
+            "id": f"rule-{index:05d}",
+            "priority": rng.randint(1, 100),
+        }
+
+        if form == 0:
+            rule["match"] = {"description": merchant}
+        elif form == 1:
+            rule["match"] = {"prefix": merchant}
+        elif form == 2:
+            rule["match"] = {"prefix": merchant}
+            rule["when"] = [{"amount_range": [1, 250]}]
+        elif form == 3:
+            rule["match"] = [{"description": merchant}, {"prefix": f"{merchant} REF"}]
+            rule["expect"] = {"transaction_types": list(DEBIT_TYPES)}
+        elif form == 4:
+            rule["match"] = {"prefix": merchant}
+            rule["when"] = [{"tax_year": f"{FIRST_TAX_YEAR}-{FIRST_TAX_YEAR + 1}"}]
+        else:
+            rule["match"] = merchant
+            rule["expect"] = {"direction": "debit"}
+
+        rule["classify"] = {"category": categories[index % len(categories)]}
+
+        if index % 7 == 0:
+            rule["classify"]["facets"] = [FACET_CODES[index % len(FACET_CODES)]]
+        if index % 5 == 0:
+            rule["ownership"] = {"ALICE": 100}
+        elif index % 11 == 0:
+            rule["ownership"] = {"ALICE": 30, "BOB": 70}
+
+        rules.append(rule)
+
+    return rules
+
+def generate_control(rules_filename):
+    return {
+        "version": 1,
+        "defaults": {
+            "category": "uncategorised",
+            "ownership": {"ALICE": 50, "BOB": 50},
+        },
+        "people": {
+            "ALICE": {"full_name": "Alice Example"},
+            "BOB": {"full_name": "Bob Example"},
+        },
+        "categories": {
+            category: {"description": category.title(), "default_facets": [facet]}
+            for category, facet in CATEGORIES.items()
+        },
+        "facets": {
+            "IHT": {
+                "description": "IHT403 gifts out of income",
+                "codes": [{"code": code, "description": code} for code in FACET_CODES],
+            },
+        },
+        "statement_handling": [
+            {"type": "bank-lloyds", "rules_file": rules_filename},
+        ],
+        "rules": [],
+    }
+
+def write_statement(filename, tax_year, transaction_count, rule_count, rng):
+    """
+    Write a Lloyds CSV covering one tax year, newest transaction first,
+    with consistent running balances. About a fifth of the descriptions
+    name a merchant that has no rule.
+    """
+    start = date(tax_year, 4, 6)
+    days = (date(tax_year + 1, 4, 5) - start).days
+    merchant_count = max(1, rule_count + rule_count // 4)
+    balance = 1_000_000_00
+
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        f.write(CSV_HEADER)
+
+        # Walk backwards from the closing balance so rows can be written
+        # newest first without holding the statement in memory
+        for index in reversed(range(transaction_count)):
+            if transaction_count > 1:
+                day = start + timedelta(days=index * days // (transaction_count - 1))
+            else:
+                day = start
+
+            merchant = rng.randrange(merchant_count)
+            description = merchant_name(merchant)
+            if rng.random() < 0.5:
+                description += f" REF {rng.randrange(10000):04d}"
+
+            tx_type = rng.choice(CREDIT_TYPES + DEBIT_TYPES + EITHER_TYPES)
+            amount = rng.randint(1, 50000)
+            if tx_type in CREDIT_TYPES or (tx_type in EITHER_TYPES and rng.random() < 0.5):
+                debit, credit = "", format_pence(amount)
+                change = amount
+            else:
+                debit, credit = format_pence(amount), ""
+                change = -amount
+
+            f.write(
+                f"{day.strftime('%d/%m/%Y')},{tx_type},'30-00-00,12345678,"
+                f"{description},{debit},{credit},{format_pence(balance)}\n"
+            )
+            balance -= change
+
+def generate_dataset(directory, transaction_count, rule_count, statement_count, seed):
+    """
+    Write a dataset (control, rules, data file and statements) into
+    directory, unless a complete one is already there.
+    Returns the path of the data file.
+    """
+    data_file = os.path.join(directory, "data.yaml")
+    if os.path.isfile(data_file):
+        return data_file
+
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+
+    with open(os.path.join(directory, "rules.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump({"rules": generate_rules(rule_count, rng)}, f, sort_keys=False)
+
+    with open(os.path.join(directory, "control.yaml"), "w", encoding="utf-8") as f:
+        yaml.safe_dump(generate_control("rules.yaml"), f, sort_keys=False)
+
+    tax_years = []
+    for index in range(statement_count):
+        tax_year = FIRST_TAX_YEAR + index
+        count = transaction_count // statement_count
+        if index < transaction_count % statement_count:
+            count += 1
+        filename = f"statement-{tax_year}.csv"
+        write_statement(os.path.join(directory, filename), tax_year, count, rule_count, rng)
+        tax_years.append({
+            "year": f"{tax_year}-{tax_year + 1}",
+            "statements": [{"type": "bank-lloyds", "file": filename}],
+        })
+
+    # Written last: its presence marks the dataset as complete
+    with open(data_file, "w", encoding="utf-8") as f:
+        yaml.safe_dump({"control_file": "control.yaml", "tax_years": tax_years}, f, sort_keys=False)
+
+    return data_file
+
+def dataset_directory(work_dir, transaction_count, rule_count, statement_count, seed):
+    return os.path.join(
+        work_dir,
+        f"tx{transaction_count}-rules{rule_count}-stmts{statement_count}-seed{seed}",
+    )
+
+
+# ------------------------------------------------------------
+# Timing
+# ------------------------------------------------------------
+
+def load_analyser(path):
+    """Import financial-statement-analyser.py (its name is not a valid module name)."""
+    # Its helper modules (financial_statement_config) are imported from beside it
+    sys.path.insert(0, os.path.dirname(os.path.abspath(path)))
+    spec = importlib.util.spec_from_file_location("financial_statement_analyser", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def git_revision(path):
+    """Return (commit, dirty) for the checkout containing path, or (None, None)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=directory, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--", os.path.abspath(path)],
+            cwd=directory, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, bool(status)
+
+def run_stages(fsa, data_file, engine, fixed_point):
+    """
+    Run every stage once over a dataset.
+    Returns ({stage: seconds}, counts).
+    """
+    timings = {}
+    stats = fsa.AnalysisResults()
+    sink = io.StringIO()
+
+    def timed(stage, func):
+        with contextlib.redirect_stdout(sink):
+            started = time.perf_counter()
+            value = func()
+            timings[stage] = time.perf_counter() - started
+        return value
+
+    control_path, tax_years, _ = fsa.load_data_file(data_file)
+    statement_files = [
+        stmt["file"] for ty in tax_years for stmt in ty.get("statements", [])
+    ]
+
+    def load_control():
+        fsa._compiled_rules_cache.clear()
+        control = fsa.load_control_file(control_path)
+        return control, fsa.get_rules_for_type("bank-lloyds", control)
+
+    def verify(statements):
+        for transactions in statements:
+            fsa.validate_transaction_types(transactions, False, stats)
+            fsa.verify_reverse_chronological_order(transactions, False, stats)
+            fsa.verify_tax_year(transactions, False, stats)
+            fsa.verify_balances(transactions, False, stats)
+
+    def merge(results):
+        merged = None
+        for result in results:
+            merged = fsa.merge_analysis_results(merged, result)
+        return merged
+
+    if engine == "vectorised":
+        monthly_totals = fsa.calculate_table_monthly_totals_vectorised
+    else:
+        monthly_totals = fsa.calculate_table_monthly_totals
+
+    control, rules = timed("load_control", load_control)
+    statements = timed("parse", lambda: [fsa.read_statement_lloyds(f) for f in statement_files])
+    timed("verify", lambda: verify(statements))
+    results = timed("analyse", lambda: [
+        fsa.analyse_with_engine(engine, transactions, control, rules, fixed_point)
+        for transactions in statements
+    ])
+    merged = timed("merge", lambda: merge(results))
+    timed("facet_summary", lambda: fsa.print_facet_summary(
+        merged, "IHT", control.facet_definitions, control, True, engine, fixed_point
+    ))
+    timed("monthly_totals", lambda: monthly_totals(merged.table))
+
+    counts = {
+        "transactions": len(merged.table),
+        "rules": len(rules),
+        "statements": len(statement_files),
+        "uncategorised": len(merged.uncategorised_rows()),
+        "warnings": stats.warning_count,
+        "errors": stats.error_count,
+    }
+    return timings, counts
+
+def benchmark_dataset(fsa, data_file, repeat, engine, fixed_point):
+    runs = {stage: [] for stage in STAGES}
+    counts = None
+
+    for _ in range(repeat):
+        timings, counts = run_stages(fsa, data_file, engine, fixed_point)
+        for stage in STAGES:
+            runs[stage].append(timings[stage])
+
+    stages = {
+        stage: {
+            "runs": times,
+            "min": min(times),
+            "median": statistics.median(times),
+        }
+        for stage, times in runs.items()
+    }
+    return stages, counts
+
+
+# ------------------------------------------------------------
+# Reporting
+# ------------------------------------------------------------
+
+def dataset_key(entry):
+    return (entry["transactions"], entry["rules"], entry["statements"])
+
+def print_dataset(entry):
+    print()
+    print(
+        f"{entry['transactions']:,} transactions, {entry['rules']:,} rules, "
+        f"{entry['statements']} statements "
+        f"({entry['counts']['uncategorised']:,} uncategorised)"
+    )
+    for stage in STAGES:
+        timing = entry["stages"][stage]
+        print(f"  {stage:<16} median {timing['median']:>10.4f}s   min {timing['min']:>10.4f}s")
+
+def print_comparison(baseline, results):
+    """Print median stage times of results against a baseline results file."""
+    baseline_entries = {dataset_key(entry): entry for entry in baseline["results"]}
+
+    print()
+    print("============================================================")
+    print(f"COMPARISON WITH {baseline.get('git_revision') or 'baseline'}")
+    print("============================================================")
+
+    for entry in results["results"]:
+        old = baseline_entries.get(dataset_key(entry))
+        if old is None:
+            continue
+
+        print()
+        print(f"{entry['transactions']:,} transactions, {entry['rules']:,} rules, {entry['statements']} statements")
+        for stage in STAGES:
+            if stage not in old["stages"]:
+                continue
+            before = old["stages"][stage]["median"]
+            after = entry["stages"][stage]["median"]
+            ratio = after / before if before else float("inf")
+            print(f"  {stage:<16} {before:>10.4f}s -> {after:>10.4f}s   x{ratio:.2f}")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--transactions",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+        help="Total transactions per dataset. Default: 1000 10000 100000",
+    )
+
+    parser.add_argument(
+        "--rules",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000],
+        help="Number of rules per dataset. Default: 10 100 1000",
+    )
+
+    parser.add_argument(
+        "--statements",
+        type=int,
+        default=4,
+        help="Statements per dataset. Default: 4",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timed runs of each stage. Default: 3",
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=1,
+        help="Random seed for the synthetic data. Default: 1",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=("python", "vectorised"),
+        default="python",
+        help="Analysis backend to benchmark. Default: python",
+    )
+
+    parser.add_argument(
+        "--fixed-point",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Benchmark the integer-pence aggregation path",
+    )
+
+    parser.add_argument(
+        "--analyser",
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "financial-statement-analyser.py"),
+        help="Path to the financial-statement-analyser.py to benchmark",
+    )
+
+    parser.add_argument(
+        "--work-dir",
+        help="Directory for the synthetic datasets (reused between runs)",
+    )
+
+    parser.add_argument(
+        "--generate-only",
+        action="store_true",
+        help="Write the synthetic datasets and exit (requires --work-dir)",
+    )
+
+    parser.add_argument(
+        "--output",
+        default="benchmark-results.json",
+        help="JSON results file. Default: benchmark-results.json",
+    )
+
+    parser.add_argument(
+        "--compare",
+        help="Earlier JSON results file to compare against",
+    )
+
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    if args.statements < 1 or args.repeat < 1:
+        print("ERROR: --statements and --repeat must be at least 1.")
+        return 1
+    if min(args.transactions) < args.statements:
+        print("ERROR: every dataset needs at least one transaction per statement.")
+        return 1
+    if min(args.rules) < 1:
+        print("ERROR: --rules must be at least 1.")
+        return 1
+    if args.generate_only and not args.work_dir:
+        print("ERROR: --generate-only requires --work-dir.")
+        return 1
+    if not os.path.isfile(args.analyser):
+        print(f"ERROR: analyser not found: {args.analyser}")
+        return 1
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: cannot read {args.compare}: {e}")
+            return 1
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="fsa-benchmark-")
+
+    try:
+        datasets = []
+        for transaction_count in args.transactions:
+            for rule_count in args.rules:
+                directory = dataset_directory(work_dir, transaction_count, rule_count, args.statements, args.seed)
+                print(f"Generating {directory}")
+                data_file = generate_dataset(directory, transaction_count, rule_count, args.statements, args.seed)
+                datasets.append((transaction_count, rule_count, data_file))
+
+        if args.generate_only:
+            return 0
+
+        fsa = load_analyser(args.analyser)
+        if args.engine == "vectorised":
+            try:
+                fsa.import_numpy()
+            except RuntimeError as e:
+                print(f"ERROR: {e}")
+                return 1
+
+        commit, dirty = git_revision(args.analyser)
+        results = {
+            "format_version": RESULTS_FORMAT_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "analyser": os.path.abspath(args.analyser),
+            "git_revision": commit,
+            "git_dirty": dirty,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": args.engine,
+            "fixed_point": args.fixed_point,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "results": [],
+        }
+
+        for transaction_count, rule_count, data_file in datasets:
+            stages, counts = benchmark_dataset(fsa, data_file, args.repeat, args.engine, args.fixed_point)
+            entry = {
+                "transactions": transaction_count,
+                "rules": rule_count,
+                "statements": args.statements,
+                "counts": counts,
+                "stages": stages,
+            }
+            results["results"].append(entry)
+            print_dataset(entry)
+
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print()
+        print(f"Results written to {args.output}")
+
+        if baseline is not None:
+            print_comparison(baseline, results)
+
+        return 0
+
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+"""
+financial-statement-analyser-rule-overlap-checker.py
+
+Static overlap and conflict analysis of the rules files used by
+financial-statement-analyser.py. No statement is read: the rules alone
+decide which of them can match the same transactions.
+
+The analyser takes the first matching rule in priority order (file order
+among equal priorities). A transaction can be matched by two rules only
+if all of the following can hold at once:
+
+- Descriptions: an exact description equals the other rule's, starts
+  with its prefix or contains its contains value; two prefixes overlap
+  if one is a prefix of the other; a contains value overlaps any prefix
+  or contains value. A regex is assumed to overlap anything (and to
+  cover nothing)
+- expect.transaction_types: the two sets share a type (no list = any)
+- expect.direction: the same, or at least one rule has none
+- when: some group of one rule and some group of the other can both
+  hold. amount_range/amount_exact and date_range/tax_year are compared
+  as intervals, line_numbers as sets. Other condition types are assumed
+  to overlap anything (and to cover nothing)
+
+For each rules file it reports:
+
+- Unreachable rules: rules that can never be chosen, either because
+  their own conditions can never hold (an empty range, an empty 'when'
+  list) or because every description, transaction type, direction and
+  'when' group they accept is already taken by earlier rules
+- Ambiguous priority ties: overlapping rules with the same priority,
+  where only file order decides which is chosen. Ties between rules that
+  classify identically (category, facets, ownership) are marked as such
+- Overlapping rules (unless --no-overlaps): every other pair of rules
+  that can match the same transactions, higher priority first
+
+Unreachable rules are left out of the ties and overlaps.
+
+Command-line options:
+
+  RULES_FILE ...
+        Rules files to analyse.
+
+  --control-file FILE
+        Also analyse every rules file named in FILE's statement_handling,
+        with category, facet and person references checked against FILE.
+
+  --overlaps / --no-overlaps
+        List overlapping rules that are not tied.
+        Default: True
+
+  --strict
+        Exit with status 1 if any unreachable rule or ambiguous priority
+        tie (between rules that classify differently) is found.
+
+  --config-cache / --no-config-cache
+        Reuse parsed files from the analyser's parsed-config cache.
+        Default: True
+
+Exit status is 1 if a file cannot be loaded or has errors (which are
+listed as the control file checker would), or with --strict as above.
+"""
+
+import argparse
+import sys
+
+from dataclasses import dataclass
+from decimal import Decimal
+
+from financial_statement_config import set_cache_dir
+from financial_statement_rules import (
+    load_control,
+    load_rules,
+    parse_date,
+    parse_tax_year,
+    rule_context,
+    to_decimal,
+)
+
+
+# ----------------------------------------------------------------------
+# Match conditions
+# ----------------------------------------------------------------------
+
+def describe_condition(cond):
+    return f"{cond.type} '{cond.value}'"
+
+def conditions_overlap(a, b):
+    """
+    Return a description of the transaction descriptions matched by both
+    conditions, or None if no description matches both.
+    """
+    if a.type == "description" and b.type == "description":
+        return f"description '{a.value}'" if a.value == b.value else None
+    if a.type == "description" and b.type == "prefix":
+        return f"description '{a.value}'" if a.value.startswith(b.value) else None
+    if a.type == "prefix" and b.type == "description":
+        return f"description '{b.value}'" if b.value.startswith(a.value) else None
+    if a.type == "prefix" and b.type == "prefix":
+        if a.value.startswith(b.value):
+            return f"prefix '{a.value}'"
+        if b.value.startswith(a.value):
+            return f"prefix '{b.value}'"
+        return None
+    if b.type == "contains" and a.type != "contains":
+        a, b = b, a
+    if a.type == "contains" and b.type == "description":
+        return f"description '{b.value}'" if a.value in b.value else None
+    if a.type == "contains" and b.type == "prefix":
+        if a.value in b.value:
+            return f"prefix '{b.value}'"
+        return f"prefix '{b.value}' containing '{a.value}'"
+    if a.type == "contains" and b.type == "contains":
+        if a.value in b.value:
+            return f"contains '{b.value}'"
+        if b.value in a.value:
+            return f"contains '{a.value}'"
+        return f"descriptions containing '{a.value}' and '{b.value}'"
+    # A match type this analysis does not model: assume it may overlap
+    return f"descriptions matching both {describe_condition(a)} and {describe_condition(b)}"
+
+def condition_covers(a, b):
+    """True if every description matched by condition b is matched by condition a."""
+    if a.type == "prefix" and b.type in ("description", "prefix"):
+        return b.value.startswith(a.value)
+    if a.type == "description" and b.type == "description":
+        return a.value == b.value
+    if a.type == "contains" and b.type in ("description", "prefix", "contains"):
+        return a.value in b.value
+    return False
+
+class ConditionIndex:
+    """
+    Character trie over description and prefix values, to find the
+    conditions that can overlap or cover a given one without comparing
+    every pair. Conditions of other match types (contains) are kept aside
+    and compared with every condition.
+    """
+
+    _ENTRIES = "\0entries"    # node key holding (position, condition) pairs
+
+    def __init__(self):
+        self.trie = {}
+        self.others = []
+
+    def add(self, position, cond):
+        if cond.type not in ("description", "prefix"):
+            self.others.append((position, cond))
+            return
+        node = self.trie
+        for char in cond.value:
+            node = node.setdefault(char, {})
+        node.setdefault(self._ENTRIES, []).append((position, cond))
+
+    def covering(self, cond):
+        """Return (position, condition) for indexed conditions that cover cond."""
+        found = [(position, other) for position, other in self.others if condition_covers(other, cond)]
+        if cond.type not in ("description", "prefix"):
+            return found
+        node = self.trie
+        for char in cond.value:
+            node = node.get(char)
+            if node is None:
+                return found
+            found.extend(
+                (position, other) for position, other in node.get(self._ENTRIES, ())
+                if condition_covers(other, cond)
+            )
+        return found
+
+    def overlapping(self, cond):
+        """Return (position, condition) for indexed conditions that may overlap cond."""
+        found = [
+            (position, other) for position, other in self.others
+            if conditions_overlap(other, cond) is not None
+        ]
+        if cond.type not in ("description", "prefix"):
+            # Compare with everything
+            stack = [self.trie]
+            while stack:
+                node = stack.pop()
+                for key, child in node.items():
+                    if key == self._ENTRIES:
+                        found.extend(
+                            (position, other) for position, other in child
+                            if conditions_overlap(other, cond) is not None
+                        )
+                    else:
+                        stack.append(child)
+            return found
+
+        node = self.trie
+        for char in cond.value:
+            node = node.get(char)
+            if node is None:
+                return found
+            found.extend(
+                (position, other) for position, other in node.get(self._ENTRIES, ())
+                if conditions_overlap(other, cond) is not None
+            )
+
+        # Longer values under a prefix all start with it
+        if cond.type == "prefix":
+            stack = [child for key, child in node.items() if key != self._ENTRIES]
+            while stack:
+                child = stack.pop()
+                for key, grandchild in child.items():
+                    if key == self._ENTRIES:
+                        found.extend(grandchild)
+                    else:
+                        stack.append(grandchild)
+        return found
+
+
+# ----------------------------------------------------------------------
+# "when" groups
+# ----------------------------------------------------------------------
+
+@dataclass
+class WhenGroup:
+    """
+    The transactions one "when" group (or a rule without "when") admits.
+    None means unconstrained; an interval is (low, high), inclusive.
+    """
+    number: int | None                     # 1-based group number, None without "when"
+    amount: tuple[Decimal, Decimal] | None = None
+    dates: tuple | None = None
+    line_numbers: frozenset | None = None
+    other: tuple = ()                       # (type, repr(value)) of unmodelled conditions
+    empty: bool = False                     # can never hold
+
+def intersect_interval(current, low, high):
+    if current is None:
+        return low, high
+    return max(current[0], low), min(current[1], high)
+
+def compile_when_group(number, group):
+    """Build a WhenGroup from one validated "when" group."""
+    result = WhenGroup(number=number)
+    other = []
+    for cond_type, value in group.items():
+        if cond_type == "amount_range":
+            low, high = (to_decimal(v) for v in value)
+            result.amount = intersect_interval(result.amount, low, high)
+        elif cond_type == "amount_exact":
+            amount = to_decimal(value)
+            result.amount = intersect_interval(result.amount, amount, amount)
+        elif cond_type == "date_range":
+            start, end = (parse_date(v) for v in value)
+            result.dates = intersect_interval(result.dates, start, end)
+        elif cond_type == "tax_year":
+            start, end = parse_tax_year(value)
+            result.dates = intersect_interval(result.dates, start, end)
+        elif cond_type == "line_numbers":
+            lines = frozenset(value)
+            result.line_numbers = lines if result.line_numbers is None else result.line_numbers & lines
+        else:
+            other.append((cond_type, repr(value)))
+    result.other = tuple(sorted(other))
+    result.empty = (
+        (result.amount is not None and result.amount[0] > result.amount[1])
+        or (result.dates is not None and result.dates[0] > result.dates[1])
+        or (result.line_numbers is not None and not result.line_numbers)
+    )
+    return result
+
+def rule_when_groups(rule):
+    """Return the WhenGroups of a rule; a rule without "when" has one unconstrained group."""
+    if rule.when is None:
+        return [WhenGroup(number=None)]
+    return [compile_when_group(number, group) for number, group in enumerate(rule.when, start=1)]
+
+def intervals_overlap(a, b):
+    return a is None or b is None or (a[0] <= b[1] and b[0] <= a[1])
+
+def interval_covers(a, b):
+    return a is None or (b is not None and a[0] <= b[0] and b[1] <= a[1])
+
+def groups_overlap(a, b):
+    if a.empty or b.empty:
+        return False
+    if not intervals_overlap(a.amount, b.amount) or not intervals_overlap(a.dates, b.dates):
+        return False
+    if a.line_numbers is not None and b.line_numbers is not None:
+        return bool(a.line_numbers & b.line_numbers)
+    return True
+
+def group_covers(a, b):
+    """True if every transaction admitted by group b is admitted by group a."""
+    if b.empty:
+        return True
+    if a.empty:
+        return False
+    if not interval_covers(a.amount, b.amount) or not interval_covers(a.dates, b.dates):
+        return False
+    if a.line_numbers is not None and (b.line_numbers is None or not b.line_numbers <= a.line_numbers):
+        return False
+    return set(a.other) <= set(b.other)
+
+
+# ----------------------------------------------------------------------
+# Rules
+# ----------------------------------------------------------------------
+
+@dataclass
+class RuleSpace:
+    """A rule together with its "when" groups, at its position in priority order."""
+    position: int
+    rule: object
+    groups: list[WhenGroup]
+
+    @property
+    def live_groups(self):
+        return [group for group in self.groups if not group.empty]
+
+def describe_rule(space):
+    return f"ID: '{space.rule.id}' (priority {space.rule.priority})"
+
+def describe_group(group):
+    return "" if group.number is None else f" when group #{group.number}"
+
+def constraints_overlap(a, b):
+    """True if transaction type and direction constraints of two rules can both hold."""
+    if a.transaction_types is not None and b.transaction_types is not None:
+        if not a.transaction_types & b.transaction_types:
+            return False
+    return a.direction is None or b.direction is None or a.direction == b.direction
+
+def constraints_cover(a, b):
+    """True if rule a's transaction type and direction constraints admit all that rule b's do."""
+    if a.transaction_types is not None:
+        if b.transaction_types is None or not b.transaction_types <= a.transaction_types:
+            return False
+    return a.direction is None or a.direction == b.direction
+
+def same_classification(a, b):
+    return (a.category, a.facets, a.ownership) == (b.category, b.facets, b.ownership)
+
+@dataclass
+class Overlap:
+    first: RuleSpace        # chosen when both match
+    second: RuleSpace
+    descriptions: str
+
+@dataclass
+class Unreachable:
+    space: RuleSpace
+    reason: str
+    taken_by: list[str]     # one line per (condition, group) taken by an earlier rule
+
+@dataclass
+class OverlapReport:
+    rules: list[RuleSpace]
+    unreachable: list[Unreachable]
+    ties: list[Overlap]
+    overlaps: list[Overlap]
+
+def own_conflict(space):
+    """Return why a rule can never match on its own, or None."""
+    rule = space.rule
+    if not rule.conditions:
+        return "its 'match' list is empty"
+    if rule.when is not None and not rule.when:
+        return "its 'when' list is empty"
+    if not space.live_groups:
+        return "none of its 'when' groups can hold (an empty range or line_numbers list)"
+    return None
+
+def find_covering(space, cond, group, index, spaces):
+    """Return an earlier rule that takes every transaction of (cond, group), or None."""
+    for position, other_cond in sorted(index.covering(cond), key=lambda entry: entry[0]):
+        if position >= space.position:
+            break
+        other = spaces[position]
+        if not constraints_cover(other.rule, space.rule):
+            continue
+        for other_group in other.live_groups:
+            if group_covers(other_group, group):
+                return other, other_cond, other_group
+    return None
+
+def find_taken_by(space, index, spaces):
+    """
+    If earlier rules take every (match condition, "when" group) of a rule,
+    return one line per pair saying which; otherwise return None.
+    """
+    taken_by = []
+    for cond in space.rule.conditions:
+        for group in space.live_groups:
+            cover = find_covering(space, cond, group, index, spaces)
+            if cover is None:
+                return None
+            other, other_cond, other_group = cover
+            taken_by.append(
+                f"{describe_condition(cond)}{describe_group(group)} by "
+                f"ID: '{other.rule.id}' (priority {other.rule.priority}, "
+                f"{describe_condition(other_cond)}{describe_group(other_group)})"
+            )
+    return taken_by
+
+def analyse_rules(rules):
+    """Analyse a priority-ordered rule list (as load_rules returns it)."""
+    spaces = [
+        RuleSpace(position=position, rule=rule, groups=rule_when_groups(rule))
+        for position, rule in enumerate(rules)
+    ]
+    index = ConditionIndex()
+    for space in spaces:
+        for cond in space.rule.conditions:
+            index.add(space.position, cond)
+
+    unreachable = []
+    for space in spaces:
+        reason = own_conflict(space)
+        if reason is not None:
+            unreachable.append(Unreachable(space=space, reason=reason, taken_by=[]))
+            continue
+
+        taken_by = find_taken_by(space, index, spaces)
+        if taken_by is not None:
+            unreachable.append(Unreachable(
+                space=space,
+                reason="earlier rules take every transaction it matches",
+                taken_by=taken_by,
+            ))
+
+    # Overlaps and ties only matter between rules that can be chosen
+    dead = {entry.space.position for entry in unreachable}
+    pairs = {}
+    for space in spaces:
+        if space.position in dead:
+            continue
+        for cond in space.rule.conditions:
+            for position, other_cond in index.overlapping(cond):
+                if position <= space.position or position in dead or (space.position, position) in pairs:
+                    continue
+                other = spaces[position]
+                if not constraints_overlap(space.rule, other.rule):
+                    continue
+                if not any(groups_overlap(a, b) for a in space.groups for b in other.groups):
+                    continue
+                descriptions = conditions_overlap(cond, other_cond)
+                pairs[(space.position, position)] = Overlap(
+                    first=space, second=other, descriptions=descriptions
+                )
+
+    ties = []
+    overlaps = []
+    for key in sorted(pairs):
+        overlap = pairs[key]
+        if overlap.first.rule.priority == overlap.second.rule.priority:
+            ties.append(overlap)
+        else:
+            overlaps.append(overlap)
+
+    return OverlapReport(rules=spaces, unreachable=unreachable, ties=ties, overlaps=overlaps)
+
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+def print_report(filename, report, show_overlaps):
+    """Print one rules file's report; returns the number of problems found."""
+    print()
+    print("============================================================")
+    print(f"RULE OVERLAPS: {filename} ({len(report.rules)} rules)")
+    print("============================================================")
+
+    print()
+    print(f"Unreachable rules: {len(report.unreachable)}")
+    for entry in report.unreachable:
+        print(f"  {describe_rule(entry.space)}: {entry.reason}")
+        for line in entry.taken_by:
+            print(f"      {line}")
+
+    conflicting_ties = 0
+    print()
+    print(f"Ambiguous priority ties: {len(report.ties)}")
+    for tie in report.ties:
+        note = ""
+        if same_classification(tie.first.rule, tie.second.rule):
+            note = " (same classification)"
+        else:
+            conflicting_ties += 1
+        print(
+            f"  ID: '{tie.first.rule.id}' and ID: '{tie.second.rule.id}' "
+            f"(priority {tie.first.rule.priority}) both match {tie.descriptions}; "
+            f"'{tie.first.rule.id}' is chosen by file order{note}"
+        )
+
+    if show_overlaps:
+        print()
+        print(f"Overlapping rules: {len(report.overlaps)}")
+        for overlap in report.overlaps:
+            print(
+                f"  {describe_rule(overlap.first)} before {describe_rule(overlap.second)}: "
+                f"{overlap.descriptions}"
+            )
+
+    return len(report.unreachable) + conflicting_ties
+
+def load_rules_files(args):
+    """
+    Load every rules file to analyse. Returns ([(filename, rules)], errors),
+    with errors as printable lines.
+    """
+    targets = {filename: None for filename in args.rules_files}
+    errors = []
+
+    if args.control_file:
+        control, control_errors, _ = load_control(args.control_file)
+        errors.extend(f"{args.control_file}: {err}" for err in control_errors)
+        if control is not None:
+            context = rule_context(control) if not control_errors else None
+            for filename in dict.fromkeys(control.statement_handling.values()):
+                targets.setdefault(filename, context)
+
+    loaded = []
+    for filename, context in targets.items():
+        rules, rules_errors, _ = load_rules(filename, context)
+        if rules_errors:
+            errors.extend(f"{filename}: {err}" for err in rules_errors)
+        else:
+            loaded.append((filename, rules))
+    return loaded, errors
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Find overlapping, tied and unreachable rules in financial-statement-analyser rules files"
+    )
+    parser.add_argument(
+        "rules_files",
+        nargs="*",
+        metavar="RULES_FILE",
+        help="Rules files to analyse"
+    )
+    parser.add_argument(
+        "--control-file",
+        help="Also analyse the rules files named in this control file's statement_handling"
+    )
+    parser.add_argument(
+        "--overlaps",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="List overlapping rules that are not tied (default: True)"
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="Exit with status 1 if unreachable rules or conflicting priority ties are found"
+    )
+    parser.add_argument(
+        "--config-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Reuse parsed files from the shared config cache when unchanged (default: True)"
+    )
+    args = parser.parse_args()
+
+    if not args.rules_files and not args.control_file:
+        parser.error("give at least one RULES_FILE or --control-file")
+
+    if not args.config_cache:
+        set_cache_dir(None)
+
+    loaded, errors = load_rules_files(args)
+
+    if errors:
+        print(f"\nERROR: Found {len(errors)} error(s):")
+        for err in errors:
+            print(f"  {err}")
+        print()
+
+    problems = 0
+    for filename, rules in loaded:
+        problems += print_report(filename, analyse_rules(rules), args.overlaps)
+
+    print()
+    if errors:
+        print(f"Analysis incomplete: {len(errors)} error(s).")
+        sys.exit(1)
+    if problems:
+        print(f"Found {problems} unreachable rule(s) or conflicting priority tie(s).")
+        sys.exit(1 if args.strict else 0)
+    print("No unreachable rules or conflicting priority ties.")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
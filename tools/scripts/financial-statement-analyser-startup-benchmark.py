@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+
+"""
+financial-statement-analyser-startup-benchmark.py
+
+Startup-time benchmark and regression guard for
+financial-statement-analyser.py.
+
+Runs the analyser under `python -X importtime` for a few short command
+lines, each on a small synthetic dataset written with the generator in
+financial-statement-analyser-benchmark.py:
+
+    * help              - --help
+    * statement_report  - --statement S --control-file C --print-report 1
+    * statement_analyse - --statement S --control-file C --analyse
+    * data_file_report  - --data-file D --print-report 1
+    * data_file_analyse - --data-file D --analyse
+
+Every command line is run once untimed, so that the parsed-config and
+statement caches (kept in the work directory, not in ~/.cache) are warm,
+and then --repeat times. Each run records the total import time (the sum
+of the "self" column of the -X importtime report), the wall time of the
+process and the modules it imported.
+
+The run fails (exit status 1) if:
+
+    * a command line imports a module that it should not need (see
+      SCENARIOS), e.g. sqlite3 for --help or yaml once the configs are
+      cached;
+    * the analyser exits with a non-zero status;
+    * a median import time is above --max-import-ms;
+    * with --compare, a median import time is more than --tolerance
+      percent above the same command line's in the earlier results file.
+
+Command-line options:
+
+  --repeat N
+        Number of timed runs of each command line.
+        Default: 5
+
+  --analyser PATH
+        The financial-statement-analyser.py to benchmark.
+        Default: the one next to this script
+
+  --python PATH
+        Python interpreter used to run the analyser.
+        Default: the one running this script
+
+  --work-dir DIR
+        Where the synthetic dataset and the caches are written. Without
+        this option a temporary directory is used and removed afterwards.
+
+  --output FILE
+        Write the JSON results to FILE.
+        Default: startup-results.json
+
+  --compare FILE
+        Compare the median import times with an earlier results file.
+
+  --tolerance PERCENT
+        With --compare, how much slower a median import time may be
+        before it counts as a regression.
+        Default: 25
+
+  --max-import-ms MS
+        Fail if any median import time is above MS milliseconds.
+        Default: no limit
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+RESULTS_FORMAT_VERSION = 1
+
+# Modules that the analyser imports only on the code paths that need them
+DEFERRED_EVERYWHERE = ("concurrent.futures", "json", "tracemalloc", "numpy")
+
+# (name, analyser arguments, modules that must not be imported)
+SCENARIOS = (
+    (
+        "help",
+        ["--help"],
+        DEFERRED_EVERYWHERE + ("yaml", "csv", "sqlite3", "pickle", "hashlib"),
+    ),
+    (
+        "statement_report",
+        ["--statement", "{statement}", "--control-file", "{control}", "--print-report", "1"],
+        DEFERRED_EVERYWHERE + ("yaml", "sqlite3", "pickle", "hashlib"),
+    ),
+    (
+        "statement_analyse",
+        ["--statement", "{statement}", "--control-file", "{control}", "--analyse"],
+        DEFERRED_EVERYWHERE + ("yaml", "sqlite3"),
+    ),
+    (
+        "data_file_report",
+        ["--data-file", "{data_file}", "--print-report", "1"],
+        DEFERRED_EVERYWHERE + ("yaml", "csv"),
+    ),
+    (
+        "data_file_analyse",
+        ["--data-file", "{data_file}", "--analyse"],
+        DEFERRED_EVERYWHERE + ("yaml", "csv"),
+    ),
+)
+
+DATASET_TRANSACTIONS = 200
+DATASET_RULES = 20
+DATASET_STATEMENTS = 2
+DATASET_SEED = 1
+
+
+# ------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------
+
+def load_script(path, name):
+    """Import a script whose file name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def parse_importtime(report):
+    """
+    Parse the stderr of `python -X importtime`.
+    Returns (total self time in microseconds, set of imported modules).
+    """
+    total = 0
+    modules = set()
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the column header
+        total += int(fields[0])
+        modules.add(fields[2].strip())
+    return total, modules
+
+def run_once(python, analyser, arguments, env):
+    """Run the analyser once; returns (exit status, import us, wall s, modules)."""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [python, "-X", "importtime", analyser, *arguments],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env,
+    )
+    wall = time.perf_counter() - start
+    import_us, modules = parse_importtime(completed.stderr)
+    return completed.returncode, import_us, wall, modules
+
+def benchmark_scenario(python, analyser, arguments, deferred, repeat, env):
+    """Warm up, then time one command line repeat times."""
+    run_once(python, analyser, arguments, env)
+
+    import_times = []
+    wall_times = []
+    statuses = set()
+    modules = set()
+    for _ in range(repeat):
+        status, import_us, wall, imported = run_once(python, analyser, arguments, env)
+        statuses.add(status)
+        import_times.append(import_us)
+        wall_times.append(wall)
+        modules |= imported
+
+    return {
+        "arguments": arguments,
+        "exit_status": max(statuses),
+        "import_us": import_times,
+        "median_import_us": statistics.median(import_times),
+        "min_import_us": min(import_times),
+        "wall_s": wall_times,
+        "median_wall_s": statistics.median(wall_times),
+        "module_count": len(modules),
+        "deferred_imported": sorted(set(deferred) & modules),
+    }
+
+
+# ------------------------------------------------------------
+# Reporting
+# ------------------------------------------------------------
+
+def print_scenario(name, entry):
+    print(
+        f"  {name:<18} import median {entry['median_import_us'] / 1000:>7.1f}ms"
+        f"   min {entry['min_import_us'] / 1000:>7.1f}ms"
+        f"   wall median {entry['median_wall_s'] * 1000:>7.1f}ms"
+        f"   {entry['module_count']} modules"
+    )
+
+def check_results(results, baseline, tolerance, max_import_ms):
+    """Print every failed check; returns the number of failures."""
+    failures = 0
+
+    for name, entry in results["scenarios"].items():
+        if entry["exit_status"] != 0:
+            print(f"FAIL: {name}: analyser exited with status {entry['exit_status']}")
+            failures += 1
+        for module in entry["deferred_imported"]:
+            print(f"FAIL: {name}: imports {module}, which it should not need")
+            failures += 1
+        if max_import_ms is not None and entry["median_import_us"] > max_import_ms * 1000:
+            print(
+                f"FAIL: {name}: median import time {entry['median_import_us'] / 1000:.1f}ms"
+                f" is above {max_import_ms:g}ms"
+            )
+            failures += 1
+
+    if baseline is None:
+        return failures
+
+    print()
+    print("============================================================")
+    print(f"COMPARISON WITH {baseline.get('git_revision') or 'baseline'}")
+    print("============================================================")
+    for name, entry in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if old is None:
+            continue
+        before = old["median_import_us"]
+        after = entry["median_import_us"]
+        ratio = after / before if before else float("inf")
+        print(f"  {name:<18} {before / 1000:>7.1f}ms -> {after / 1000:>7.1f}ms   x{ratio:.2f}")
+        if after > before * (1 + tolerance / 100):
+            print(f"FAIL: {name}: median import time is more than {tolerance:g}% above the baseline")
+            failures += 1
+
+    return failures
+
+
+def parse_arguments():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Timed runs of each command line. Default: 5",
+    )
+
+    parser.add_argument(
+        "--analyser",
+        default=os.path.join(script_dir, "financial-statement-analyser.py"),
+        help="Path to the financial-statement-analyser.py to benchmark",
+    )
+
+    parser.add_argument(
+        "--python",
+        default=sys.executable,
+        help="Python interpreter used to run the analyser",
+    )
+
+    parser.add_argument(
+        "--work-dir",
+        help="Directory for the synthetic dataset and caches",
+    )
+
+    parser.add_argument(
+        "--output",
+        default="startup-results.json",
+        help="JSON results file. Default: startup-results.json",
+    )
+
+    parser.add_argument(
+        "--compare",
+        help="Earlier JSON results file to compare against",
+    )
+
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=25.0,
+        help="Allowed median import time increase over --compare, in percent. Default: 25",
+    )
+
+    parser.add_argument(
+        "--max-import-ms",
+        type=float,
+        help="Fail if a median import time is above this many milliseconds",
+    )
+
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    if args.repeat < 1:
+        print("ERROR: --repeat must be at least 1.")
+        return 1
+    if not os.path.isfile(args.analyser):
+        print(f"ERROR: analyser not found: {args.analyser}")
+        return 1
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: cannot read {args.compare}: {e}")
+            return 1
+
+    benchmark = load_script(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "financial-statement-analyser-benchmark.py"),
+        "financial_statement_analyser_benchmark",
+    )
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="fsa-startup-")
+
+    try:
+        directory = benchmark.dataset_directory(
+            work_dir, DATASET_TRANSACTIONS, DATASET_RULES, DATASET_STATEMENTS, DATASET_SEED
+        )
+        data_file = benchmark.generate_dataset(
+            directory, DATASET_TRANSACTIONS, DATASET_RULES, DATASET_STATEMENTS, DATASET_SEED
+        )
+        paths = {
+            "data_file": data_file,
+            "control": os.path.join(directory, "control.yaml"),
+            "statement": os.path.join(directory, f"statement-{benchmark.FIRST_TAX_YEAR}.csv"),
+        }
+
+        # Keep the parsed-config cache out of the user's ~/.cache
+        env = dict(os.environ, XDG_CACHE_HOME=os.path.join(work_dir, "cache"))
+
+        commit, dirty = benchmark.git_revision(args.analyser)
+        results = {
+            "format_version": RESULTS_FORMAT_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "analyser": os.path.abspath(args.analyser),
+            "git_revision": commit,
+            "git_dirty": dirty,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "scenarios": {},
+        }
+
+        print()
+        print(f"Startup times of {args.analyser} ({args.repeat} runs each)")
+        for name, arguments, deferred in SCENARIOS:
+            arguments = [argument.format(**paths) for argument in arguments]
+            entry = benchmark_scenario(args.python, args.analyser, arguments, deferred, args.repeat, env)
+            results["scenarios"][name] = entry
+            print_scenario(name, entry)
+
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print()
+        print(f"Results written to {args.output}")
+
+        print()
+        failures = check_results(results, baseline, args.tolerance, args.max_import_ms)
+        if failures:
+            print(f"Startup checks failed: {failures} failure(s).")
+            return 1
+        print("Startup checks passed.")
+        return 0
+
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -42,6 +42,17 @@ Command-line options:
         Without this flag, most other flags have no effect.
         Default: False
 
+  --config-cache / --no-config-cache
+        Keep a pickle of every parsed data, control and rules file in
+        ~/.cache/financial-statement-analyser/config (or under
+        $XDG_CACHE_HOME), named by the SHA-256 of the file's content, so
+        an unchanged file is not parsed again. Control and rules files
+        without errors are also kept compiled, keyed by their content and
+        what they are checked against, so they are not validated and
+        compiled again either. YAML is parsed with libyaml's CSafeLoader
+        when PyYAML has it.
+        Default: True (--config-cache)
+
   --control-file CONTROL_FILE
         Path to the YAML control file containing:
           - people definitions
@@ -50,6 +61,10 @@ Command-line options:
           - classification rules
         Required when using --statement (not required when using --data-file,
         as the control file is specified inside the data file).
+        The control file, and each rules file it names, is validated
+        while it is loaded (the checks of
+        financial-statement-analyser-control-file-checker.py); a file
+        with errors stops the run with a list of its problems.
 
   --data-file DATA_FILE
         YAML data file containing tax years and statement files.
@@ -62,6 +77,22 @@ Command-line options:
         Mutually exclusive with --data-file.
         Requires --control-file and --analyse.
 
+  --statement-cache / --no-statement-cache
+        In data-file mode, keep parsed statements in an SQLite cache
+        file beside the data file (DATA.statement-cache.sqlite).
+        Entries are keyed by path, size, mtime and content hash, so a
+        statement is only re-parsed when its file changes.
+        Default: True (--statement-cache)
+
+  --stream / --no-stream
+        Read Lloyds statements as a stream: each row is checked (account,
+        type, ordering, tax year, running balance) and classified as it
+        is read, so memory use does not grow with the statement and the
+        first diagnostics appear before the whole file has been read.
+        Per-line warnings from different checks are interleaved by line.
+        In data-file mode this bypasses the statement cache.
+        Default: False (--no-stream)
+
   --tax-year TAX_YEAR
         Filter which tax years to process when using --data-file.
         Repeatable (e.g., --tax-year 2023-2024 --tax-year 2024-2025).
@@ -93,12 +124,93 @@ Command-line options:
         Repeatable (OR logic).
         Requires --analyse and --control-file.
 
+  --watch
+        Run as usual, then keep running: whenever the data file, control
+        file, a rules file or a statement changes, print the reports
+        again. The parsed control file, rules files, statements and
+        analyses are kept in memory. Only the changed files are read
+        again, and after a rules change only the affected transactions
+        are matched again (as with --incremental). Files are checked by
+        polling. --jobs and the on-disk caches are not used. Stop with
+        Ctrl-C.
+
+  --watch-interval SECONDS
+        How often --watch checks the input files for changes.
+        Default: 0.25
+
+  --incremental / --no-incremental
+        In data-file mode, keep each statement's analysis in an SQLite
+        store beside the data file (DATA.analysis-store.sqlite), with a
+        fingerprint of every rule it was made with. When only rules
+        change, a later run re-matches just the transactions whose
+        winning rule, or a rule now ahead of it, was added, removed or
+        changed. It then patches the category and owner totals for the
+        transactions that moved. A changed statement, rules file
+        assignment, default category, default ownership, category
+        default facets or --fixed-point setting means a full analysis.
+        Not used with --stream.
+        Default: False (--no-incremental)
+
+  --rule-stats
+        Match every statement in the data file against its rules and,
+        for each rules file, report how many transactions every rule
+        classified and how many it matches at all. Rules that never match
+        are flagged "dead". Rules that match but always lose to an
+        earlier rule are flagged "shadowed", with the rules that
+        pre-empted them. It also suggests a rule order (as priorities),
+        and rules to prune, that lower the average number of rules
+        evaluated per transaction. The suggestions are based on these
+        transactions only and leave their classification unchanged.
+        Requires --data-file; the usual reports are not produced.
+
+  --profile FILE
+        Write a JSON profile trace to FILE. It lists every stage in the
+        order it ran: the data-file and control-file loads, each rules
+        file, each statement load, each analyse_transactions call, each
+        merge, the facet validation and every report. For each stage it
+        records the wall time, CPU time, peak traced memory (tracemalloc)
+        and item counts. It also gives, for each rules file, how often
+        every rule was evaluated and how often it matched. Memory tracing
+        slows the run down, so compare the timings only with other
+        --profile runs.
+
+  --engine {python,vectorised}
+        Analysis backend. 'python' classifies and totals transactions one
+        row at a time. 'vectorised' (requires NumPy) evaluates rules as
+        boolean masks over column arrays in priority order and computes
+        category, owner, facet and monthly totals as grouped sums; the
+        results are the same.
+        Default: python
+
   --facet-report FACET_GROUP
         Generate a summary report grouped by facets in the specified group
         (e.g., --facet-report IHT). This produces a table suitable for
         filling in IHT403 or similar forms.
         Requires --analyse and --control-file.
 
+  --fixed-point / --no-fixed-point
+        Total category, owner and monthly amounts as integer pence
+        (owner splits as pence x percentage, so they stay exact) and
+        convert to Decimal only when printing. Reports are identical to
+        the Decimal path.
+        Default: False (--no-fixed-point)
+
+  --jobs N
+        In data-file mode, load and analyse the statements of all
+        selected tax years in N worker processes. Results are merged in
+        data-file order, so the output is identical to a serial run.
+        Default: 1 (serial)
+
+  --classification-cache N
+        Remember the rule chosen for up to N distinct transactions (least
+        recently used first out), keyed by what the rules look at: the
+        description, type, direction and, for rules with a 'when' clause,
+        which side of each amount, date and line number boundary the
+        transaction falls. Shared by every statement and tax year of a
+        run (per worker with --jobs). 0 disables the cache.
+        Hits and misses are shown in the --verbose summary.
+        Default: 65536
+
   --ownership-report [OWNER]
         Enable ownership reporting. When specified, category and facet
         summaries show breakdowns by owner.
@@ -111,7 +223,8 @@ Command-line options:
   --print-report
         Print the monthly summary (month-by-month money in/out/net).
         In single-statement mode, also prints ledger reconciliation.
-        In data-file mode, prints only the monthly summary (no reconciliation).
+        In data-file mode, prints only the monthly summary (no reconciliation)
+        for each tax year.
         Does not require --analyse.
 
   --relax-facet-checks / --no-relax-facet-checks
@@ -131,16 +244,43 @@ Command-line options:
 """
 
 import argparse
-import csv
+import contextlib
+import heapq
+import functools
+import io
+import itertools
+import math
 import os
+import re
 import sys
-import yaml
+import time
 
-from collections import defaultdict
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict, deque
 from dataclasses import dataclass
 from datetime import datetime
-from decimal import Decimal
-from dataclasses import dataclass, field
+from decimal import ROUND_HALF_EVEN, Decimal
+from dataclasses import astuple, dataclass, field
+from financial_statement_config import load_yaml, set_cache_dir
+from financial_statement_rules import (
+    CONDITION_CHECKERS,
+    REGEX_FLAGS,
+    normalise_description,
+    CONDITION_COMPILERS,
+    parse_date,
+    parse_tax_year,
+    read_control_file,
+    read_rules_file,
+    to_decimal,
+)
+
+# Modules that only some runs need (csv, sqlite3, pickle, hashlib, json,
+# concurrent.futures, tracemalloc, NumPy, and yaml in load_yaml) are
+# imported where they are used, so that e.g. --help or a run whose
+# configs are all in the parsed-config cache does not pay for them.
+# tools/scripts/financial-statement-analyser-startup-benchmark.py checks
+# that they stay deferred.
 
 ALLOWED_DAYS_GAP_AT_START = 9
 ALLOWED_DAYS_GAP_AT_END = 5
@@ -181,7 +321,6 @@ class AnalysisResults:
     error_count: int = 0
 
 
-# Must be frozen as it is now used as a key in the facet_assignments dictionary
 @dataclass(frozen=True)
 class Transaction:
     line_number: int
@@ -198,44 +337,6 @@ class Transaction:
     sort_code: str
     account_number: str
 
-@dataclass
-class Person:
-    id: str
-    full_name: str
-
-
-@dataclass
-class Category:
-    id: str
-    description: str
-    default_facets: list[str] = field(default_factory=list)
-
-@dataclass
-class MatchCondition:
-    type: str   # 'description', 'prefix', (later 'regex', etc.)
-    value: str
-
-@dataclass
-class Rule:
-    id: str
-    priority: int
-    conditions: list[MatchCondition]
-    category: str
-    ownership: dict[str, int]
-    transaction_types: set[str] | None
-    direction: str | None
-    when: list[dict] | None = None
-    facets: list[str] | None = None
-
-@dataclass
-class ControlFile:
-    people: dict[str, Person]
-    categories: dict[str, Category]
-    default_category: str
-    default_ownership: dict[str, int]
-    facet_definitions: dict = field(default_factory=dict)
-    statement_handling: dict[str, str] = field(default_factory=dict)
-
 @dataclass
 class CategorySummary:
     category: str
@@ -250,87 +351,344 @@ class CategorySummary:
     owner_credits: dict[str, Decimal] = field(default_factory=dict)
     owner_debits: dict[str, Decimal] = field(default_factory=dict)
 
+    # Fixed-point accumulators used by --fixed-point: whole pence for the
+    # totals and share units (pence x percentage) for the owner splits.
+    # See from_share_units() for the rounding policy.
+    credit_pence: int = 0
+    debit_pence: int = 0
+    owner_credit_units: dict[str, int] = field(default_factory=dict)
+    owner_debit_units: dict[str, int] = field(default_factory=dict)
+
+    def settled(self):
+        """Return a copy with the fixed-point accumulators folded into the Decimal totals."""
+        owner_credits = dict(self.owner_credits)
+        for owner, units in self.owner_credit_units.items():
+            owner_credits[owner] = owner_credits.get(owner, Decimal("0")) + from_share_units(units)
+
+        owner_debits = dict(self.owner_debits)
+        for owner, units in self.owner_debit_units.items():
+            owner_debits[owner] = owner_debits.get(owner, Decimal("0")) + from_share_units(units)
+
+        total_credit = self.total_credit
+        total_debit = self.total_debit
+        if self.credit_pence:
+            total_credit += from_pence(self.credit_pence)
+        if self.debit_pence:
+            total_debit += from_pence(self.debit_pence)
+
+        return CategorySummary(
+            category=self.category,
+            transaction_count=self.transaction_count,
+            total_credit=total_credit,
+            total_debit=total_debit,
+            owner_counts=dict(self.owner_counts),
+            owner_credits=owner_credits,
+            owner_debits=owner_debits,
+        )
 
-@dataclass
-class AnalysisResult:
-    summaries: dict[str, CategorySummary]
-    uncategorised: list[Transaction]
-    warnings: list[str]
-    category_transactions: dict[str, list[tuple[Transaction, str | None]]] = field(default_factory=dict)
-    facet_assignments: dict[Transaction, list[str]] = field(default_factory=dict)
-    tx_ownership: dict[Transaction, dict[str, int]] = field(default_factory=dict)
 
-# ------------------------------------------------------------
-# Condition checkers for "when" clauses
-# ------------------------------------------------------------
+class InternPool:
+    """Assigns small integer ids to hashable values, in first-seen order."""
 
-CONDITION_CHECKERS = {}
+    def __init__(self, values=()):
+        self.values = []
+        self.ids = {}
+        for value in values:
+            self.intern(value)
 
-def register_checker(cond_type):
-    """Decorator to register a condition checker function."""
-    def decorator(func):
-        CONDITION_CHECKERS[cond_type] = func
-        return func
-    return decorator
+    def intern(self, value):
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self.ids[value] = value_id
+        return value_id
 
-def parse_date(date_str):
-    """Parse a date string in DD-MM-YYYY or YYYY-MM-DD format."""
-    date_str = date_str.strip()
-    # Try YYYY-MM-DD first
-    try:
-        return datetime.strptime(date_str, "%Y-%m-%d")
-    except ValueError:
-        pass
-    # Try DD-MM-YYYY
+    def remap(self, other):
+        """Intern every value of another pool; return a list mapping its ids to ours."""
+        return [self.intern(value) for value in other.values]
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+def to_pence(amount):
+    """Convert a Decimal amount to an int number of pence (must be whole pence)."""
+    pence = amount * 100
+    if pence != pence.to_integral_value():
+        raise ValueError(f"amount {amount} is not a whole number of pence")
+    return int(pence)
+
+def fixed_point_pence(amount, line_number):
+    """to_pence() for --fixed-point, reporting a sub-penny amount against its statement line."""
     try:
-        return datetime.strptime(date_str, "%d-%m-%Y")
-    except ValueError:
-        raise ValueError(f"Unrecognised date format: {date_str}")
-
-def parse_tax_year(tax_year_str):
-    """Return (start_date, end_date) for a UK tax year like '2023-2024'."""
-    parts = tax_year_str.split('-')
-    if len(parts) != 2:
-        raise ValueError(f"Invalid tax year format: {tax_year_str}")
-    start_year = int(parts[0])
-    start = datetime(start_year, 4, 6)
-    end = datetime(start_year + 1, 4, 5)
-    return start, end
-
-# Condition checkers
-@register_checker("amount_range")
-def check_amount_range(tx, value):
-    """value is [min, max] inclusive."""
-    min_val, max_val = value
-    amount = tx.credit if tx.credit else tx.debit
-    return min_val <= amount <= max_val
-
-@register_checker("amount_exact")
-def check_amount_exact(tx, value):
-    """value is a single number."""
-    amount = tx.credit if tx.credit else tx.debit
-    return amount == value
-
-@register_checker("line_numbers")
-def check_line_numbers(tx, value):
-    """value is a list of line numbers."""
-    return tx.line_number in value
-
-@register_checker("tax_year")
-def check_tax_year(tx, value):
-    """value is a string like '2023-2024'."""
-    start, end = parse_tax_year(value)
-    return start <= tx.date <= end
+        return to_pence(amount)
+    except ValueError as exc:
+        raise ValueError(f"line {line_number}: {exc} (--fixed-point needs whole pence)") from None
 
-@register_checker("date_range")
-def check_date_range(tx, value):
-    """value is [start_date, end_date] as strings."""
-    start_str, end_str = value
-    start = parse_date(start_str)
-    end = parse_date(end_str)
-    return start <= tx.date <= end
+def round_pence(amount):
+    """Round a Decimal amount to the nearest int number of pence (ROUND_HALF_EVEN)."""
+    return int((amount * 100).to_integral_value(ROUND_HALF_EVEN))
+
+def from_pence(pence):
+    """Convert an int number of pence back to a Decimal amount."""
+    return Decimal(pence).scaleb(-2)
+
+def from_share_units(units):
+    """
+    Convert an owner's share units back to a Decimal amount.
+
+    Rounding policy for ownership splits in the fixed-point path: an
+    owner's share of an amount is held as pence x percentage, i.e. in
+    units of 1/100 penny.  Percentages are whole numbers, so this is
+    exact and no rounding happens while aggregating; the Decimal total
+    returned here equals the Decimal path's sum of amount * pct / 100.
+    The only rounding is the report's 2-decimal-place formatting
+    (ROUND_HALF_EVEN), which is the same for both paths.
+    """
+    return Decimal(units).scaleb(-4)
+
+def share_percentages(ownership):
+    """Return [(owner, percentage)] for the non-zero shares, checking they are whole numbers."""
+    shares = []
+    for owner, percentage in ownership.items():
+        if percentage == 0:
+            continue
+        if not isinstance(percentage, int):
+            raise ValueError(
+                f"ownership percentage for '{owner}' must be a whole number "
+                f"for fixed-point analysis (got {percentage})"
+            )
+        shares.append((owner, percentage))
+    return shares
+
+
+class TransactionTable:
+    """
+    Column-oriented store of transactions.
+
+    Each transaction is a row index into parallel arrays: dates are held
+    as ordinals, amounts as integer pence and strings (types, descriptions,
+    sort codes, account numbers) as ids into a shared InternPool.
+    Transaction objects are only rebuilt on demand, for display.
+
+    Amounts that are not whole pence (e.g. 12.345) are kept exactly in
+    exact_amounts, row -> (debit, credit, balance); their pence columns
+    hold the amounts rounded to the penny.  The Decimal path reads the
+    exact values through debit()/credit(); --fixed-point rejects them.
+    """
+
+    def __init__(self):
+        self.line_numbers = array("q")
+        self.date_ordinals = array("q")
+        self.type_ids = array("q")
+        self.description_ids = array("q")
+        self.debit_pence = array("q")
+        self.credit_pence = array("q")
+        self.balance_pence = array("q")
+        self.sort_code_ids = array("q")
+        self.account_number_ids = array("q")
+        self.strings = InternPool()
+        self.exact_amounts = {}
+
+    def __len__(self):
+        return len(self.line_numbers)
+
+    def append(self, tx):
+        """Append a Transaction and return its row index."""
+        row = len(self.line_numbers)
+        try:
+            debit, credit, balance = to_pence(tx.debit), to_pence(tx.credit), to_pence(tx.balance)
+        except ValueError:
+            debit, credit, balance = round_pence(tx.debit), round_pence(tx.credit), round_pence(tx.balance)
+            self.exact_amounts[row] = (tx.debit, tx.credit, tx.balance)
+        self.debit_pence.append(debit)
+        self.credit_pence.append(credit)
+        self.balance_pence.append(balance)
+        self.line_numbers.append(tx.line_number)
+        self.date_ordinals.append(tx.date.toordinal())
+        self.type_ids.append(self.strings.intern(tx.transaction_type))
+        self.description_ids.append(self.strings.intern(tx.description))
+        self.sort_code_ids.append(self.strings.intern(tx.sort_code))
+        self.account_number_ids.append(self.strings.intern(tx.account_number))
+        return row
+
+    def extend(self, other):
+        """Append all rows of another table; return the row offset they start at."""
+        offset = len(self)
+        string_map = self.strings.remap(other.strings)
+
+        self.line_numbers.extend(other.line_numbers)
+        self.date_ordinals.extend(other.date_ordinals)
+        self.debit_pence.extend(other.debit_pence)
+        self.credit_pence.extend(other.credit_pence)
+        self.balance_pence.extend(other.balance_pence)
+        for column, other_column in (
+            (self.type_ids, other.type_ids),
+            (self.description_ids, other.description_ids),
+            (self.sort_code_ids, other.sort_code_ids),
+            (self.account_number_ids, other.account_number_ids),
+        ):
+            column.extend(string_map[string_id] for string_id in other_column)
+        for row, amounts in other.exact_amounts.items():
+            self.exact_amounts[offset + row] = amounts
+
+        return offset
+
+    COLUMNS = (
+        "line_numbers", "date_ordinals", "type_ids", "description_ids",
+        "debit_pence", "credit_pence", "balance_pence", "sort_code_ids",
+        "account_number_ids",
+    )
+
+    def to_state(self):
+        """Return the table as plain bytes and strings (for pickling)."""
+        return (
+            [getattr(self, name).tobytes() for name in self.COLUMNS],
+            list(self.strings.values),
+            dict(self.exact_amounts),
+        )
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a table from to_state() output."""
+        columns, strings, exact_amounts = state
+        table = cls()
+        for name, data in zip(cls.COLUMNS, columns):
+            getattr(table, name).frombytes(data)
+        table.strings = InternPool(strings)
+        table.exact_amounts = dict(exact_amounts)
+        return table
+
+    def description(self, row):
+        return self.strings[self.description_ids[row]]
+
+    def debit(self, row):
+        """Return row's debit as an exact Decimal."""
+        exact = self.exact_amounts.get(row)
+        return from_pence(self.debit_pence[row]) if exact is None else exact[0]
+
+    def credit(self, row):
+        """Return row's credit as an exact Decimal."""
+        exact = self.exact_amounts.get(row)
+        return from_pence(self.credit_pence[row]) if exact is None else exact[1]
+
+    def balance(self, row):
+        """Return row's balance as an exact Decimal."""
+        exact = self.exact_amounts.get(row)
+        return from_pence(self.balance_pence[row]) if exact is None else exact[2]
+
+    def check_whole_pence(self, row):
+        """Raise ValueError, naming the statement line, if row has a sub-penny amount."""
+        for amount in self.exact_amounts.get(row, ()):
+            fixed_point_pence(amount, self.line_numbers[row])
+
+    def transaction(self, row):
+        """Rebuild the Transaction stored at row."""
+        return Transaction(
+            line_number=self.line_numbers[row],
+            date=datetime.fromordinal(self.date_ordinals[row]),
+            transaction_type=self.strings[self.type_ids[row]],
+            description=self.strings[self.description_ids[row]],
+            debit=self.debit(row),
+            credit=self.credit(row),
+            balance=self.balance(row),
+            sort_code=self.strings[self.sort_code_ids[row]],
+            account_number=self.strings[self.account_number_ids[row]],
+        )
+
+
+NO_RULE = -1
+
+@dataclass
+class AnalysisResult:
+    """
+    Classification of every transaction, plus per-category summaries.
 
+    Transactions live in a TransactionTable; the assignment columns hold,
+    for each row, an id into the matching pool:
 
+      category_column  -> categories (category ids)
+      rule_column      -> rule_ids (NO_RULE if no rule matched)
+      facet_column     -> facet_sets (tuples of facet codes)
+      ownership_column -> ownerships (tuples of (owner, percentage) pairs)
+    """
+    summaries: dict[str, CategorySummary]
+    warnings: list[str]
+    table: TransactionTable = field(default_factory=TransactionTable)
+    category_column: array = field(default_factory=lambda: array("q"))
+    rule_column: array = field(default_factory=lambda: array("q"))
+    facet_column: array = field(default_factory=lambda: array("q"))
+    ownership_column: array = field(default_factory=lambda: array("q"))
+    categories: InternPool = field(default_factory=InternPool)
+    rule_ids: InternPool = field(default_factory=InternPool)
+    facet_sets: InternPool = field(default_factory=InternPool)
+    ownerships: InternPool = field(default_factory=InternPool)
+
+    def category(self, row):
+        return self.categories[self.category_column[row]]
+
+    def rule_id(self, row):
+        rule = self.rule_column[row]
+        return None if rule == NO_RULE else self.rule_ids[rule]
+
+    def facets(self, row):
+        return self.facet_sets[self.facet_column[row]]
+
+    def ownership(self, row):
+        return dict(self.ownerships[self.ownership_column[row]])
+
+    def rows_by_category(self):
+        """Return {category_id: [row, ...]} for every category, in category order."""
+        rows = {category_id: [] for category_id in self.categories.values}
+        categories = self.categories.values
+        for row, category in enumerate(self.category_column):
+            rows[categories[category]].append(row)
+        return rows
+
+    def uncategorised_rows(self):
+        """Return the rows that no rule matched."""
+        return [row for row, rule in enumerate(self.rule_column) if rule == NO_RULE]
+
+    def to_state(self):
+        """Return the result as plain values (for pickling)."""
+        return (
+            self.table.to_state(),
+            [column.tobytes() for column in (
+                self.category_column, self.rule_column, self.facet_column, self.ownership_column,
+            )],
+            [list(pool.values) for pool in (
+                self.categories, self.rule_ids, self.facet_sets, self.ownerships,
+            )],
+            [astuple(summary) for summary in self.summaries.values()],
+            list(self.warnings),
+        )
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild a result from to_state() output."""
+        table_state, columns, pools, summaries, warnings = state
+        result = cls(
+            summaries={},
+            warnings=warnings,
+            table=TransactionTable.from_state(table_state),
+            categories=InternPool(pools[0]),
+            rule_ids=InternPool(pools[1]),
+            facet_sets=InternPool(pools[2]),
+            ownerships=InternPool(pools[3]),
+        )
+        for column, data in zip(
+            (result.category_column, result.rule_column, result.facet_column, result.ownership_column),
+            columns,
+        ):
+            column.frombytes(data)
+        for fields in summaries:
+            summary = CategorySummary(*fields)
+            result.summaries[summary.category] = summary
+        return result
 
 def print_pass(message, verbose, stats):
     stats.pass_count += 1
@@ -349,6 +707,239 @@ def print_error(message, stats):
     print(f"ERROR: {message}")
 
 
+# ------------------------------------------------------------
+# Profiling (--profile)
+# ------------------------------------------------------------
+
+PROFILE_FORMAT_VERSION = 1
+
+class ProfileStage:
+    """One timed stage of a --profile trace."""
+
+    def __init__(self, name, depth, details):
+        self.name = name
+        self.depth = depth
+        self.details = details
+        self.counts = {}
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_memory_bytes = 0
+
+    def count(self, **counts):
+        """Record item counts (transactions, rules, ...) for this stage."""
+        self.counts.update(counts)
+
+    def as_dict(self):
+        return {
+            "stage": self.name,
+            "depth": self.depth,
+            **self.details,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "counts": self.counts,
+        }
+
+class NullProfileStage:
+    """Stand-in stage used when --profile is off."""
+
+    def count(self, **counts):
+        pass
+
+NULL_PROFILE_STAGE = NullProfileStage()
+
+class Profiler:
+    """
+    Collects the --profile trace: wall time, CPU time, peak traced memory
+    (tracemalloc) and item counts for each stage, in the order the stages
+    started, plus per-rule evaluation and match counts for every rules
+    file loaded.
+
+    Stages nest; a stage's peak memory includes that of its sub-stages.
+    """
+
+    def __init__(self):
+        import tracemalloc
+
+        self.tracemalloc = tracemalloc
+        self.stages = []
+        self.rule_sets = {}
+        self.worker_rule_counts = {}
+        self._open = []
+        self._peaks = []
+
+        tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name, **details):
+        tracemalloc = self.tracemalloc
+        record = ProfileStage(name, len(self._open), details)
+        self.stages.append(record)
+
+        # Fold the peak so far into the enclosing stage before resetting it
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._open.append(record)
+        self._peaks.append(0)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            record.peak_memory_bytes = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            self._open.pop()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], record.peak_memory_bytes)
+
+    def watch_rules(self, filename, compiled):
+        """Count evaluations and matches for the rules in filename."""
+        compiled.enable_counts()
+        self.rule_sets[filename] = compiled
+
+    def rule_counts(self):
+        """Return {rules file: [{id, priority, evaluated, matched}, ...]} in priority order."""
+        counts = {}
+        for filename, compiled in self.rule_sets.items():
+            counts[filename] = [
+                {
+                    "id": rule.id,
+                    "priority": rule.priority,
+                    "evaluated": compiled.evaluated[position],
+                    "matched": compiled.matched[position],
+                }
+                for position, rule in enumerate(compiled.rules)
+            ]
+
+        # Fold in counts reported by --jobs worker processes
+        for filename, worker_counts in self.worker_rule_counts.items():
+            if filename not in counts:
+                counts[filename] = [dict(entry) for entry in worker_counts]
+                continue
+            for entry, worker_entry in zip(counts[filename], worker_counts):
+                entry["evaluated"] += worker_entry["evaluated"]
+                entry["matched"] += worker_entry["matched"]
+
+        return counts
+
+    def merge_worker_trace(self, trace):
+        """Add the stages and rule counts from a --jobs worker's trace."""
+        depth = len(self._open)
+        for stage in trace["stages"]:
+            record = ProfileStage(stage["stage"], stage["depth"] + depth, {})
+            record.details = {
+                key: value for key, value in stage.items()
+                if key not in ("stage", "depth", "wall_seconds", "cpu_seconds", "peak_memory_bytes", "counts")
+            }
+            record.details["worker"] = True
+            record.wall_seconds = stage["wall_seconds"]
+            record.cpu_seconds = stage["cpu_seconds"]
+            record.peak_memory_bytes = stage["peak_memory_bytes"]
+            record.counts = stage["counts"]
+            self.stages.append(record)
+
+        for filename, worker_counts in trace["rules"].items():
+            existing = self.worker_rule_counts.get(filename)
+            if existing is None:
+                self.worker_rule_counts[filename] = [dict(entry) for entry in worker_counts]
+                continue
+            for entry, worker_entry in zip(existing, worker_counts):
+                entry["evaluated"] += worker_entry["evaluated"]
+                entry["matched"] += worker_entry["matched"]
+
+    def stop(self):
+        """Stop tracing memory allocations."""
+        self.tracemalloc.stop()
+
+    def trace(self):
+        """Return the trace as a JSON-serialisable dict."""
+        return {
+            "stages": [stage.as_dict() for stage in self.stages],
+            "rules": self.rule_counts(),
+        }
+
+    def write(self, filename, argv):
+        """Write the JSON trace to filename."""
+        trace = {
+            "version": PROFILE_FORMAT_VERSION,
+            "argv": argv,
+            **self.trace(),
+            "peak_rss_bytes": peak_rss_bytes(),
+        }
+        import json
+
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(trace, f, indent=2)
+            f.write("\n")
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+_profiler = None
+
+def profile_stage(name, **details):
+    """
+    Context manager timing a --profile stage; yields the stage so the
+    caller can record counts. A no-op when profiling is off.
+    """
+    if _profiler is None:
+        return contextlib.nullcontext(NULL_PROFILE_STAGE)
+    return _profiler.stage(name, **details)
+
+def profiled(name, details=None, counts=None):
+    """
+    Decorator making every call of a function a --profile stage.
+    details(*args, **kwargs) returns extra fields for the stage (e.g. the
+    file name) and counts(result) its item counts.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _profiler is None:
+                return func(*args, **kwargs)
+            stage_details = details(*args, **kwargs) if details else {}
+            with _profiler.stage(name, **stage_details) as stage:
+                result = func(*args, **kwargs)
+                if counts:
+                    stage.count(**counts(result))
+            return result
+        return wrapper
+    return decorator
+
+def sized(items):
+    """len(items), or None for an iterator (e.g. a --stream pipeline)."""
+    return len(items) if hasattr(items, "__len__") else None
+
+def transactions_details(transactions, *args, **kwargs):
+    return {"transactions": sized(transactions)}
+
+def print_summary(stats, verbose):
+    """Print the final PASS/warning/error counts."""
+    print()
+    print("============================================================")
+    print("SUMMARY")
+    print("============================================================")
+    print()
+    if verbose:
+        print(f"PASS checks : {stats.pass_count}")
+    print(f"Warnings    : {stats.warning_count}")
+    print(f"Errors      : {stats.error_count}")
+    cache = _classification_cache
+    if verbose and cache is not None and cache.hits + cache.misses:
+        rate = 100 * cache.hits / (cache.hits + cache.misses)
+        print(f"Classification cache: {cache.hits} hits, {cache.misses} misses "
+              f"({rate:.1f}% hit rate), {cache.evictions} evictions")
+
 def parse_arguments():
     parser = argparse.ArgumentParser()
 
@@ -358,6 +949,13 @@ def parse_arguments():
         help="Analyse transactions using control file",
     )
 
+    parser.add_argument(
+        "--config-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Cache parsed data files and compiled control and rules files by content hash. Default: True",
+    )
+
     parser.add_argument(
         "--control-file",
         help="Future transaction classification rules"
@@ -401,6 +999,46 @@ def parse_arguments():
         help="Show all transactions assigned to this facet code (repeatable, OR logic)",
     )
 
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Re-run whenever the data, control, rules or statement files change",
+    )
+
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=0.25,
+        metavar="SECONDS",
+        help="How often --watch checks the input files. Default: 0.25",
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Store per-statement analyses beside the data file and only reclassify what rule changes affect",
+    )
+
+    parser.add_argument(
+        "--rule-stats",
+        action="store_true",
+        help="Report rule match counts, dead and shadowed rules and a suggested rule order (requires --data-file)",
+    )
+
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write a JSON trace of per-stage timings, memory, counts and rule hits to FILE",
+    )
+
+    parser.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="python",
+        help="Analysis backend: per-row 'python' or NumPy 'vectorised'. Default: python",
+    )
+
     parser.add_argument(
         "--facet-report",
         help="Generate a summary report for a facet group",
@@ -425,6 +1063,20 @@ def parse_arguments():
         help="CSV bank statement"
     )
 
+    parser.add_argument(
+        "--statement-cache",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Cache parsed statements beside the data file (data-file mode only). Default: True",
+    )
+
+    parser.add_argument(
+        "--stream",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Check and classify statements as they are read, without loading them whole. Default: False",
+    )
+
     parser.add_argument(
         "--tax-year",
         action="append",
@@ -432,6 +1084,29 @@ def parse_arguments():
         help="Filter which tax years to process (repeatable, e.g., --tax-year 2024-2025)"
     )
 
+    parser.add_argument(
+        "--fixed-point",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Total amounts as integer pence instead of Decimal. Default: False",
+    )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for loading and analysing statements (data-file mode only). Default: 1",
+    )
+
+    parser.add_argument(
+        "--classification-cache",
+        type=int,
+        default=DEFAULT_CLASSIFICATION_CACHE_SIZE,
+        metavar="N",
+        help=f"Cache the rule chosen for up to N distinct transactions; 0 disables. "
+             f"Default: {DEFAULT_CLASSIFICATION_CACHE_SIZE}",
+    )
+
     parser.add_argument(
         "--ownership-report",
         nargs='?',
@@ -460,6 +1135,14 @@ def parse_decimal(value):
 
     return Decimal(value)
 
+@profiled(
+    "load_data_file",
+    details=lambda filename: {"file": filename},
+    counts=lambda result: {
+        "tax_years": len(result[1]),
+        "statements": sum(len(ty.get("statements", [])) for ty in result[1]),
+    },
+)
 def load_data_file(filename):
     """
     Load the YAML data file and resolve relative paths.
@@ -468,8 +1151,7 @@ def load_data_file(filename):
     """
     base_dir = os.path.dirname(os.path.abspath(filename))
 
-    with open(filename, 'r', encoding='utf-8') as f:
-        raw = yaml.safe_load(f)
+    raw = load_yaml(filename)
 
     control_file = raw.get('control_file')
     if control_file:
@@ -531,102 +1213,17 @@ def list_data_file_info(tax_years, filter_years=None):
             print(f"    - Type: {stmt['type']:15} File: {stmt['file']}")
         print()
 
+@profiled(
+    "load_control_file",
+    details=lambda filename: {"file": filename},
+    counts=lambda control: {"categories": len(control.categories), "people": len(control.people)},
+)
 def load_control_file(filename):
-
-    with open(filename, "r", encoding="utf-8") as infile:
-        raw = yaml.safe_load(infile)
-
-    people = {}
-
-    for person_id, person_data in raw["people"].items():
-
-        people[person_id] = Person(
-            id=person_id,
-            full_name=person_data["full_name"],
-        )
-
-    categories = {}
-
-    for category_id, category_data in (
-        raw["categories"].items()
-    ):
-
-        categories[category_id] = Category(
-            id=category_id,
-            description=category_data["description"],
-		    default_facets=category_data.get("default_facets", []),
-        )
-
-    # Load facet definitions with full metadata
-    facet_definitions = {}
-    for group_name, group_data in raw.get("facets", {}).items():
-        codes_dict = {}
-        for item in group_data.get("codes", []):
-            codes_dict[item["code"]] = {
-                "description": item.get("description", ""),
-                "suppress_in_report": item.get("suppress_in_report", False),
-            }
-        facet_definitions[group_name] = {
-            "description": group_data.get("description", ""),
-            "codes": codes_dict,
-        }
-
-    # Load statement handling mapping
-    statement_handling = {}
-    for item in raw.get("statement_handling", []):
-        stmt_type = item.get("type")
-        rules_file = item.get("rules_file")
-        if stmt_type and rules_file:
-            base_dir = os.path.dirname(filename)
-            rules_file_path = os.path.join(base_dir, rules_file)
-            statement_handling[stmt_type] = rules_file_path
-
-    rules = []
-
-    for rule_data in raw.get("rules", []):
-        match_data = rule_data["match"]
-        conditions = []
-
-        if isinstance(match_data, list):
-            for cond in match_data:
-                # each cond should be a dict with one key, e.g. {"prefix": "XAARJET"}
-                for match_type, match_value in cond.items():
-                    conditions.append(MatchCondition(type=match_type, value=match_value.upper()))
-        elif isinstance(match_data, dict):
-            # Backward compatible: {"description": "..."} or {"prefix": "..."}
-            for match_type, match_value in match_data.items():
-                conditions.append(MatchCondition(type=match_type, value=match_value.upper()))
-        else:
-            # If it's a plain string, treat as description (old style)
-            conditions.append(MatchCondition(type="description", value=match_data.upper()))
-
-        rules.append(
-            Rule(
-                id=rule_data["id"],
-                priority=rule_data.get("priority", 0),
-                conditions=conditions,
-                category=rule_data["classify"]["category"],
-                ownership=rule_data.get("ownership", {}),
-                transaction_types=set(rule_data.get("expect", {}).get("transaction_types", [])) or None,
-                direction=rule_data.get("expect", {}).get("direction"),
-                when=rule_data.get("when"),
-                facets=rule_data.get("classify", {}).get("facets"),
-            )
-        )
-
-    rules.sort(
-        key=lambda rule: rule.priority,
-        reverse=True,
-    )
-
-    return ControlFile(
-        people=people,
-        categories=categories,
-        default_category=raw["defaults"]["category"],
-        default_ownership=raw["defaults"]["ownership"],
-        facet_definitions=facet_definitions,
-        statement_handling=statement_handling,
-    )
+    """
+    Load, validate and compile the control file (see financial_statement_rules).
+    Raises ConfigError (a ValueError) listing every problem if it is not valid.
+    """
+    return read_control_file(filename)
 
 def resolve_ownership(tx, matched_rule, control):
     """
@@ -637,21 +1234,42 @@ def resolve_ownership(tx, matched_rule, control):
         return matched_rule.ownership
     return control.default_ownership
 
+@functools.lru_cache(maxsize=None)
+def match_key(description):
+    """
+    Return the form of a description that rules are matched against (see
+    normalise_description). The same merchants appear month after month,
+    so each distinct description is normalised only once.
+    """
+    return normalise_description(description)
+
 def match_rule(tx, rule):
-    # First check description/prefix conditions (OR logic)
-    desc_match = False
+    # First check match conditions (OR logic)
+    if not match_rule_description(match_key(tx.description), rule):
+        return False
+
+    # Then check transaction_types, direction and the "when" clause
+    return match_rule_constraints(tx, rule)
+
+def match_rule_description(desc, rule):
+    """Return True if the normalised description (see match_key) satisfies any match condition."""
     for cond in rule.conditions:
         if cond.type == "description":
-            if tx.description.upper() == cond.value:
-                desc_match = True
-                break
+            if desc == cond.value:
+                return True
         elif cond.type == "prefix":
-            if tx.description.upper().startswith(cond.value):
-                desc_match = True
-                break
-    if not desc_match:
-        return False
+            if desc.startswith(cond.value):
+                return True
+        elif cond.type == "contains":
+            if cond.value in desc:
+                return True
+        elif cond.type == "regex":
+            if re.search(cond.value, desc, REGEX_FLAGS):
+                return True
+    return False
 
+def match_rule_constraints(tx, rule):
+    """Check everything in a rule except its match conditions."""
     # Now check transaction_types and direction (AND with description)
     if rule.transaction_types is not None:
         if tx.transaction_type not in rule.transaction_types:
@@ -663,6 +1281,16 @@ def match_rule(tx, rule):
             return False
 
     # Finally, check the "when" clause (if present)
+    if rule.when_predicates is not None:
+        # OR across groups, AND within each group
+        for group in rule.when_predicates:
+            for predicate in group:
+                if not predicate(tx):
+                    break
+            else:
+                return True
+        return False
+
     if rule.when is not None:
         # rule.when is a list of groups; OR across groups, AND within each group
         for group in rule.when:
@@ -685,30 +1313,553 @@ def match_rule(tx, rule):
     # No 'when' clause, or it matched
     return True
 
-def analyse_transactions(transactions, control, rules):
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds every occurrence of any of a set of
+    patterns in one left-to-right scan of the text, however many patterns
+    there are.
+
+    Patterns are identified by their position in the list given to the
+    constructor. States are numbered; goto[state] maps a character to the
+    next state, fail[state] is the state for the longest proper suffix of
+    the text read so far that is also a pattern prefix, and out[state]
+    lists the patterns that end at that state (its own and those of its
+    fail chain).
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.goto = [{}]
+        self.out = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto.append({})
+                    self.out.append([])
+                    self.goto[state][char] = next_state
+                state = next_state
+            self.out[state].append(pattern_id)
+
+        # Breadth-first, so a state's fail target is final before its children's
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.out[next_state].extend(self.out[self.fail[next_state]])
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def iter_matches(self, text):
+        """Yield (end, pattern id) for every occurrence; end is the index after the match."""
+        goto = self.goto
+        fail = self.fail
+        out = self.out
+        state = 0
+        for index, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in out[state]:
+                yield index, pattern_id
+
+    def found(self, text):
+        """Return the set of ids of the patterns that occur in text."""
+        return {pattern_id for _, pattern_id in self.iter_matches(text)}
+
+# Characters that stand for themselves in a regex (outside a class) and
+# upper-case the same way under re.IGNORECASE as in str.upper()
+REGEX_PLAIN_CHARS = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 !\"#%&',-/:;<=>@_`~"
+)
+
+def skip_regex_class(pattern, i):
+    """Return the index after the character class that starts at pattern[i] ('[')."""
+    i += 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern) and pattern[i] != "]":
+        i += 2 if pattern[i] == "\\" else 1
+    return i + 1
+
+def required_literal(pattern):
+    """
+    Return the longest upper-cased text that every match of a regex must
+    contain, or "" if none is found. Conservative: only text outside
+    groups and classes counts, a top-level alternation or an inline flag
+    (which might be verbose mode) gives "", and a character followed by
+    an optional quantifier is left out.
+    """
+    for flag_start in range(len(pattern)):
+        if pattern.startswith("(?", flag_start) and pattern[flag_start + 2:flag_start + 3] in tuple("aiLmsux-"):
+            return ""
+
+    runs = []
+    run = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            escaped = pattern[i + 1:i + 2]
+            if depth == 0 and escaped.isascii() and escaped and not escaped.isalnum():
+                run.append(escaped)
+                i += 2
+                continue
+            runs.append(run)
+            run = []
+            i += 2
+            if escaped == "N" and pattern[i:i + 1] == "{":
+                i = pattern.find("}", i) + 1 or len(pattern)
+            # \d, \x41, \1, ...: skip the escape's letters and digits
+            while escaped.isalnum() and i < len(pattern) and pattern[i].isalnum():
+                i += 1
+            continue
+        if char == "[":
+            runs.append(run)
+            run = []
+            i = skip_regex_class(pattern, i)
+            continue
+        if char in "()":
+            depth += 1 if char == "(" else -1
+            runs.append(run)
+            run = []
+        elif char == "|":
+            if depth == 0:
+                return ""
+            runs.append(run)
+            run = []
+        elif depth:
+            pass
+        elif char in "*?{":
+            # The preceding character is optional
+            if run:
+                run.pop()
+            runs.append(run)
+            run = []
+            if char == "{":
+                i = pattern.find("}", i) + 1 or len(pattern)
+                continue
+        elif char in REGEX_PLAIN_CHARS:
+            run.append(char)
+        else:
+            # + keeps its character but ends the run; . ^ $ } and others
+            runs.append(run)
+            run = []
+        i += 1
+    runs.append(run)
+
+    return "".join(max(runs, key=len)).upper()
+
+class RegexMatcher:
+    """
+    Finds which of a set of regular expressions match a text.
+
+    Python's re has no multi-pattern engine: one alternation of all the
+    regexes backtracks through every alternative at every position (it
+    measured slower than searching for each regex in turn) and reports
+    only the leftmost match. Instead the text every match of a regex
+    must contain (see required_literal) goes into one AhoCorasick
+    automaton, a text is scanned once, and only the regexes whose text
+    occurs in it, plus those that have none, are searched.
+
+    Patterns are identified by their position in the list given to the
+    constructor.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.regexes = [re.compile(pattern, REGEX_FLAGS) for pattern in self.patterns]
+        self.unfiltered = []
+        by_literal = {}
+        for pattern_id, pattern in enumerate(self.patterns):
+            literal = required_literal(pattern)
+            if literal:
+                by_literal.setdefault(literal, []).append(pattern_id)
+            else:
+                self.unfiltered.append(pattern_id)
+        self.literal_matcher = AhoCorasick(by_literal)
+        self.literal_patterns = list(by_literal.values())
+
+    def __bool__(self):
+        return bool(self.patterns)
+
+    def found(self, text):
+        """Return the set of ids of the patterns that match (search) text."""
+        candidates = list(self.unfiltered)
+        if self.literal_matcher:
+            for literal_id in self.literal_matcher.found(text):
+                candidates.extend(self.literal_patterns[literal_id])
+        regexes = self.regexes
+        return {pattern_id for pattern_id in candidates if regexes[pattern_id].search(text)}
+
+# ----------------------------------------------------------------------
+# Classification cache
+#
+# The rule a transaction is classified by depends only on its description,
+# its type, which of credit and debit are non-zero and, for rules with a
+# "when" clause, where its amount, date and line number fall relative to
+# the boundaries those clauses test.  Transactions that agree on all of
+# these get the same rule, so first_match caches the winner under that
+# key, across statements and tax years, in a ClassificationCache.
+# ----------------------------------------------------------------------
+
+DEFAULT_CLASSIFICATION_CACHE_SIZE = 65536
+
+# Transaction feature -> function returning it
+BUCKET_FEATURES = {
+    "amount": lambda tx: tx.credit if tx.credit else tx.debit,
+    "date": lambda tx: tx.date,
+    "line": lambda tx: tx.line_number,
+}
+
+BUCKET_CONDITIONS = {}
+
+def register_bucket_condition(cond_type):
+    """
+    Decorator to register the boundaries of a "when" condition.
+    The function takes the condition value and returns (feature, points):
+    the condition's result can only change where the BUCKET_FEATURES
+    feature equals or crosses one of points.  Rule sets using a condition
+    type without one are not cached.
+    """
+    def decorator(func):
+        BUCKET_CONDITIONS[cond_type] = func
+        return func
+    return decorator
+
+@register_bucket_condition("amount_range")
+def bucket_amount_range(value):
+    return "amount", [to_decimal(v) for v in value]
+
+@register_bucket_condition("amount_exact")
+def bucket_amount_exact(value):
+    return "amount", [to_decimal(value)]
+
+@register_bucket_condition("line_numbers")
+def bucket_line_numbers(value):
+    return "line", list(value)
+
+@register_bucket_condition("tax_year")
+def bucket_tax_year(value):
+    return "date", list(parse_tax_year(value))
+
+@register_bucket_condition("date_range")
+def bucket_date_range(value):
+    return "date", [parse_date(v) for v in value]
+
+def when_bucket_points(rules):
+    """
+    Return [(feature, sorted points), ...] for the "when" clauses in rules,
+    or None if one uses a condition type with no bucket function.
+    """
+    points = {}
+    for rule in rules:
+        for group in rule.when or ():
+            for cond_type, cond_value in group.items():
+                bucket = BUCKET_CONDITIONS.get(cond_type)
+                if bucket is None:
+                    return None
+                feature, cond_points = bucket(cond_value)
+                points.setdefault(feature, set()).update(cond_points)
+    return [(feature, sorted(points[feature])) for feature in sorted(points)]
+
+def bucket_index(points, value):
+    """
+    Return which bucket of the sorted points value falls in: 2i for the
+    gap below points[i], 2i + 1 for points[i] itself (None for no value).
+    """
+    if value is None:
+        return None
+    index = bisect_left(points, value)
+    if index < len(points) and points[index] == value:
+        return 2 * index + 1
+    return 2 * index
+
+NOT_CACHED = object()
+
+class ClassificationCache:
+    """
+    Least-recently-used cache of first_match results, holding at most size
+    entries.  Keys come from CompiledRuleSet.classification_key and start
+    with the rule set's serial number, so one cache serves every rule set.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the rule (or None) cached for key, or NOT_CACHED."""
+        rule = self.entries.get(key, NOT_CACHED)
+        if rule is NOT_CACHED:
+            self.misses += 1
+        else:
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return rule
+
+    def put(self, key, rule):
+        """Cache rule for key, evicting the least recently used entry if full."""
+        self.entries[key] = rule
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def counts(self):
+        """Return (hits, misses, evictions)."""
+        return self.hits, self.misses, self.evictions
+
+    def add_counts(self, counts):
+        """Add (hits, misses, evictions) counted elsewhere, e.g. in a worker."""
+        hits, misses, evictions = counts
+        self.hits += hits
+        self.misses += misses
+        self.evictions += evictions
+
+_classification_cache = ClassificationCache(DEFAULT_CLASSIFICATION_CACHE_SIZE)
+
+def set_classification_cache_size(size):
+    """Use a cache of size entries (0: none), keeping the current one if its size is unchanged."""
+    global _classification_cache
+    if size == 0:
+        _classification_cache = None
+    elif _classification_cache is None or _classification_cache.size != size:
+        _classification_cache = ClassificationCache(size)
+
+_rule_set_serials = itertools.count()
+
+class CompiledRuleSet:
+    """
+    A priority-ordered rule list with indexes for fast first-match lookup.
+
+    Built once from the (already priority-sorted) output of load_rules_file.
+    Rules are identified by their position in that list, so the lowest
+    candidate position is always the rule match_rule would have found first.
+
+      * exact_index: normalised description -> positions of rules with a
+        matching 'description' condition.
+      * prefix_trie: character trie over 'prefix' condition values; each
+        node lists the positions of rules whose prefix ends there.
+      * contains_matcher: one AhoCorasick automaton over all 'contains'
+        condition values, so a description is scanned once however many
+        there are; contains_rules lists, per pattern, the positions of
+        rules with that 'contains' condition.
+      * regex_matcher: a RegexMatcher over all 'regex' condition values,
+        with regex_rules listing the rule positions per regex (see
+        regex_rules_fired).
+      * type_filter: transaction type -> positions of rules whose
+        expect.transaction_types admit that type (built lazily per type).
+      * bucket_points: the boundaries of the rules' 'when' clauses, per
+        transaction feature (see when_bucket_points); first_match caches
+        its result in the classification cache under classification_key
+        (None if some condition cannot be bucketed: no caching).
+
+    With --profile, evaluated and matched count, per position, how often
+    each rule's constraints were checked and how often it won.
+    """
+
+    _RULES = "\0rules"     # trie key holding rule positions (not a valid char)
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.exact_index = {}
+        self.prefix_trie = {}
+        self.type_filter = {}
+        contains_index = {}
+        regex_index = {}
+        self.evaluated = None
+        self.matched = None
+        self._fingerprints = None
+        self.serial = next(_rule_set_serials)
+        self.bucket_points = when_bucket_points(self.rules)
+
+        for position, rule in enumerate(self.rules):
+            for cond in rule.conditions:
+                if cond.type == "description":
+                    self.exact_index.setdefault(cond.value, []).append(position)
+                elif cond.type == "prefix":
+                    node = self.prefix_trie
+                    for char in cond.value:
+                        node = node.setdefault(char, {})
+                    node.setdefault(self._RULES, []).append(position)
+                elif cond.type == "contains":
+                    contains_index.setdefault(cond.value, []).append(position)
+                elif cond.type == "regex":
+                    regex_index.setdefault(cond.value, []).append(position)
+
+        self.contains_matcher = AhoCorasick(contains_index)
+        self.contains_rules = list(contains_index.values())
+        self.regex_matcher = RegexMatcher(regex_index)
+        self.regex_rules = list(regex_index.values())
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def rules_for_type(self, transaction_type):
+        """Return the frozenset of rule positions that accept this transaction type."""
+        allowed = self.type_filter.get(transaction_type)
+        if allowed is None:
+            allowed = frozenset(
+                position
+                for position, rule in enumerate(self.rules)
+                if rule.transaction_types is None
+                or transaction_type in rule.transaction_types
+            )
+            self.type_filter[transaction_type] = allowed
+        return allowed
+
+    def description_candidates(self, desc):
+        """Return the set of rule positions whose match conditions match desc."""
+        found = set(self.exact_index.get(desc, ()))
+
+        node = self.prefix_trie
+        found.update(node.get(self._RULES, ()))
+        for char in desc:
+            node = node.get(char)
+            if node is None:
+                break
+            found.update(node.get(self._RULES, ()))
+
+        if self.contains_matcher:
+            for pattern_id in self.contains_matcher.found(desc):
+                found.update(self.contains_rules[pattern_id])
+
+        if self.regex_matcher:
+            found.update(self.regex_rules_fired(desc))
+
+        return found
+
+    def regex_rules_fired(self, desc):
+        """Return the set of positions of rules with a 'regex' condition that matches desc."""
+        fired = set()
+        for pattern_id in self.regex_matcher.found(desc):
+            fired.update(self.regex_rules[pattern_id])
+        return fired
+
+    def candidates(self, desc, transaction_type):
+        """Return rule positions whose match and type match, in priority order."""
+        found = self.description_candidates(desc)
+
+        if not found:
+            return []
+
+        found &= self.rules_for_type(transaction_type)
+        return sorted(found)
+
+    def first_match(self, tx):
+        """Return the first rule (by priority) that matches tx, or None."""
+        cache = _classification_cache
+        if cache is None or self.bucket_points is None:
+            return self.find_first_match(tx)
+
+        key = self.classification_key(tx)
+        rule = cache.get(key)
+        if rule is NOT_CACHED:
+            rule = self.find_first_match(tx)
+            cache.put(key, rule)
+        return rule
+
+    def classification_key(self, tx):
+        """Return the features of tx that decide its first match, as a hashable key."""
+        key = [self.serial, tx.description, tx.transaction_type, tx.credit != 0, tx.debit != 0]
+        for feature, points in self.bucket_points:
+            key.append(bucket_index(points, BUCKET_FEATURES[feature](tx)))
+        return tuple(key)
+
+    def find_first_match(self, tx):
+        """first_match without the classification cache."""
+        desc = match_key(tx.description)
+        for position in self.candidates(desc, tx.transaction_type):
+            rule = self.rules[position]
+            if match_rule_constraints(tx, rule):
+                return rule
+        return None
+
+    def fingerprints(self):
+        """Return [(rule id, rule_fingerprint(rule)), ...] in priority order."""
+        if self._fingerprints is None:
+            self._fingerprints = [(rule.id, rule_fingerprint(rule)) for rule in self.rules]
+        return self._fingerprints
+
+    def enable_counts(self):
+        """Start counting rule evaluations and matches (see first_match_counted)."""
+        if self.evaluated is None:
+            self.evaluated = array("q", bytes(8 * len(self.rules)))
+            self.matched = array("q", bytes(8 * len(self.rules)))
+
+    def first_match_counted(self, tx):
+        """first_match, also updating the evaluated and matched counts."""
+        desc = match_key(tx.description)
+        for position in self.candidates(desc, tx.transaction_type):
+            self.evaluated[position] += 1
+            rule = self.rules[position]
+            if match_rule_constraints(tx, rule):
+                self.matched[position] += 1
+                return rule
+        return None
+
+def compile_rules(rules):
+    """Return a CompiledRuleSet for rules (a no-op if it is already compiled)."""
+    if isinstance(rules, CompiledRuleSet):
+        return rules
+    return CompiledRuleSet(rules)
+
+def unknown_category_error(matched_rule, category_id):
+    """Return the error for a rule (or the default) naming a category the control file lacks."""
+    source = "the default category" if matched_rule is None else f"rule '{matched_rule.id}'"
+    return ValueError(f"{source} classifies into unknown category '{category_id}'")
+
+def analyse_transactions(transactions, control, rules, fixed_point=False):
+    """
+    Classify transactions with the first matching rule and total them by category.
+    With fixed_point, amounts are totalled as integer pence (see from_share_units).
+    """
     summaries = {}
-    tx_ownership = {}
 
     for category_id in control.categories:
         summaries[category_id] = (CategorySummary(category=category_id))
 
-    uncategorised = []
     warnings = []
 
-    category_transactions = {cat_id: [] for cat_id in control.categories}
+    result = AnalysisResult(
+        summaries=summaries,
+        warnings=warnings,
+        categories=InternPool(control.categories),
+    )
+    table = result.table
+
+    compiled = compile_rules(rules)
 
-    facet_assignments = {}
+    # Per matched rule (None for no match): the assignment column values
+    # and the ownership shares, resolved once rather than per transaction
+    resolved = {}
+
+    first_match = compiled.first_match if compiled.evaluated is None else compiled.first_match_counted
 
     for tx in transactions:
-        matched_rule = None
-        for rule in rules:
-            if match_rule(tx, rule):
-                matched_rule = rule
-                break
+        matched_rule = first_match(tx)
 
         if matched_rule is None:
             category_id = (control.default_category)
-            uncategorised.append(tx)
         else:
             category_id = (matched_rule.category)
 
@@ -742,36 +1893,75 @@ def analyse_transactions(transactions, control, rules):
                         f"expected debit"
                     )
 
-        category_transactions[category_id].append(
-            (tx, matched_rule.id if matched_rule else None)
-        )
-
-		# Resolve facets
-        if matched_rule and matched_rule.facets is not None:
-            assigned_facets = matched_rule.facets
-        else:
-            assigned_facets = control.categories[category_id].default_facets
-
-        facet_assignments[tx] = assigned_facets
-
-        summary = summaries[
-            category_id
-        ]
+        summary = summaries.get(category_id)
+        if summary is None:
+            raise unknown_category_error(matched_rule, category_id)
+
+        key = id(matched_rule)
+        columns = resolved.get(key)
+        if columns is None:
+            # Resolve facets
+            if matched_rule and matched_rule.facets is not None:
+                assigned_facets = matched_rule.facets
+            else:
+                assigned_facets = control.categories[category_id].default_facets
+
+            # Resolve ownership
+            if matched_rule:
+                ownership = resolve_ownership(tx, matched_rule, control)
+            else:
+                ownership = control.default_ownership
+
+            if fixed_point:
+                shares = share_percentages(ownership)
+            else:
+                shares = [
+                    (owner, Decimal(percentage) / Decimal(100))
+                    for owner, percentage in ownership.items()
+                    if percentage != 0
+                ]
+
+            columns = (
+                result.categories.intern(category_id),
+                NO_RULE if matched_rule is None else result.rule_ids.intern(matched_rule.id),
+                result.facet_sets.intern(tuple(assigned_facets)),
+                result.ownerships.intern(tuple(ownership.items())),
+                shares,
+            )
+            resolved[key] = columns
+
+        row = table.append(tx)
+        result.category_column.append(columns[0])
+        result.rule_column.append(columns[1])
+        result.facet_column.append(columns[2])
+        result.ownership_column.append(columns[3])
+
+        if fixed_point:
+            if table.exact_amounts:
+                table.check_whole_pence(row)
+            credit_pence = table.credit_pence[row]
+            debit_pence = table.debit_pence[row]
+
+            summary.transaction_count += 1
+            summary.credit_pence += credit_pence
+            summary.debit_pence += debit_pence
+
+            for owner, percentage in columns[4]:
+                summary.owner_counts[owner] = summary.owner_counts.get(owner, 0) + 1
+                summary.owner_credit_units[owner] = (
+                    summary.owner_credit_units.get(owner, 0) + credit_pence * percentage
+                )
+                summary.owner_debit_units[owner] = (
+                    summary.owner_debit_units.get(owner, 0) + debit_pence * percentage
+                )
+            continue
 
         summary.transaction_count += 1
         summary.total_credit += tx.credit
         summary.total_debit += tx.debit
 
         # Track per-owner breakdowns
-        if matched_rule:
-            ownership = resolve_ownership(tx, matched_rule, control)
-        else:
-            ownership = control.default_ownership
-
-        for owner, percentage in ownership.items():
-            if percentage == 0:
-                continue
-            share = Decimal(percentage) / Decimal(100)
+        for owner, share in columns[4]:
             owner_credit = tx.credit * share
             owner_debit = tx.debit * share
 
@@ -779,20 +1969,11 @@ def analyse_transactions(transactions, control, rules):
             summary.owner_credits[owner] = summary.owner_credits.get(owner, Decimal("0")) + owner_credit
             summary.owner_debits[owner] = summary.owner_debits.get(owner, Decimal("0")) + owner_debit
 
-        # Store ownership for this transaction
-        tx_ownership[tx] = ownership
-
-    return AnalysisResult(
-        summaries=summaries,
-        uncategorised=uncategorised,
-        warnings=warnings,
-        category_transactions=category_transactions,
-        facet_assignments=facet_assignments,
-        tx_ownership=tx_ownership,
-    )
+    return result
 
+@profiled("merge_analysis_results", counts=lambda result: {"transactions": len(result.table)})
 def merge_analysis_results(base, other):
-    """Merge two AnalysisResult objects, combining summaries and lists."""
+    """Merge two AnalysisResult objects, combining summaries and row columns."""
     if base is None:
         return other
 
@@ -810,30 +1991,39 @@ def merge_analysis_results(base, other):
                 base_summary.owner_credits[owner] = base_summary.owner_credits.get(owner, Decimal("0")) + credit
             for owner, debit in other_summary.owner_debits.items():
                 base_summary.owner_debits[owner] = base_summary.owner_debits.get(owner, Decimal("0")) + debit
+            # Merge fixed-point accumulators
+            base_summary.credit_pence += other_summary.credit_pence
+            base_summary.debit_pence += other_summary.debit_pence
+            for owner, units in other_summary.owner_credit_units.items():
+                base_summary.owner_credit_units[owner] = base_summary.owner_credit_units.get(owner, 0) + units
+            for owner, units in other_summary.owner_debit_units.items():
+                base_summary.owner_debit_units[owner] = base_summary.owner_debit_units.get(owner, 0) + units
         else:
             base.summaries[cat_id] = other_summary
 
-    # Merge uncategorised
-    base.uncategorised.extend(other.uncategorised)
-
     # Merge warnings
     base.warnings.extend(other.warnings)
 
-    # Merge category_transactions
-    for cat_id, entries in other.category_transactions.items():
-        if cat_id in base.category_transactions:
-            base.category_transactions[cat_id].extend(entries)
-        else:
-            base.category_transactions[cat_id] = entries
+    # Append the other table's rows, remapping pool ids to the base pools
+    base.table.extend(other.table)
 
-    # Merge facet_assignments
-    base.facet_assignments.update(other.facet_assignments)
+    for column, other_column, pool, other_pool in (
+        (base.category_column, other.category_column, base.categories, other.categories),
+        (base.facet_column, other.facet_column, base.facet_sets, other.facet_sets),
+        (base.ownership_column, other.ownership_column, base.ownerships, other.ownerships),
+    ):
+        id_map = pool.remap(other_pool)
+        column.extend(id_map[value_id] for value_id in other_column)
 
-    # Merge tx_ownership
-    base.tx_ownership.update(other.tx_ownership)
+    rule_map = base.rule_ids.remap(other.rule_ids)
+    base.rule_column.extend(
+        NO_RULE if rule == NO_RULE else rule_map[rule]
+        for rule in other.rule_column
+    )
 
     return base
 
+@profiled("print_analysis_report")
 def print_analysis_report(result, control, ownership_report=None):
     """
     Print the category summary.
@@ -885,7 +2075,7 @@ def print_analysis_report(result, control, ownership_report=None):
         print("-" * 68)
 
     for category_id in sorted(result.summaries):
-        summary = result.summaries[category_id]
+        summary = result.summaries[category_id].settled()
 
         line = f"{category_id:30} {summary.transaction_count:>8} {summary.total_credit:>15,.2f} {summary.total_debit:>15,.2f}"
 
@@ -901,14 +2091,17 @@ def print_analysis_report(result, control, ownership_report=None):
 
     print()
 
+    uncategorised = result.uncategorised_rows()
+
     print(
         f"Uncategorised transactions: "
-        f"{len(result.uncategorised)}"
+        f"{len(uncategorised)}"
     )
 
     print()
 
-    for tx in result.uncategorised:
+    for row in uncategorised:
+        tx = result.table.transaction(row)
 
         amount = (
             tx.credit
@@ -932,6 +2125,7 @@ def print_analysis_report(result, control, ownership_report=None):
         for warning in result.warnings:
             print(warning)
 
+@profiled("print_category_debug")
 def print_category_debug(result, categories_to_display):
     """Print all transactions that belong to any of the given categories."""
     if not categories_to_display:
@@ -951,16 +2145,19 @@ def print_category_debug(result, categories_to_display):
     # and sort by date (preserving original order).
     # Since transactions are already in reverse chronological, keep that.
     printed = 0
+    category_rows = result.rows_by_category()
     for cat in categories_to_display:
-        if cat not in result.category_transactions:
+        if cat not in category_rows:
             print(f"Category '{cat}' not found.")
             continue
-        entries = result.category_transactions[cat]
+        entries = category_rows[cat]
         if not entries:
             print(f"Category '{cat}' has no transactions.")
         else:
             print(f"\n=== Category: {cat} ({len(entries)} transactions) ===")
-            for tx, rule_id in entries:
+            for row in entries:
+                tx = result.table.transaction(row)
+                rule_id = result.rule_id(row)
                 amount = tx.credit if tx.credit else tx.debit
                 rule_display = rule_id if rule_id else "UNCAT"
                 print(
@@ -976,51 +2173,59 @@ def print_category_debug(result, categories_to_display):
     print()
     print(f"Total displayed: {printed} transactions")
 
+@profiled("print_description_debug")
 def print_description_debug(result, contains_list, prefix_list, suffix_list):
     """Print all transactions that match any of the description filters."""
     if not (contains_list or prefix_list or suffix_list):
         return
 
-    # Build a master list of all transactions with their category and rule ID
+    table = result.table
+
+    # Build a master list of all rows with their category and rule ID
     all_entries = []
 
     # 1. Categorised transactions
-    for cat_id, entries in result.category_transactions.items():
-        for tx, rule_id in entries:
-            all_entries.append((tx, cat_id, rule_id))
+    for cat_id, rows in result.rows_by_category().items():
+        for row in rows:
+            all_entries.append((row, cat_id, result.rule_id(row)))
 
     # 2. Uncategorised transactions
-    for tx in result.uncategorised:
-        all_entries.append((tx, "UNCATEGORISED", None))
-
-    # Apply filters
-    matches = []
-    for tx, category, rule_id in all_entries:
-        desc = tx.description.upper()
-        matched = False
-
-        # Check contains
-        for pattern in contains_list:
-            if pattern.upper() in desc:
-                matched = True
-                break
+    for row in result.uncategorised_rows():
+        all_entries.append((row, "UNCATEGORISED", None))
+
+    # Apply filters to the normalised descriptions, as rules are: one
+    # automaton over all the patterns; a prefix must end at its own
+    # length, a suffix at the end of the description
+    filters = (
+        [("contains", normalise_description(pattern)) for pattern in contains_list]
+        + [("prefix", normalise_description(pattern)) for pattern in prefix_list]
+        + [("suffix", normalise_description(pattern)) for pattern in suffix_list]
+    )
+    matcher = AhoCorasick(pattern for _, pattern in filters)
 
-        # Check prefix
-        if not matched:
-            for pattern in prefix_list:
-                if desc.startswith(pattern.upper()):
-                    matched = True
-                    break
+    def filter_matches(desc):
+        for end, pattern_id in matcher.iter_matches(desc):
+            kind, pattern = filters[pattern_id]
+            if (
+                kind == "contains"
+                or (kind == "prefix" and end == len(pattern))
+                or (kind == "suffix" and end == len(desc))
+            ):
+                return True
+        # The empty pattern occurs nowhere in the scan, but matches everything
+        return any(not pattern for _, pattern in filters)
 
-        # Check suffix
-        if not matched:
-            for pattern in suffix_list:
-                if desc.endswith(pattern.upper()):
-                    matched = True
-                    break
+    matches = []
+    matched_descriptions = {}    # description string id -> matched
+    for row, category, rule_id in all_entries:
+        description_id = table.description_ids[row]
+        matched = matched_descriptions.get(description_id)
+        if matched is None:
+            matched = filter_matches(match_key(table.strings[description_id]))
+            matched_descriptions[description_id] = matched
 
         if matched:
-            matches.append((tx, category, rule_id))
+            matches.append((row, category, rule_id))
 
     if not matches:
         print("\nNo transactions matched the description filters.")
@@ -1038,9 +2243,10 @@ def print_description_debug(result, contains_list, prefix_list, suffix_list):
     print("-" * 110)
 
     # Sort by line number (or date – your choice)
-    matches.sort(key=lambda x: x[0].line_number)
+    matches.sort(key=lambda x: table.line_numbers[x[0]])
 
-    for tx, category, rule_id in matches:
+    for row, category, rule_id in matches:
+        tx = table.transaction(row)
         amount = tx.credit if tx.credit else tx.debit
         rule_display = rule_id if rule_id else "N/A"
         cat_display = category[:22]  # truncate to fit column
@@ -1057,195 +2263,215 @@ def print_description_debug(result, contains_list, prefix_list, suffix_list):
     print()
     print(f"Total displayed: {len(matches)} transactions")
 
+@profiled("print_facet_debug")
 def print_facet_debug(result, facets_to_display):
-    """
-    Print a summary table grouped by facet codes in the specified group.
-    facet_definitions: dict from the YAML (e.g., facets: {IHT: {codes: {...}}})
-
-    Args:
-        result: AnalysisResult object.
-        facet_group_name: The facet group to report (e.g., "IHT").
-        facet_definitions: The facet definitions from the control file.
-        control: ControlFile object (for people list).
-        ownership_report: False (no ownership), True (all owners), or str (specific owner).
-    """
-    if not facet_group_name:
+    """Print all transactions assigned to any of the given facet codes."""
+    if not facets_to_display:
         return
 
-    if facet_group_name not in facet_definitions:
-        print(f"ERROR: Facet group '{facet_group_name}' not found in control file.")
-        return
+    print()
+    print("============================================================")
+    print("DEBUG: TRANSACTIONS BY FACET")
+    print("============================================================")
+    print()
 
-    group = facet_definitions[facet_group_name]
-    codes_metadata = group["codes"]
+    # Print header
+    print(f"{'Line':>5}  {'Date':<12}  {'Type':<4}  {'Amount':>10}  {'Category':<22}  {'Rule':<15}  Description")
+    print("-" * 110)
+
+    printed = 0
+    category_rows = result.rows_by_category()
+    for facet in facets_to_display:
+        entries = [
+            (row, cat_id)
+            for cat_id, rows in category_rows.items()
+            for row in rows
+            if facet in result.facets(row)
+        ]
+        if not entries:
+            print(f"Facet '{facet}' has no transactions.")
+            continue
+
+        print(f"\n=== Facet: {facet} ({len(entries)} transactions) ===")
+        for row, cat_id in entries:
+            tx = result.table.transaction(row)
+            rule_id = result.rule_id(row)
+            amount = tx.credit if tx.credit else tx.debit
+            rule_display = rule_id if rule_id else "UNCAT"
+            print(
+                f"{tx.line_number:>5}  "
+                f"{tx.date.strftime('%Y-%m-%d'):<12}  "
+                f"{tx.transaction_type:<4}  "
+                f"{amount:>10,.2f}  "
+                f"{cat_id[:22]:<22}  "
+                f"{rule_display:<15}  "
+                f"{tx.description}"
+            )
+            printed += 1
+
+    print()
+    print(f"Total displayed: {printed} transactions")
+
+def aggregate_facet_totals(result, facet_definitions, fixed_point=False):
+    """
+    Total every facet code of every facet group in a single pass.
+
+    Uses only what analyse_transactions stored in the result (the facet
+    and ownership columns); no rules are evaluated.
+    With fixed_point, see aggregate_facet_totals_fixed_point().
+    Returns a dict: facet_code -> totals dict.
+    """
+    if fixed_point:
+        return aggregate_facet_totals_fixed_point(result, facet_definitions)
 
-    # Build a dictionary: facet_code -> totals
     facet_totals = {}
-    for code, meta in codes_metadata.items():
-        facet_totals[code] = {
-            "count": 0,
-            "total_credit": Decimal("0"),
-            "total_debit": Decimal("0"),
-            "owner_counts": {},
-            "owner_credits": {},
-            "owner_debits": {},
-        }
+    for group in facet_definitions.values():
+        for code in group["codes"]:
+            facet_totals[code] = {
+                "count": 0,
+                "total_credit": Decimal("0"),
+                "total_debit": Decimal("0"),
+                "owner_counts": {},
+                "owner_credits": {},
+                "owner_debits": {},
+            }
 
-    # Determine owners
-    owners = []
-    if ownership_report:
-        if ownership_report is True:
-            # Show all owners defined in the control file
-            owners = sorted(control.people.keys())
-        elif isinstance(ownership_report, str):
-            owners = [ownership_report]
+    table = result.table
+
+    # Resolve each distinct facet set and ownership once, not per row
+    facet_lists = [
+        [facet for facet in facet_set if facet in facet_totals]
+        for facet_set in result.facet_sets.values
+    ]
+    owner_shares = [
+        [
+            (owner, Decimal(percentage) / Decimal(100))
+            for owner, percentage in ownership
+            if percentage != 0
+        ]
+        for ownership in result.ownerships.values
+    ]
 
-    # Re-process transactions with ownership (using category_transactions)
-    for cat_id, entries in result.category_transactions.items():
-        for tx, rule_id in entries:
-            # Get ownership for this transaction
-            ownership = control.default_ownership
-            matched_rule = None
-            for rule in control.rules:
-                if match_rule(tx, rule):
-                    matched_rule = rule
-                    break
-            if matched_rule and matched_rule.ownership:
-                ownership = matched_rule.ownership
-
-            for facet in result.facet_assignments.get(tx, []):
-                if facet in facet_totals:
-                    facet_totals[facet]["count"] += 1
-                    facet_totals[facet]["total_credit"] += tx.credit
-                    facet_totals[facet]["total_debit"] += tx.debit
-
-                    for owner, percentage in ownership.items():
-                        if percentage == 0:
-                            continue
-                        share = Decimal(percentage) / Decimal(100)
-                        owner_credit = tx.credit * share
-                        owner_debit = tx.debit * share
-
-                        facet_totals[facet]["owner_counts"][owner] = (
-                            facet_totals[facet]["owner_counts"].get(owner, 0) + 1
-                        )
-                        facet_totals[facet]["owner_credits"][owner] = (
-                            facet_totals[facet]["owner_credits"].get(owner, Decimal("0")) + owner_credit
-                        )
-                        facet_totals[facet]["owner_debits"][owner] = (
-                            facet_totals[facet]["owner_debits"].get(owner, Decimal("0")) + owner_debit
-                        )
+    for cat_id, rows in result.rows_by_category().items():
+        for row in rows:
+            facets = facet_lists[result.facet_column[row]]
+            if not facets:
+                continue
 
-    # Print the summary
-    print()
-    print("============================================================")
-    print(f"FACET SUMMARY: {facet_group_name}")
-    print(f"Description: {group['description']}")
-    print("============================================================")
-    print()
+            credit = table.credit(row)
+            debit = table.debit(row)
 
-    # Build the two-line header if owners exist
-    if owners:
-        # First line: owner names, centered above their column groups
-        # Base indent: Facet(30) + Description(55) + Count(8) + In(15) = 108
-        indent = 108
-        owner_line = " " * indent
-        for owner in owners:
-            owner_line += f"{owner:^38}"
-        print(owner_line)
+            owner_amounts = [
+                (owner, credit * share, debit * share)
+                for owner, share in owner_shares[result.ownership_column[row]]
+            ]
 
-        # Second line: column labels
-        # Build the two-line header if owners exist
-        if owners:
-            # First line: owner names, centered above their column groups
-            # Base indent: Facet(30) + Description(55) + Count(8) + In(15) = 108
-            indent = 108
-            owner_line = " " * indent
-            for owner in owners:
-                # Each owner gets 3 columns: Count (8), In (15), Out (15) = 38 chars
-                # Plus 8 spaces gap between groups
-                owner_line += f"{owner:^38}"
-            print(owner_line)
+            for facet in facets:
+                totals = facet_totals[facet]
+                totals["count"] += 1
+                totals["total_credit"] += credit
+                totals["total_debit"] += debit
 
-            # Second line: column labels
-            header = f"{'Facet':<30} {'Description':<55} {'Count':>8} {'In':>15} {'Out':>15}"
-            for owner in owners:
-                header += " " * 8
-                header += f"{'Count':>8} {'In':>15} {'Out':>15}"
-            print(header)
+                for owner, owner_credit, owner_debit in owner_amounts:
+                    totals["owner_counts"][owner] = totals["owner_counts"].get(owner, 0) + 1
+                    totals["owner_credits"][owner] = (
+                        totals["owner_credits"].get(owner, Decimal("0")) + owner_credit
+                    )
+                    totals["owner_debits"][owner] = (
+                        totals["owner_debits"].get(owner, Decimal("0")) + owner_debit
+                    )
 
-            line_len = 108 + (46 * len(owners))  # 108 base + 38 columns + 8 gap per owner
-            print("-" * line_len)
-        else:
-            header = f"{'Facet':<30} {'Description':<55} {'Count':>8} {'In':>15} {'Out':>15}"
-            print(header)
-            print("-" * 110)
-    else:
-        header = f"{'Facet':<30} {'Description':<55} {'Count':>8} {'In':>15} {'Out':>15}"
-        print(header)
-        print("-" * 110)
+    return facet_totals
 
-    total_count = 0
-    total_in = Decimal("0")
-    total_out = Decimal("0")
+def aggregate_facet_totals_fixed_point(result, facet_definitions):
+    """
+    aggregate_facet_totals() for --fixed-point: amounts are totalled as
+    integer pence and share units (whole-number percentages only) and
+    converted to Decimal at the end.
+    """
+    # Accumulate in pence and share units (see from_share_units)
+    pence_totals = {}
+    for group in facet_definitions.values():
+        for code in group["codes"]:
+            pence_totals[code] = {
+                "count": 0,
+                "credit_pence": 0,
+                "debit_pence": 0,
+                "owner_counts": {},
+                "owner_credit_units": {},
+                "owner_debit_units": {},
+            }
 
-    for facet_code in sorted(facet_totals):
-        meta = codes_metadata.get(facet_code, {})
-        if meta.get("suppress_in_report", False):
-            continue
+    table = result.table
+
+    # Resolve each distinct facet set and ownership once, not per row
+    facet_lists = [
+        [facet for facet in facet_set if facet in pence_totals]
+        for facet_set in result.facet_sets.values
+    ]
+    owner_shares = [
+        share_percentages(dict(ownership))
+        for ownership in result.ownerships.values
+    ]
+
+    for cat_id, rows in result.rows_by_category().items():
+        for row in rows:
+            facets = facet_lists[result.facet_column[row]]
+            if not facets:
+                continue
 
-        totals = facet_totals[facet_code]
-        if totals["count"] == 0 and totals["total_credit"] == 0 and totals["total_debit"] == 0:
-            continue
+            credit = table.credit_pence[row]
+            debit = table.debit_pence[row]
 
-        desc = meta.get("description", "")
-        line = (
-            f"{facet_code:<30} "
-            f"{desc[:55]:<55} "
-            f"{totals['count']:>8} "
-            f"{totals['total_credit']:>15,.2f} "
-            f"{totals['total_debit']:>15,.2f}"
-        )
+            owner_amounts = [
+                (owner, credit * percentage, debit * percentage)
+                for owner, percentage in owner_shares[result.ownership_column[row]]
+            ]
 
-        if owners:
-            for owner in owners:
-                count = totals["owner_counts"].get(owner, 0)
-                credit = totals["owner_credits"].get(owner, Decimal("0"))
-                debit = totals["owner_debits"].get(owner, Decimal("0"))
-                line += " " * 8
-                line += f"{count:>8} {credit:>15,.2f} {debit:>15,.2f}"
-        print(line)
+            for facet in facets:
+                totals = pence_totals[facet]
+                totals["count"] += 1
+                totals["credit_pence"] += credit
+                totals["debit_pence"] += debit
 
-        total_count += totals["count"]
-        total_in += totals["total_credit"]
-        total_out += totals["total_debit"]
+                for owner, owner_credit, owner_debit in owner_amounts:
+                    totals["owner_counts"][owner] = totals["owner_counts"].get(owner, 0) + 1
+                    totals["owner_credit_units"][owner] = (
+                        totals["owner_credit_units"].get(owner, 0) + owner_credit
+                    )
+                    totals["owner_debit_units"][owner] = (
+                        totals["owner_debit_units"].get(owner, 0) + owner_debit
+                    )
 
-    print("-" * line_len)
-    line = (
-        f"{'TOTAL':<30} "
-        f"{'':<55} "
-        f"{total_count:>8} "
-        f"{total_in:>15,.2f} "
-        f"{total_out:>15,.2f}"
-    )
-    if owners:
-        for owner in owners:
-            owner_count = sum(facet_totals[f]["owner_counts"].get(owner, 0) for f in facet_totals)
-            owner_credit = sum(facet_totals[f]["owner_credits"].get(owner, Decimal("0")) for f in facet_totals)
-            owner_debit = sum(facet_totals[f]["owner_debits"].get(owner, Decimal("0")) for f in facet_totals)
-            line += " " * 8
-            line += f"{owner_count:>8} {owner_credit:>15,.2f} {owner_debit:>15,.2f}"
-    print(line)
+    # Convert back to Decimal for the report
+    facet_totals = {}
+    for code, totals in pence_totals.items():
+        facet_totals[code] = {
+            "count": totals["count"],
+            "total_credit": from_pence(totals["credit_pence"]),
+            "total_debit": from_pence(totals["debit_pence"]),
+            "owner_counts": totals["owner_counts"],
+            "owner_credits": {
+                owner: from_share_units(units)
+                for owner, units in totals["owner_credit_units"].items()
+            },
+            "owner_debits": {
+                owner: from_share_units(units)
+                for owner, units in totals["owner_debit_units"].items()
+            },
+        }
 
-    print()
-    print(f"Net surplus (in - out): £{total_in - total_out:,.2f}")
+    return facet_totals
 
+@profiled("validate_compulsory_facets", counts=lambda errors: {"errors": len(errors)})
 def validate_compulsory_facets(result, required_prefixes):
     """Check that every transaction has at least one facet from each required prefix."""
     errors = []
-    for tx, assigned_facets in result.facet_assignments.items():
+    for row in range(len(result.table)):
+        assigned_facets = list(result.facets(row))
         for prefix in required_prefixes:
             if not any(f.startswith(prefix) for f in assigned_facets):
+                tx = result.table.transaction(row)
                 errors.append(
                     f"Line {tx.line_number}: {tx.date.strftime('%Y-%m-%d')} "
                     f"{tx.transaction_type} {tx.description} "
@@ -1254,7 +2480,12 @@ def validate_compulsory_facets(result, required_prefixes):
                 break  # Only report once per transaction (first missing prefix)
     return errors
 
-def print_facet_summary(result, facet_group_name, facet_definitions, control, ownership_report=None):
+@profiled(
+    "print_facet_summary",
+    details=lambda result, facet_group_name, *args, **kwargs: {"facet_group": facet_group_name},
+)
+def print_facet_summary(result, facet_group_name, facet_definitions, control, ownership_report=None, engine="python",
+                        fixed_point=False):
     """
     Print a summary table grouped by facet codes in the specified group.
     facet_definitions: dict from the YAML (e.g., facets: {IHT: {codes: {...}}})
@@ -1265,6 +2496,8 @@ def print_facet_summary(result, facet_group_name, facet_definitions, control, ow
         facet_definitions: The facet definitions from the control file.
         control: ControlFile object (for people list).
         ownership_report: False (no ownership), True (all owners), or str (specific owner).
+        engine: "python" or "vectorised" (how the facet totals are aggregated).
+        fixed_point: Total the facets in integer pence (--fixed-point).
     """
     if not facet_group_name:
         return
@@ -1276,17 +2509,12 @@ def print_facet_summary(result, facet_group_name, facet_definitions, control, ow
     group = facet_definitions[facet_group_name]
     codes_metadata = group["codes"]
 
-    # Build a dictionary: facet_code -> totals
-    facet_totals = {}
-    for code, meta in codes_metadata.items():
-        facet_totals[code] = {
-            "count": 0,
-            "total_credit": Decimal("0"),
-            "total_debit": Decimal("0"),
-            "owner_counts": {},
-            "owner_credits": {},
-            "owner_debits": {},
-        }
+    # Aggregate all facet groups in one pass, then pick out this group
+    if engine == "vectorised":
+        all_facet_totals = aggregate_facet_totals_vectorised(result, facet_definitions, fixed_point)
+    else:
+        all_facet_totals = aggregate_facet_totals(result, facet_definitions, fixed_point)
+    facet_totals = {code: all_facet_totals[code] for code in codes_metadata}
 
     # Determine owners
     owners = []
@@ -1297,34 +2525,6 @@ def print_facet_summary(result, facet_group_name, facet_definitions, control, ow
         elif isinstance(ownership_report, str):
             owners = [ownership_report]
 
-    # Re-process transactions with ownership using stored tx_ownership
-    for cat_id, entries in result.category_transactions.items():
-        for tx, rule_id in entries:
-            ownership = result.tx_ownership.get(tx, control.default_ownership)
-
-            for facet in result.facet_assignments.get(tx, []):
-                if facet in facet_totals:
-                    facet_totals[facet]["count"] += 1
-                    facet_totals[facet]["total_credit"] += tx.credit
-                    facet_totals[facet]["total_debit"] += tx.debit
-
-                    for owner, percentage in ownership.items():
-                        if percentage == 0:
-                            continue
-                        share = Decimal(percentage) / Decimal(100)
-                        owner_credit = tx.credit * share
-                        owner_debit = tx.debit * share
-
-                        facet_totals[facet]["owner_counts"][owner] = (
-                            facet_totals[facet]["owner_counts"].get(owner, 0) + 1
-                        )
-                        facet_totals[facet]["owner_credits"][owner] = (
-                            facet_totals[facet]["owner_credits"].get(owner, Decimal("0")) + owner_credit
-                        )
-                        facet_totals[facet]["owner_debits"][owner] = (
-                            facet_totals[facet]["owner_debits"].get(owner, Decimal("0")) + owner_debit
-                        )
-
     # Print the summary
     print()
     print("============================================================")
@@ -1430,18 +2630,100 @@ TRANSACTION_RULES = {
     "TFR": {},
 }
 
-def validate_transaction_types(
-    transactions,
-    verbose,
-    stats,
-):
-    seen_types = set()
+# ------------------------------------------------------------
+# Statement checks
+#
+# Each check is a pipeline stage: check(tx) is called for every
+# transaction in statement (newest first) order and finish() once at
+# the end.  run_statement_checks() threads a stream of transactions
+# through a list of stages, so a statement can be verified (and
+# classified) while it is still being read.
+# ------------------------------------------------------------
 
+def run_statement_checks(transactions, stages):
+    """Yield each transaction after passing it through every stage; finish the stages at the end."""
     for tx in transactions:
+        for stage in stages:
+            stage.check(tx)
+        yield tx
+
+    for stage in stages:
+        stage.finish()
+
+def apply_statement_checks(transactions, stages):
+    """Run the stages over transactions without keeping them."""
+    for _ in run_statement_checks(transactions, stages):
+        pass
+
+class StatementAccountCheck:
+    """Warn about rows from a different account and about unknown transaction types."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.expected_sort_code = None
+        self.expected_account_number = None
+        self.unknown_transaction_types = set()
+
+    def check(self, tx):
+        if self.expected_sort_code is None:
+            self.expected_sort_code = tx.sort_code
+            self.expected_account_number = tx.account_number
+
+        if tx.sort_code != self.expected_sort_code:
+            print_warning(
+                f"line {tx.line_number}: unexpected sort code "
+                f"'{tx.sort_code}'",
+                self.stats,
+            )
+
+        if tx.account_number != self.expected_account_number:
+            print_warning(
+                f"line {tx.line_number}: unexpected account number "
+                f"'{tx.account_number}'",
+                self.stats,
+            )
+
+        if tx.transaction_type not in KNOWN_TRANSACTION_TYPES:
+            self.unknown_transaction_types.add(tx.transaction_type)
+
+    def finish(self):
+        for tx_type in sorted(self.unknown_transaction_types):
+            print_warning(
+                f"unknown transaction type '{tx_type}'",
+                self.stats,
+            )
+
+class TransactionCountCheck:
+    """Fail if the statement is empty, otherwise report how many transactions it has."""
+
+    def __init__(self, verbose, stats):
+        self.verbose = verbose
+        self.stats = stats
+        self.count = 0
+
+    def check(self, tx):
+        self.count += 1
+
+    def finish(self):
+        if not self.count:
+            raise RuntimeError("statement contains no transactions")
+
+        print_pass(f"{self.count} transactions loaded", self.verbose, self.stats)
+
+class TransactionTypeCheck:
+    """Warn about unknown types and amounts on the wrong side for their type."""
+
+    def __init__(self, verbose, stats):
+        self.verbose = verbose
+        self.stats = stats
+        self.seen_types = set()
+
+    def check(self, tx):
+        stats = self.stats
 
         tx_type = tx.transaction_type
 
-        seen_types.add(tx_type)
+        self.seen_types.add(tx_type)
 
         if tx_type not in TRANSACTION_RULES:
             print_warning(
@@ -1450,7 +2732,7 @@ def validate_transaction_types(
                 f"on line {tx.line_number}",
                 stats,
             )
-            continue
+            return
 
         rules = TRANSACTION_RULES[tx_type]
 
@@ -1467,190 +2749,1322 @@ def validate_transaction_types(
 
         if rules.get("debit_only"):
 
-            if tx.credit != 0:
-                print_warning(
-                    f"line {tx.line_number}: "
-                    f"{tx_type} expected money out "
-                    f"but credit amount is "
-                    f"£{tx.credit:,.2f}",
-                    stats,
-                )
+            if tx.credit != 0:
+                print_warning(
+                    f"line {tx.line_number}: "
+                    f"{tx_type} expected money out "
+                    f"but credit amount is "
+                    f"£{tx.credit:,.2f}",
+                    stats,
+                )
+
+    def finish(self):
+        print_pass(
+            f"{len(self.seen_types)} transaction types analysed",
+            self.verbose,
+            self.stats,
+        )
+
+class ReverseChronologicalCheck:
+    """Fail as soon as a transaction is newer than the one before it."""
+
+    def __init__(self, verbose, stats):
+        self.verbose = verbose
+        self.stats = stats
+        self.previous = None
+
+    def check(self, tx):
+        if self.previous is not None:
+
+            if tx.date > self.previous:
+                raise RuntimeError(
+                    "Statement is not in reverse "
+                    "chronological order"
+                )
+
+        self.previous = tx.date
+
+    def finish(self):
+        print_pass(
+            "statement is in reverse chronological order",
+            self.verbose,
+            self.stats,
+        )
+
+class TaxYearCheck:
+    """Work out the tax year from the oldest transaction and warn about gaps at either end."""
+
+    def __init__(self, verbose, stats):
+        self.verbose = verbose
+        self.stats = stats
+        self.newest = None
+        self.oldest = None
+        self.start_year = None
+
+    def check(self, tx):
+        if self.newest is None:
+            self.newest = tx.date
+        self.oldest = tx.date
+
+    def finish(self):
+        stats = self.stats
+        newest = self.newest
+        oldest = self.oldest
+
+        start_year = oldest.year
+
+        if oldest.month < 4:
+            start_year -= 1
+
+        if oldest.month == 4 and oldest.day < 6:
+            start_year -= 1
+
+        expected_start = datetime(start_year, 4, 6)
+        expected_end = datetime(start_year + 1, 4, 5)
+
+        start_gap = (oldest.date() - expected_start.date()).days
+
+        if start_gap > ALLOWED_DAYS_GAP_AT_START:
+            print_warning(
+                f"statement starts on "
+                f"{oldest.strftime('%d-%b-%Y')} "
+                f"({start_gap} days after expected start "
+                f"{expected_start.strftime('%d-%b-%Y')})",
+                stats,
+            )
+
+        end_gap = (expected_end.date() - newest.date()).days
+
+        if end_gap > ALLOWED_DAYS_GAP_AT_END:
+            print_warning(
+                f"statement ends on "
+                f"{newest.strftime('%d-%b-%Y')} "
+                f"({end_gap} days before expected end "
+                f"{expected_end.strftime('%d-%b-%Y')})",
+                stats,
+            )
+
+        print_pass(
+            f"tax year appears to be "
+            f"{start_year}/{str(start_year + 1)[2:]}",
+            self.verbose,
+            stats,
+        )
+
+        self.start_year = start_year
+
+class BalanceCheck:
+    """
+    Verify every running balance.
+
+    Transactions arrive newest first, so each one is checked against the
+    next (older) one: newer.balance must equal older.balance plus the
+    newer transaction's credit minus its debit.  Like the oldest-first
+    calculation, the mismatch reported is the oldest one; it is raised
+    from finish().
+    """
+
+    def __init__(self, verbose, stats):
+        self.verbose = verbose
+        self.stats = stats
+        self.newer = None
+        self.closing_balance = None
+        self.opening_balance = None
+        self.checked = 0
+        self.mismatch = None
+
+    def check(self, tx):
+        newer = self.newer
+        if newer is None:
+            self.closing_balance = tx.balance
+        else:
+            calculated_balance = (
+                tx.balance
+                + newer.credit
+                - newer.debit
+            )
+
+            if calculated_balance != newer.balance:
+                self.mismatch = (
+                    f"Balance mismatch on line "
+                    f"{newer.line_number}: "
+                    f"expected {newer.balance} "
+                    f"calculated {calculated_balance}"
+                )
+
+        self.newer = tx
+        self.checked += 1
+
+    def finish(self):
+        if self.mismatch is not None:
+            raise RuntimeError(self.mismatch)
+
+        oldest = self.newer
+        self.opening_balance = (
+            oldest.balance
+            - oldest.credit
+            + oldest.debit
+        )
+
+        print_pass(
+            f"{self.checked} balances verified",
+            self.verbose,
+            self.stats,
+        )
+
+class MonthlyTotalsCheck:
+    """Accumulate money in/out per month (in integer pence with fixed_point)."""
+
+    def __init__(self, fixed_point=False):
+        self.fixed_point = fixed_point
+        self.money_in = defaultdict(int if fixed_point else Decimal)
+        self.money_out = defaultdict(int if fixed_point else Decimal)
+
+    def check(self, tx):
+        month_key = tx.date.strftime("%Y-%m")
+        if self.fixed_point:
+            self.money_in[month_key] += fixed_point_pence(tx.credit, tx.line_number)
+            self.money_out[month_key] += fixed_point_pence(tx.debit, tx.line_number)
+        else:
+            self.money_in[month_key] += tx.credit
+            self.money_out[month_key] += tx.debit
+
+    def finish(self):
+        pass
+
+    def totals(self):
+        """Return (monthly, total_in, total_out) in the calculate_monthly_totals form."""
+        if self.fixed_point:
+            return monthly_totals_from_pence(self.money_in, self.money_out)
+
+        monthly = defaultdict(
+            lambda: {
+                "money_in": Decimal("0"),
+                "money_out": Decimal("0"),
+            }
+        )
+        for month_key in self.money_in:
+            monthly[month_key]["money_in"] = self.money_in[month_key]
+            monthly[month_key]["money_out"] = self.money_out[month_key]
+
+        return monthly, sum(self.money_in.values(), Decimal("0")), sum(self.money_out.values(), Decimal("0"))
+
+@profiled("validate_transaction_types", details=transactions_details)
+def validate_transaction_types(
+    transactions,
+    verbose,
+    stats,
+):
+    apply_statement_checks(transactions, [TransactionTypeCheck(verbose, stats)])
+
+_rules_cache = {}
+
+def load_rules_file(filename, control=None):
+    """
+    Load a rules file (YAML with a 'rules' list) and return the list of
+    Rule objects, highest priority first. With control, the categories,
+    facets and people the rules refer to are checked against it.
+    Raises ConfigError (a ValueError) if the file is not valid.
+    """
+    if filename in _rules_cache:
+        return _rules_cache[filename]
+
+    rules = read_rules_file(filename, control)
+    _rules_cache[filename] = rules
+    return rules
+
+_compiled_rules_cache = {}
+
+def load_compiled_rules_file(filename, control=None):
+    """Load a rules file and return it as a CompiledRuleSet (built once per file)."""
+    if filename in _compiled_rules_cache:
+        return _compiled_rules_cache[filename]
+
+    if _watch_session is not None:
+        _watch_session.track(filename)
+
+    with profile_stage("load_rules_file", file=filename) as stage:
+        compiled = compile_rules(load_rules_file(filename, control))
+        stage.count(rules=len(compiled))
+
+    if _profiler is not None:
+        _profiler.watch_rules(filename, compiled)
+
+    _compiled_rules_cache[filename] = compiled
+    return compiled
+
+def get_rules_for_type(statement_type, control):
+    """Look up and load the compiled rules for a given statement type."""
+    if statement_type not in control.statement_handling:
+        raise ValueError(f"No rules file defined for statement type '{statement_type}'")
+    rules_file = control.statement_handling[statement_type]
+    return load_compiled_rules_file(rules_file, control)
+
+# ------------------------------------------------------------
+# Rule hit statistics (--rule-stats)
+# ------------------------------------------------------------
+
+@dataclass
+class RuleHits:
+    """
+    How the rules of one rules file matched a set of transactions.
+
+    patterns maps (candidates, matches) to the number of transactions
+    with that combination: candidates are the positions passing the
+    description and type index, matches those that also pass the other
+    constraints. The first match is the rule that classified the
+    transaction.
+    """
+    rules_file: str
+    compiled: CompiledRuleSet
+    transactions: int = 0
+    patterns: dict = field(default_factory=dict)
+
+def collect_rule_hits(hits, transactions):
+    """Add the candidate and matching rules of each transaction to hits."""
+    compiled = hits.compiled
+    patterns = hits.patterns
+
+    for tx in transactions:
+        candidates = tuple(compiled.candidates(match_key(tx.description), tx.transaction_type))
+        matches = tuple(
+            position for position in candidates
+            if match_rule_constraints(tx, compiled.rules[position])
+        )
+        key = (candidates, matches)
+        patterns[key] = patterns.get(key, 0) + 1
+        hits.transactions += 1
+
+def rule_evaluation_cost(hits, order):
+    """
+    Return (linear, indexed): the total rule evaluations over all the
+    transactions if rules were tried in order (a list of positions, which
+    may leave rules out), by a linear match_rule scan and by the
+    CompiledRuleSet index respectively.
+    """
+    rank = {position: index for index, position in enumerate(order)}
+    linear = 0
+    indexed = 0
+
+    for (candidates, matches), count in hits.patterns.items():
+        kept = [rank[position] for position in candidates if position in rank]
+        winners = [rank[position] for position in matches if position in rank]
+        if winners:
+            winner = min(winners)
+            linear += (winner + 1) * count
+            indexed += sum(1 for r in kept if r <= winner) * count
+        else:
+            linear += len(order) * count
+            indexed += len(kept) * count
+
+    return linear, indexed
+
+def suggest_rule_order(hits, won):
+    """
+    Order the rules by how many transactions they classified, most first,
+    without changing any classification: rules that both matched the
+    same transaction keep their relative order.
+    """
+    rule_count = len(hits.compiled.rules)
+    must_follow = [set() for _ in range(rule_count)]
+    waiting_on = [0] * rule_count
+
+    for candidates, matches in hits.patterns:
+        for index, earlier in enumerate(matches):
+            for later in matches[index + 1:]:
+                if later not in must_follow[earlier]:
+                    must_follow[earlier].add(later)
+                    waiting_on[later] += 1
+
+    ready = [(-won[position], position) for position in range(rule_count) if not waiting_on[position]]
+    heapq.heapify(ready)
+
+    order = []
+    while ready:
+        _, position = heapq.heappop(ready)
+        order.append(position)
+        for later in must_follow[position]:
+            waiting_on[later] -= 1
+            if not waiting_on[later]:
+                heapq.heappush(ready, (-won[later], later))
+
+    return order
+
+def print_rule_hit_report(hits):
+    """
+    Print match counts per rule, flag dead and shadowed rules, and suggest
+    an order (and pruning) that lowers the rules evaluated per transaction
+    while classifying these transactions exactly as now.
+    """
+    rules = hits.compiled.rules
+    rule_count = len(rules)
+
+    won = [0] * rule_count
+    matchable = [0] * rule_count
+    shadowed_by = [defaultdict(int) for _ in range(rule_count)]
+
+    for (candidates, matches), count in hits.patterns.items():
+        if not matches:
+            continue
+        winner = matches[0]
+        won[winner] += count
+        for position in matches:
+            matchable[position] += count
+        for position in matches[1:]:
+            shadowed_by[position][winner] += count
+
+    print()
+    print("============================================================")
+    print(f"RULE HIT STATISTICS – {hits.rules_file}")
+    print("============================================================")
+    print()
+    print(f"Transactions : {hits.transactions}")
+    print(f"Rules        : {rule_count}")
+    print()
+
+    print(f"{'Rule':30} {'Priority':>8} {'Matched':>9} {'Matchable':>9}  Status")
+    print("-" * 80)
+
+    for position, rule in enumerate(rules):
+        if not matchable[position]:
+            status = "dead"
+        elif not won[position]:
+            blockers = sorted(shadowed_by[position].items(), key=lambda item: (-item[1], item[0]))
+            status = "shadowed by " + ", ".join(f"{rules[blocker].id} ({count})" for blocker, count in blockers)
+        else:
+            status = ""
+        print(f"{rule.id:30} {rule.priority:>8} {won[position]:>9} {matchable[position]:>9}  {status}")
+
+    print()
+    print("Matched   = transactions the rule classified")
+    print("Matchable = transactions the rule matches, whether or not an earlier rule won")
+
+    if not hits.transactions:
+        return
+
+    current = list(range(rule_count))
+    suggested = suggest_rule_order(hits, won)
+    pruned = [position for position in suggested if won[position]]
+
+    print()
+    print("Average rules evaluated per transaction:")
+    print()
+    print(f"{'Order':30} {'Linear':>9} {'Indexed':>9}")
+    print("-" * 50)
+    for label, order in (
+        ("current", current),
+        ("suggested", suggested),
+        ("suggested, pruned", pruned),
+    ):
+        linear, indexed = rule_evaluation_cost(hits, order)
+        print(f"{label:30} {linear / hits.transactions:>9.2f} {indexed / hits.transactions:>9.2f}")
+
+    print()
+    print("Linear  = match_rule calls when scanning the rules in order")
+    print("Indexed = constraint checks after the description/type index")
+
+    if suggested != current:
+        print()
+        print("Suggested order (classification of these transactions unchanged):")
+        print()
+        print(f"{'Rule':30} {'Priority':>8} {'Suggested':>9}")
+        print("-" * 50)
+        for index, position in enumerate(suggested):
+            rule = rules[position]
+            print(f"{rule.id:30} {rule.priority:>8} {(rule_count - index) * 10:>9}")
+
+    unused = [rules[position].id for position in current if not won[position]]
+    if unused:
+        print()
+        print("Rules that classified none of these transactions (candidates for pruning):")
+        for rule_id in unused:
+            print(f"  {rule_id}")
+
+def report_rule_hits(tax_years, control, verbose, stats, cache=None):
+    """
+    Load every statement in tax_years, match it against its rules file and
+    print a rule hit report per rules file (--rule-stats).
+    """
+    hits_by_file = {}
+
+    for ty in tax_years:
+        for stmt in ty.get('statements', []):
+            stmt_type = stmt['type']
+            stmt_file = stmt['file']
+
+            try:
+                transactions = load_statement_by_type(stmt_type, stmt_file, verbose, stats, cache)
+                if not transactions:
+                    print_warning(f"No transactions loaded from {stmt_file}", stats)
+                    continue
+
+                try:
+                    compiled = get_rules_for_type(stmt_type, control)
+                except ValueError as e:
+                    print_error(str(e), stats)
+                    continue
+
+            except NotImplementedError as e:
+                print_error(str(e), stats)
+                continue
+            except Exception as e:
+                print_error(f"Error processing {stmt_file}: {e}", stats)
+                continue
+
+            rules_file = control.statement_handling[stmt_type]
+            hits = hits_by_file.get(rules_file)
+            if hits is None:
+                hits = RuleHits(rules_file=rules_file, compiled=compiled)
+                hits_by_file[rules_file] = hits
+
+            collect_rule_hits(hits, transactions)
+
+    for hits in hits_by_file.values():
+        print_rule_hit_report(hits)
+
+class StatementCache:
+    """
+    On-disk cache of parsed statements, stored in an SQLite file.
+
+    Each entry is keyed by the statement's absolute path and records the
+    file size, mtime and SHA-256 of its contents alongside the pickled
+    list of Transaction objects.  An entry is used when size and mtime
+    are unchanged; if only the mtime differs the contents are re-hashed
+    and the entry is still used when the hash matches.  Anything else
+    is a miss and the statement is parsed again.
+
+    Cache problems (corrupt file, stale pickle format) are treated as a
+    miss rather than an error.  If the SQLite file cannot be opened,
+    read or written (not a database, unwritable directory) a warning is
+    printed once and the run carries on without the cache.
+    """
+
+    TABLE = "statements"
+    DESCRIPTION = "statement cache"
+
+    # Bump whenever the Transaction fields or the payload layout change
+    FORMAT_VERSION = 1
+
+    def __init__(self, filename, stats):
+        import sqlite3
+
+        self.filename = filename
+        self.stats = stats
+        self.connection = None
+        try:
+            self.connection = sqlite3.connect(filename, timeout=30)
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.TABLE} ("
+                " path TEXT PRIMARY KEY,"
+                " size INTEGER NOT NULL,"
+                " mtime_ns INTEGER NOT NULL,"
+                " sha256 TEXT NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " payload BLOB NOT NULL)"
+            )
+            self.connection.commit()
+        except sqlite3.Error as exc:
+            self.disable(exc)
+
+    @property
+    def usable(self):
+        """False once the cache has been given up on (see disable)."""
+        return self.connection is not None
+
+    def disable(self, exc):
+        """Warn that the SQLite file failed with exc and stop using it."""
+        import sqlite3
+
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except sqlite3.Error:
+                pass
+            self.connection = None
+        print_warning(f"{self.DESCRIPTION} {self.filename} not used: {exc}", self.stats)
+
+    @staticmethod
+    def hash_file(path):
+        import hashlib
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as infile:
+            for block in iter(lambda: infile.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def get_payload(self, path):
+        """Return the unpickled payload stored for path, or None on a miss."""
+        import pickle
+        import sqlite3
+
+        if self.connection is None:
+            return None
+
+        path = os.path.abspath(path)
+        st = os.stat(path)
+
+        try:
+            row = self.connection.execute(
+                "SELECT size, mtime_ns, sha256, version, payload"
+                f" FROM {self.TABLE} WHERE path = ?",
+                (path,),
+            ).fetchone()
+        except sqlite3.Error as exc:
+            self.disable(exc)
+            return None
+
+        if row is None:
+            return None
+
+        size, mtime_ns, sha256, version, payload = row
+        if version != self.FORMAT_VERSION or size != st.st_size:
+            return None
+
+        if mtime_ns != st.st_mtime_ns:
+            if self.hash_file(path) != sha256:
+                return None
+            # Contents unchanged (e.g. file touched or copied): refresh mtime
+            try:
+                self.connection.execute(
+                    f"UPDATE {self.TABLE} SET mtime_ns = ? WHERE path = ?",
+                    (st.st_mtime_ns, path),
+                )
+                self.connection.commit()
+            except sqlite3.Error as exc:
+                self.disable(exc)
+
+        try:
+            return pickle.loads(payload)
+        except Exception:
+            return None
+
+    def put_payload(self, path, data):
+        """Pickle data and store it for path."""
+        import pickle
+        import sqlite3
+
+        if self.connection is None:
+            return
+
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+
+        try:
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO {self.TABLE}"
+                " (path, size, mtime_ns, sha256, version, payload)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (path, st.st_size, st.st_mtime_ns, self.hash_file(path),
+                 self.FORMAT_VERSION, payload),
+            )
+            self.connection.commit()
+        except sqlite3.Error as exc:
+            self.disable(exc)
+
+    def get(self, path):
+        """Return the cached transactions for path, or None on a miss."""
+        rows = self.get_payload(path)
+        if rows is None:
+            return None
+
+        try:
+            return [Transaction(*row) for row in rows]
+        except Exception:
+            return None
+
+    def put(self, path, transactions):
+        """Store the parsed transactions for path."""
+        # Store plain field tuples: smaller and faster to unpickle than dataclasses
+        rows = [
+            (tx.line_number, tx.date, tx.transaction_type, tx.description,
+             tx.debit, tx.credit, tx.balance, tx.sort_code, tx.account_number)
+            for tx in transactions
+        ]
+        self.put_payload(path, rows)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+def default_statement_cache_path(data_file):
+    """Return the statement cache file used for a data file (stored beside it)."""
+    base, _ = os.path.splitext(os.path.abspath(data_file))
+    return base + ".statement-cache.sqlite"
+
+# ------------------------------------------------------------
+# Incremental re-analysis (--incremental)
+# ------------------------------------------------------------
+
+def rule_fingerprint(rule):
+    """
+    Return a digest of everything that decides which transactions a rule
+    matches and how it classifies them. Priority is left out: a rule's
+    position is compared separately (see stale_winners).
+    """
+    definition = [
+        rule.id,
+        [(cond.type, cond.value) for cond in rule.conditions],
+        rule.category,
+        rule.ownership,
+        sorted(rule.transaction_types) if rule.transaction_types is not None else None,
+        rule.direction,
+        rule.when,
+        rule.facets,
+    ]
+    import hashlib
+    import json
+
+    text = json.dumps(definition, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def analysis_context(control, fixed_point):
+    """
+    Return a digest of the control-file settings used to resolve a match
+    into category, facets and ownership, and of the aggregation mode.
+    A stored analysis is only patched if this is unchanged.
+    """
+    context = [
+        control.default_category,
+        control.default_ownership,
+        {category_id: category.default_facets for category_id, category in control.categories.items()},
+        fixed_point,
+    ]
+    import hashlib
+    import json
+
+    text = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def stale_winners(stored_rules, current_rules):
+    """
+    Return the rule ids (None for "no rule matched") whose transactions
+    must be matched again after the rules change from stored_rules to
+    current_rules, both lists of (rule id, fingerprint) in priority order.
+
+    A transaction keeps its winning rule W if W is unchanged and every
+    rule now ahead of W was also ahead of W before, unchanged: those
+    rules did not match it then and cannot now. Transactions no rule
+    matched are kept if every current rule existed, unchanged, before.
+    """
+    stored_ids = [rule_id for rule_id, _ in stored_rules]
+    current_ids = [rule_id for rule_id, _ in current_rules]
+    if len(set(stored_ids)) != len(stored_ids) or len(set(current_ids)) != len(current_ids):
+        # Winners are recorded by rule id, so duplicate ids are ambiguous
+        return set(stored_ids) | {None}
+
+    stored_position = {entry: position for position, entry in enumerate(stored_rules)}
+    missing = len(stored_rules)
+
+    # latest_before[j]: the largest stored position among current_rules[:j]
+    # (missing if any of them is new or changed)
+    latest_before = [-1]
+    for entry in current_rules:
+        latest_before.append(max(latest_before[-1], stored_position.get(entry, missing)))
+
+    current_position = {entry: position for position, entry in enumerate(current_rules)}
+
+    stale = set()
+    for position, entry in enumerate(stored_rules):
+        now = current_position.get(entry)
+        if now is None or latest_before[now] >= position:
+            stale.add(entry[0])
+    if latest_before[-1] >= missing:
+        stale.add(None)
+
+    return stale
+
+def apply_row_totals(result, row, category, ownership, fixed_point, sign):
+    """Add (sign 1) or remove (sign -1) one row's amounts in the category and owner totals."""
+    summary = result.summaries[result.categories[category]]
+    table = result.table
+    credit_pence = table.credit_pence[row]
+    debit_pence = table.debit_pence[row]
+
+    summary.transaction_count += sign
+
+    if fixed_point:
+        summary.credit_pence += sign * credit_pence
+        summary.debit_pence += sign * debit_pence
+    else:
+        credit = table.credit(row)
+        debit = table.debit(row)
+        summary.total_credit += sign * credit
+        summary.total_debit += sign * debit
+
+    for owner, percentage in result.ownerships[ownership]:
+        if percentage == 0:
+            continue
+
+        count = summary.owner_counts.get(owner, 0) + sign
+        if fixed_point:
+            credit_units = summary.owner_credit_units.get(owner, 0) + sign * credit_pence * percentage
+            debit_units = summary.owner_debit_units.get(owner, 0) + sign * debit_pence * percentage
+        else:
+            share = Decimal(percentage) / Decimal(100)
+            owner_credit = summary.owner_credits.get(owner, Decimal("0")) + sign * (credit * share)
+            owner_debit = summary.owner_debits.get(owner, Decimal("0")) + sign * (debit * share)
+
+        if count == 0:
+            # Drop the owner, as if it had never had a row in this category
+            del summary.owner_counts[owner]
+            if fixed_point:
+                del summary.owner_credit_units[owner], summary.owner_debit_units[owner]
+            else:
+                del summary.owner_credits[owner], summary.owner_debits[owner]
+            continue
+
+        summary.owner_counts[owner] = count
+        if fixed_point:
+            summary.owner_credit_units[owner] = credit_units
+            summary.owner_debit_units[owner] = debit_units
+        else:
+            summary.owner_credits[owner] = owner_credit
+            summary.owner_debits[owner] = owner_debit
+
+def reanalyse_transactions(result, stored_rules, rules, control, fixed_point=False):
+    """
+    Patch a stored AnalysisResult after its rules changed.
+
+    Only the rows of stale_winners() are matched again. Where a row's
+    category, rule, facets or ownership changes, its old contribution is
+    taken off the category and owner totals and the new one added.
+    Returns the number of rows matched again.
+    """
+    compiled = compile_rules(rules)
+    stale = stale_winners(stored_rules, compiled.fingerprints())
+    if not stale:
+        return 0
+
+    stale_ids = set()
+    for rule_id in stale:
+        if rule_id is None:
+            stale_ids.add(NO_RULE)
+        elif rule_id in result.rule_ids.ids:
+            stale_ids.add(result.rule_ids.ids[rule_id])
+
+    rows = [row for row, rule in enumerate(result.rule_column) if rule in stale_ids]
+
+    resolved = {}
+    for row in rows:
+        matched_rule = compiled.first_match(result.table.transaction(row))
+
+        key = id(matched_rule)
+        columns = resolved.get(key)
+        if columns is None:
+            if matched_rule is None:
+                category_id = control.default_category
+                assigned_facets = control.categories[category_id].default_facets
+                ownership = control.default_ownership
+            else:
+                category_id = matched_rule.category
+                if matched_rule.facets is not None:
+                    assigned_facets = matched_rule.facets
+                else:
+                    assigned_facets = control.categories[category_id].default_facets
+                ownership = resolve_ownership(None, matched_rule, control)
+
+            columns = (
+                result.categories.intern(category_id),
+                NO_RULE if matched_rule is None else result.rule_ids.intern(matched_rule.id),
+                result.facet_sets.intern(tuple(assigned_facets)),
+                result.ownerships.intern(tuple(ownership.items())),
+            )
+            resolved[key] = columns
+
+        old_columns = (
+            result.category_column[row],
+            result.rule_column[row],
+            result.facet_column[row],
+            result.ownership_column[row],
+        )
+        if columns == old_columns:
+            continue
+
+        apply_row_totals(result, row, old_columns[0], old_columns[3], fixed_point, -1)
+        result.category_column[row] = columns[0]
+        result.rule_column[row] = columns[1]
+        result.facet_column[row] = columns[2]
+        result.ownership_column[row] = columns[3]
+        apply_row_totals(result, row, columns[0], columns[3], fixed_point, 1)
+
+    return len(rows)
+
+class AnalysisStore(StatementCache):
+    """
+    On-disk store of per-statement analysis results for --incremental.
+
+    Entries are keyed and checked against the statement file exactly like
+    StatementCache entries. Each one holds the rules file, the
+    analysis_context() and the rule fingerprints (in priority order) the
+    result was produced with, and the AnalysisResult itself as plain
+    values. A stored result whose rules file or context differs is not
+    used.
+    """
+
+    TABLE = "analyses"
+    DESCRIPTION = "analysis store"
+
+    # Bump whenever AnalysisResult.to_state() or the payload layout change
+    FORMAT_VERSION = 2
+
+    def get(self, path, rules_file, context):
+        """Return (stored rule fingerprints, AnalysisResult), or None."""
+        payload = self.get_payload(path)
+        if payload is None:
+            return None
+
+        try:
+            stored_rules_file, stored_context, stored_rules, state = payload
+            if stored_rules_file != rules_file or stored_context != context:
+                return None
+            return stored_rules, AnalysisResult.from_state(state)
+        except Exception:
+            return None
+
+    def put(self, path, rules_file, context, rules, result):
+        """Store the analysis of path made with rules (a CompiledRuleSet)."""
+        self.put_payload(path, (rules_file, context, rules.fingerprints(), result.to_state()))
+
+def default_analysis_store_path(data_file):
+    """Return the --incremental analysis store used for a data file (stored beside it)."""
+    base, _ = os.path.splitext(os.path.abspath(data_file))
+    return base + ".analysis-store.sqlite"
+
+def analyse_incrementally(store, stmt_file, rules_file, transactions, control, rules, verbose, stats,
+                          engine="python", fixed_point=False):
+    """
+    Analyse a statement, reusing and patching its stored analysis when
+    the statement and control settings are unchanged, and store the
+    result for next time.
+    """
+    compiled = compile_rules(rules)
+    context = analysis_context(control, fixed_point)
+
+    entry = store.get(stmt_file, rules_file, context)
+    if entry is None:
+        analysis = analyse_with_engine(engine, transactions, control, compiled, fixed_point)
+        store.put(stmt_file, rules_file, context, compiled, analysis)
+        return analysis
+
+    stored_rules, analysis = entry
+    rematched = reanalyse_transactions(analysis, stored_rules, compiled, control, fixed_point)
+    print_pass(
+        f"Reused stored analysis of {stmt_file} "
+        f"({rematched} of {len(analysis.table)} transactions matched again)",
+        verbose, stats,
+    )
+    if stored_rules != compiled.fingerprints():
+        store.put(stmt_file, rules_file, context, compiled, analysis)
+    return analysis
+
+# ------------------------------------------------------------
+# Watch mode (--watch)
+# ------------------------------------------------------------
+
+def file_signature(path):
+    """Return (size, mtime_ns) for path, or None if it cannot be read."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class MemoryStatementCache:
+    """
+    In-process stand-in for StatementCache used by --watch: parsed
+    statements stay in memory until their file changes.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.entries = {}
+
+    def get(self, path):
+        signature = self.session.track(path)
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None or signature is None or entry[0] != signature:
+            return None
+        return entry[1]
+
+    def put(self, path, transactions):
+        self.entries[os.path.abspath(path)] = (file_signature(path), transactions)
+
+    def close(self):
+        pass
+
+class MemoryAnalysisStore:
+    """
+    In-process stand-in for AnalysisStore used by --watch, so that a rules
+    edit only re-matches the transactions it can affect. get() returns a
+    fresh copy, as merging modifies the result it is given.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, path, rules_file, context):
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None:
+            return None
+
+        signature, stored_rules_file, stored_context, stored_rules, state = entry
+        if (signature, stored_rules_file, stored_context) != (file_signature(path), rules_file, context):
+            return None
+        return stored_rules, AnalysisResult.from_state(state)
+
+    def put(self, path, rules_file, context, rules, result):
+        self.entries[os.path.abspath(path)] = (
+            file_signature(path), rules_file, context, rules.fingerprints(), result.to_state(),
+        )
+
+    def close(self):
+        pass
+
+class WatchSession:
+    """
+    What --watch keeps between runs: parsed control files, statements and
+    analyses, and the signature of every input file read, so that a
+    change can be detected and only the affected caches dropped.
+    Parsed rules files stay in _rules_cache/_compiled_rules_cache.
+    """
+
+    def __init__(self):
+        self.signatures = {}
+        self.controls = {}
+        self.statement_cache = MemoryStatementCache(self)
+        self.analysis_store = MemoryAnalysisStore()
+
+    def track(self, path):
+        """Watch path (if not already watched); return its current signature."""
+        signature = file_signature(path)
+        self.signatures.setdefault(path, signature)
+        return signature
+
+    def load_control_file(self, filename):
+        """load_control_file, parsed again only when the file has changed."""
+        self.track(filename)
+        control = self.controls.get(filename)
+        if control is None:
+            control = load_control_file(filename)
+            self.controls[filename] = control
+        return control
+
+    def changed_files(self):
+        return [path for path, signature in self.signatures.items() if file_signature(path) != signature]
+
+    def wait_for_change(self, interval):
+        """Poll every interval seconds; return the changed files once they stop changing."""
+        changed = []
+        while not changed:
+            time.sleep(interval)
+            changed = self.changed_files()
+
+        # Let an editor finish writing (several writes, or write and rename)
+        settled = None
+        current = {path: file_signature(path) for path in changed}
+        while settled != current:
+            settled = current
+            time.sleep(interval)
+            current = {path: file_signature(path) for path in changed}
+
+        return changed
+
+    def invalidate(self, changed):
+        """Drop everything parsed from the changed files."""
+        for path in changed:
+            del self.signatures[path]
+            if self.controls.pop(path, None) is not None:
+                # Rules were checked against the old control file
+                _rules_cache.clear()
+                _compiled_rules_cache.clear()
+            _rules_cache.pop(path, None)
+            _compiled_rules_cache.pop(path, None)
+
+_watch_session = None
+
+def watch_inputs(args):
+    """
+    Run the analysis, then run it again each time one of its input files
+    (data, control, rules or statement) changes, until interrupted.
+    """
+    global _watch_session
+
+    stats = AnalysisResults()
+    if args.profile:
+        print_error("--profile cannot be used with --watch", stats)
+        return 1
+    if args.watch_interval <= 0:
+        print_error("--watch-interval must be greater than 0.", stats)
+        return 1
 
-    print_pass(
-        f"{len(seen_types)} transaction types analysed",
-        verbose,
-        stats,
-    )
+    session = WatchSession()
+    _watch_session = session
 
-_rules_cache = {}
+    try:
+        while True:
+            for path in (args.data_file, args.statement, args.control_file):
+                if path:
+                    session.track(path)
 
-def load_rules_file(filename):
-    """Load a rules file (YAML with a 'rules' list) and return the list of Rule objects."""
-    if filename in _rules_cache:
-        return _rules_cache[filename]
+            started = time.perf_counter()
+            status = run_analyser(args)
+            elapsed = time.perf_counter() - started
 
-    with open(filename, 'r', encoding='utf-8') as f:
-        raw = yaml.safe_load(f)
-
-    rules_data = raw.get("rules", [])
-    if not isinstance(rules_data, list):
-        raise ValueError(f"rules file {filename} must contain a 'rules' list")
-
-    rules = []
-    for rule_data in rules_data:
-        match_data = rule_data["match"]
-        conditions = []
-
-        if isinstance(match_data, list):
-            for cond in match_data:
-                for match_type, match_value in cond.items():
-                    conditions.append(MatchCondition(type=match_type, value=match_value.upper()))
-        elif isinstance(match_data, dict):
-            for match_type, match_value in match_data.items():
-                conditions.append(MatchCondition(type=match_type, value=match_value.upper()))
-        else:
-            conditions.append(MatchCondition(type="description", value=match_data.upper()))
-
-        rules.append(
-            Rule(
-                id=rule_data["id"],
-                priority=rule_data.get("priority", 0),
-                conditions=conditions,
-                category=rule_data["classify"]["category"],
-                ownership=rule_data.get("ownership", {}),
-                transaction_types=set(rule_data.get("expect", {}).get("transaction_types", [])) or None,
-                direction=rule_data.get("expect", {}).get("direction"),
-                when=rule_data.get("when"),
-                facets=rule_data.get("classify", {}).get("facets"),
+            print()
+            print(
+                f"Finished in {elapsed:.2f}s (exit status {status}); "
+                f"watching {len(session.signatures)} files. Press Ctrl-C to stop."
             )
-        )
+            sys.stdout.flush()
 
-    rules.sort(key=lambda rule: rule.priority, reverse=True)
-    _rules_cache[filename] = rules
-    return rules
+            changed = session.wait_for_change(args.watch_interval)
+            session.invalidate(changed)
 
-def get_rules_for_type(statement_type, control):
-    """Look up and load the rules for a given statement type."""
-    if statement_type not in control.statement_handling:
-        raise ValueError(f"No rules file defined for statement type '{statement_type}'")
-    rules_file = control.statement_handling[statement_type]
-    return load_rules_file(rules_file)
+            print()
+            print("============================================================")
+            print(f"CHANGED: {', '.join(sorted(changed))}")
+            print("============================================================")
 
-def load_statement_lloyds(filename, verbose, stats):
-    transactions = []
+    except KeyboardInterrupt:
+        print()
+        return 0
 
-    expected_sort_code = None
-    expected_account_number = None
+    finally:
+        _watch_session = None
 
-    unknown_transaction_types = set()
+LLOYDS_COLUMNS = (
+    "Transaction Date",
+    "Transaction Type",
+    "Transaction Description",
+    "Sort Code",
+    "Account Number",
+    "Debit Amount",
+    "Credit Amount",
+    "Balance",
+)
 
-    with open(filename, newline="", encoding="utf-8") as csvfile:
-        print_pass(f"Analysing statment {filename}", verbose, stats)
-        reader = csv.DictReader(csvfile)
+ZERO = Decimal("0")
 
-        for line_number, row in enumerate(reader, start=2):
+def lloyds_transaction(record, line_number):
+    """
+    Build the Transaction for one statement row given as a
+    {column name: text} dict, as csv.DictReader returns it.
+    """
+    try:
+        date = datetime.strptime(
+            record["Transaction Date"].strip(),
+            "%d/%m/%Y"
+        )
 
-            try:
-                date = datetime.strptime(
-                    row["Transaction Date"].strip(),
-                    "%d/%m/%Y"
-                )
+        # Interned: the same few strings repeat on most rows, and
+        # the matching memos hash and compare them over and over
+        transaction_type = sys.intern(record["Transaction Type"].strip())
 
-                transaction_type = row["Transaction Type"].strip()
+        description = sys.intern(record["Transaction Description"].strip())
 
-                description = row["Transaction Description"].strip()
+        sort_code = sys.intern(record["Sort Code"].strip())
+        account_number = sys.intern(record["Account Number"].strip())
 
-                sort_code = row["Sort Code"].strip()
-                account_number = row["Account Number"].strip()
+        debit = parse_decimal(
+            record["Debit Amount"]
+        )
 
-                debit = parse_decimal(
-                    row["Debit Amount"]
-                )
+        credit = parse_decimal(
+            record["Credit Amount"]
+        )
 
-                credit = parse_decimal(
-                    row["Credit Amount"]
-                )
+        balance = parse_decimal(
+            record["Balance"]
+        )
 
-                balance = parse_decimal(
-                    row["Balance"]
-                )
+    except Exception as exc:
+        raise RuntimeError(
+            f"Line {line_number}: {exc}"
+        )
 
-            except Exception as exc:
-                raise RuntimeError(
-                    f"Line {line_number}: {exc}"
-                )
+    return Transaction(
+        line_number=line_number,
+        date=date,
+        transaction_type=transaction_type,
+        description=description,
+        debit=debit,
+        credit=credit,
+        balance=balance,
+        sort_code=sort_code,
+        account_number=account_number,
+    )
 
-            if expected_sort_code is None:
-                expected_sort_code = sort_code
-                expected_account_number = account_number
+class LloydsRowParser:
+    """
+    Turns the csv.reader rows of a Lloyds statement into Transactions.
+
+    Column positions are looked up once, from the header.  Dates, which
+    repeat from row to row, are parsed from their DD/MM/YYYY slices once
+    per distinct text; strings are stripped and interned once per distinct
+    text; amounts go straight to Decimal, which ignores surrounding
+    whitespace itself.  Anything this fast path cannot take (a short row,
+    a missing column, a one-digit day, thousands separators, a bad value)
+    is handed to lloyds_transaction as the dict csv.DictReader would have
+    built, so it gives the same Transaction or the same error.
+    """
 
-            if sort_code != expected_sort_code:
-                print_warning(
-                    f"line {line_number}: unexpected sort code "
-                    f"'{sort_code}'",
-                    stats,
+    def __init__(self, header):
+        self.header = header
+        positions = {name: index for index, name in enumerate(header)}
+        if all(name in positions for name in LLOYDS_COLUMNS):
+            self.positions = tuple(positions[name] for name in LLOYDS_COLUMNS)
+        else:
+            self.positions = None
+        self.dates = {}
+        self.strings = {}
+
+    def parse_date(self, text):
+        """Return the datetime for a DD/MM/YYYY date, parsing each distinct text once."""
+        date = self.dates.get(text)
+        if date is None:
+            day, month, year = text[:2], text[3:5], text[6:]
+            if (len(text) != 10 or text[2] != "/" or text[5] != "/" or not text.isascii()
+                    or not (day + month + year).isdigit()):
+                raise ValueError(f"not a DD/MM/YYYY date: {text!r}")
+            date = datetime(int(year), int(month), int(day))
+            self.dates[text] = date
+        return date
+
+    def string(self, text):
+        """Return text stripped and interned, once per distinct text."""
+        value = self.strings.get(text)
+        if value is None:
+            value = sys.intern(text.strip())
+            self.strings[text] = value
+        return value
+
+    def transactions(self, rows, line_number=2):
+        """
+        Yield the Transaction for each csv.reader row, numbering them from
+        line_number.  Blank rows are skipped, as csv.DictReader does.
+        """
+        if self.positions is None:
+            # A column is missing: let lloyds_transaction report it
+            for row in rows:
+                if row:
+                    yield lloyds_transaction(self.record(row), line_number)
+                    line_number += 1
+            return
+
+        (date_col, type_col, description_col, sort_code_col, account_number_col,
+         debit_col, credit_col, balance_col) = self.positions
+        dates = self.dates
+        strings = self.strings
+        parse_date = self.parse_date
+        string = self.string
+
+        for row in rows:
+            if not row:
+                continue
+            try:
+                debit = row[debit_col]
+                credit = row[credit_col]
+                tx = Transaction(
+                    line_number,
+                    dates.get(row[date_col]) or parse_date(row[date_col]),
+                    strings.get(row[type_col]) or string(row[type_col]),
+                    strings.get(row[description_col]) or string(row[description_col]),
+                    Decimal(debit) if debit else ZERO,
+                    Decimal(credit) if credit else ZERO,
+                    Decimal(row[balance_col]),
+                    strings.get(row[sort_code_col]) or string(row[sort_code_col]),
+                    strings.get(row[account_number_col]) or string(row[account_number_col]),
                 )
+            except Exception:
+                tx = lloyds_transaction(self.record(row), line_number)
+            yield tx
+            line_number += 1
+
+    def record(self, row):
+        """Return row as the dict csv.DictReader would have built for it."""
+        record = dict(zip(self.header, row))
+        if len(row) > len(self.header):
+            record[None] = row[len(self.header):]
+        for name in self.header[len(row):]:
+            record[name] = None
+        return record
+
+def iter_statement_lloyds(filename):
+    """
+    Parse a Lloyds CSV statement, yielding one Transaction per row as it
+    is read (see LloydsRowParser).
+    """
+    import csv
 
-            if account_number != expected_account_number:
-                print_warning(
-                    f"line {line_number}: unexpected account number "
-                    f"'{account_number}'",
-                    stats,
-                )
+    with open(filename, newline="", encoding="utf-8") as csvfile:
+        reader = csv.reader(csvfile)
 
-            if transaction_type not in KNOWN_TRANSACTION_TYPES:
-                unknown_transaction_types.add(transaction_type)
-
-            transactions.append(
-                Transaction(
-                    line_number=line_number,
-                    date=date,
-                    transaction_type=transaction_type,
-                    description=description,
-                    debit=debit,
-                    credit=credit,
-                    balance=balance,
-                    sort_code=sort_code,
-                    account_number=account_number,
-                )
-            )
+        header = next(reader, None)
+        if header is None:
+            return
+        yield from LloydsRowParser(header).transactions(reader)
 
-    for tx_type in sorted(unknown_transaction_types):
-        print_warning(
-            f"unknown transaction type '{tx_type}'",
-            stats,
-        )
+def read_statement_lloyds(filename):
+    """Parse a Lloyds CSV statement into a list of Transaction objects."""
+    return list(iter_statement_lloyds(filename))
+
+def check_statement_account(transactions, stats):
+    """Warn about rows from a different account and about unknown transaction types."""
+    apply_statement_checks(transactions, [StatementAccountCheck(stats)])
+
+def load_statement_lloyds(filename, verbose, stats, cache=None):
+    transactions = None
+
+    if cache is not None:
+        transactions = cache.get(filename)
+
+    print_pass(f"Analysing statment {filename}", verbose, stats)
+
+    if transactions is None:
+        transactions = read_statement_lloyds(filename)
+        if cache is not None:
+            cache.put(filename, transactions)
+
+    check_statement_account(transactions, stats)
 
     return transactions
 
-def load_statement_monzo(filename, verbose, stats):
+def load_statement_monzo(filename, verbose, stats, cache=None):
     """Load a Monzo statement CSV."""
     raise NotImplementedError(f"Fatal error: no support for processing Monzo statement '{filename}'")
 
-def load_statement_amex(filename, verbose, stats):
+def load_statement_amex(filename, verbose, stats, cache=None):
     """Load an American Express credit card statement CSV."""
     raise NotImplementedError(f"Fatal error: no support for processing Amex statement '{filename}'")
 
-def load_statement_capital_one(filename, verbose, stats):
+def load_statement_capital_one(filename, verbose, stats, cache=None):
     """Load a Capital One credit card statement CSV."""
     raise NotImplementedError(f"Fatal error: no support for processing Capital One statement '{filename}'")
 
-def load_statement_vanguard(filename, verbose, stats):
+def load_statement_vanguard(filename, verbose, stats, cache=None):
     """Load a Vanguard ISA statement CSV."""
     raise NotImplementedError(f"Fatal error: no support for processing Vanguard statement '{filename}'")
 
-def load_statement_interest(filename, verbose, stats):
+def load_statement_interest(filename, verbose, stats, cache=None):
     """Load an interest certificate or summary."""
     raise NotImplementedError(f"Fatal error: no support for processing interest statement '{filename}'")
 
-def load_statement_pension(filename, verbose, stats):
+def load_statement_pension(filename, verbose, stats, cache=None):
     """Load a pension statement CSV."""
     raise NotImplementedError(f"Fatal error: no support for processing pension statement '{filename}'")
 
-def load_statement_by_type(statement_type, filename, verbose, stats):
+@profiled(
+    "load_statement",
+    details=lambda statement_type, filename, *args, **kwargs: {"type": statement_type, "file": filename},
+    counts=lambda transactions: {"transactions": len(transactions)},
+)
+def load_statement_by_type(statement_type, filename, verbose, stats, cache=None):
     """
     Dispatch to the appropriate statement loader based on the type string.
     Returns a list of Transaction objects.
+    If cache is a StatementCache, loaders that support it use it.
     """
     dispatcher = {
         "bank-lloyds": load_statement_lloyds,
@@ -1666,149 +4080,509 @@ def load_statement_by_type(statement_type, filename, verbose, stats):
     if loader is None:
         raise ValueError(f"Unknown statement type: '{statement_type}'")
 
-    return loader(filename, verbose, stats)
+    return loader(filename, verbose, stats, cache=cache)
 
+@profiled("verify_reverse_chronological_order", details=transactions_details)
 def verify_reverse_chronological_order(transactions, verbose,  stats):
-    previous = None
+    apply_statement_checks(transactions, [ReverseChronologicalCheck(verbose, stats)])
+
+
+@profiled("verify_tax_year", details=transactions_details)
+def verify_tax_year(transactions, verbose, stats):
+    check = TaxYearCheck(verbose, stats)
+    apply_statement_checks(transactions, [check])
+    return check.start_year
+
+
+@profiled("verify_balances", details=transactions_details)
+def verify_balances(transactions, verbose, stats):
+    check = BalanceCheck(verbose, stats)
+    apply_statement_checks(transactions, [check])
+    return check.opening_balance, check.closing_balance
+
+
+@profiled("calculate_monthly_totals", details=transactions_details)
+def calculate_monthly_totals(transactions, fixed_point=False):
+
+    if fixed_point:
+        pence_in = defaultdict(int)
+        pence_out = defaultdict(int)
+
+        for tx in transactions:
+            month_key = tx.date.strftime("%Y-%m")
+            pence_in[month_key] += fixed_point_pence(tx.credit, tx.line_number)
+            pence_out[month_key] += fixed_point_pence(tx.debit, tx.line_number)
+
+        return monthly_totals_from_pence(pence_in, pence_out)
+
+    monthly = defaultdict(
+        lambda: {
+            "money_in": Decimal("0"),
+            "money_out": Decimal("0"),
+        }
+    )
+
+    total_in = Decimal("0")
+    total_out = Decimal("0")
 
     for tx in transactions:
 
-        if previous is not None:
+        month_key = tx.date.strftime("%Y-%m")
 
-            if tx.date > previous:
-                raise RuntimeError(
-                    "Statement is not in reverse "
-                    "chronological order"
-                )
+        monthly[month_key]["money_in"] += tx.credit
+        monthly[month_key]["money_out"] += tx.debit
 
-        previous = tx.date
+        total_in += tx.credit
+        total_out += tx.debit
 
-    print_pass(
-        "statement is in reverse chronological order",
-        verbose,
-        stats,
+    return monthly, total_in, total_out
+
+@profiled("calculate_table_monthly_totals")
+def calculate_table_monthly_totals(table):
+    """Monthly totals over a TransactionTable, totalled in integer pence."""
+    pence_in = defaultdict(int)
+    pence_out = defaultdict(int)
+    month_keys = {}
+
+    for ordinal, credit, debit in zip(table.date_ordinals, table.credit_pence, table.debit_pence):
+        month_key = month_keys.get(ordinal)
+        if month_key is None:
+            month_key = datetime.fromordinal(ordinal).strftime("%Y-%m")
+            month_keys[ordinal] = month_key
+        pence_in[month_key] += credit
+        pence_out[month_key] += debit
+
+    return add_exact_amounts(table, *monthly_totals_from_pence(pence_in, pence_out))
+
+def add_exact_amounts(table, monthly, total_in, total_out):
+    """Correct pence-based monthly totals for the table's sub-penny rows."""
+    for row, (debit, credit, _) in table.exact_amounts.items():
+        month_key = datetime.fromordinal(table.date_ordinals[row]).strftime("%Y-%m")
+        extra_in = credit - from_pence(table.credit_pence[row])
+        extra_out = debit - from_pence(table.debit_pence[row])
+        monthly[month_key]["money_in"] += extra_in
+        monthly[month_key]["money_out"] += extra_out
+        total_in += extra_in
+        total_out += extra_out
+    return monthly, total_in, total_out
+
+def monthly_totals_from_pence(pence_in, pence_out):
+    """Convert per-month pence totals to the (monthly, total_in, total_out) Decimal form."""
+    monthly = defaultdict(
+        lambda: {
+            "money_in": Decimal("0"),
+            "money_out": Decimal("0"),
+        }
     )
 
+    for month_key in pence_in:
+        monthly[month_key]["money_in"] = from_pence(pence_in[month_key])
+        monthly[month_key]["money_out"] = from_pence(pence_out[month_key])
 
-def verify_tax_year(transactions, verbose, stats):
+    total_in = from_pence(sum(pence_in.values()))
+    total_out = from_pence(sum(pence_out.values()))
 
-    newest = transactions[0].date
-    oldest = transactions[-1].date
+    return monthly, total_in, total_out
 
-    start_year = oldest.year
 
-    if oldest.month < 4:
-        start_year -= 1
+# ------------------------------------------------------------
+# Vectorised engine (--engine vectorised)
+#
+# Optional NumPy backend.  Transactions go into the same TransactionTable
+# and rules are evaluated as boolean masks over whole columns, in
+# priority order; category, owner, facet and monthly totals are grouped
+# reductions over the integer pence columns.  The AnalysisResult has the
+# same contents as analyse_transactions() produces.
+# ------------------------------------------------------------
 
-    if oldest.month == 4 and oldest.day < 6:
-        start_year -= 1
+ENGINES = ("python", "vectorised")
 
-    expected_start = datetime(start_year, 4, 6)
-    expected_end = datetime(start_year + 1, 4, 5)
+def import_numpy():
+    """Import NumPy for the vectorised engine."""
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("--engine vectorised requires NumPy (pip install numpy)")
+    return numpy
 
-    start_gap = (oldest.date() - expected_start.date()).days
+def int_column(np, values):
+    """Return an int64 NumPy view of an array("q") column."""
+    if not len(values):
+        return np.zeros(0, dtype=np.int64)
+    return np.frombuffer(values, dtype=np.int64)
 
-    if start_gap > ALLOWED_DAYS_GAP_AT_START:
-        print_warning(
-            f"statement starts on "
-            f"{oldest.strftime('%d-%b-%Y')} "
-            f"({start_gap} days after expected start "
-            f"{expected_start.strftime('%d-%b-%Y')})",
-            stats,
-        )
+VECTOR_CONDITIONS = {}
 
-    end_gap = (expected_end.date() - newest.date()).days
+def register_vector_condition(cond_type):
+    """
+    Decorator to register a vectorised "when" condition.
+    The function takes (np, columns, value) and returns a boolean mask
+    over all rows.  Condition types without one are evaluated row by row.
+    """
+    def decorator(func):
+        VECTOR_CONDITIONS[cond_type] = func
+        return func
+    return decorator
 
-    if end_gap > ALLOWED_DAYS_GAP_AT_END:
-        print_warning(
-            f"statement ends on "
-            f"{newest.strftime('%d-%b-%Y')} "
-            f"({end_gap} days before expected end "
-            f"{expected_end.strftime('%d-%b-%Y')})",
-            stats,
-        )
+@register_vector_condition("amount_range")
+def vector_amount_range(np, columns, value):
+    min_val, max_val = (to_decimal(v) * 100 for v in value)
+    amount = columns["amount"]
+    return (amount >= math.ceil(min_val)) & (amount <= math.floor(max_val))
+
+@register_vector_condition("amount_exact")
+def vector_amount_exact(np, columns, value):
+    expected = to_decimal(value) * 100
+    if expected != expected.to_integral_value():
+        return np.zeros(len(columns["amount"]), dtype=bool)
+    return columns["amount"] == int(expected)
+
+@register_vector_condition("line_numbers")
+def vector_line_numbers(np, columns, value):
+    return np.isin(columns["line"], np.array(list(value), dtype=np.int64))
+
+@register_vector_condition("tax_year")
+def vector_tax_year(np, columns, value):
+    start, end = parse_tax_year(value)
+    dates = columns["date"]
+    return (dates >= start.toordinal()) & (dates <= end.toordinal())
 
-    print_pass(
-        f"tax year appears to be "
-        f"{start_year}/{str(start_year + 1)[2:]}",
-        verbose,
-        stats,
+@register_vector_condition("date_range")
+def vector_date_range(np, columns, value):
+    start_str, end_str = value
+    start = parse_date(start_str)
+    end = parse_date(end_str)
+    dates = columns["date"]
+    return (dates >= start.toordinal()) & (dates <= end.toordinal())
+
+def vector_when_mask(np, columns, when):
+    """
+    Evaluate a "when" list as a mask (OR across groups, AND within each).
+    Returns None if a condition has no vectorised form.
+    """
+    rows = len(columns["amount"])
+    mask = np.zeros(rows, dtype=bool)
+
+    for group in when:
+        group_mask = np.ones(rows, dtype=bool)
+        for cond_type, cond_value in group.items():
+            if cond_type not in CONDITION_COMPILERS and cond_type not in CONDITION_CHECKERS:
+                # Unknown condition type – treat as failure to be safe
+                group_mask[:] = False
+                break
+            vector_condition = VECTOR_CONDITIONS.get(cond_type)
+            if vector_condition is None:
+                return None
+            group_mask &= vector_condition(np, columns, cond_value)
+        mask |= group_mask
+
+    return mask
+
+def whole_percentages(ownerships):
+    """Return True if every percentage in an ownership pool is a whole number."""
+    return all(
+        isinstance(percentage, int)
+        for ownership in ownerships
+        for owner, percentage in ownership
     )
 
-    return start_year
+def ownership_matrix(np, result):
+    """
+    Return (owners, matrix) for the result's ownership pool: matrix[i, j]
+    is the whole-number percentage owner j has in ownership i.
+    """
+    owners = InternPool()
+    shares = [share_percentages(dict(ownership)) for ownership in result.ownerships.values]
+    for ownership_shares in shares:
+        for owner, percentage in ownership_shares:
+            owners.intern(owner)
+
+    matrix = np.zeros((len(shares), len(owners)), dtype=np.int64)
+    for ownership_id, ownership_shares in enumerate(shares):
+        for owner, percentage in ownership_shares:
+            matrix[ownership_id, owners.ids[owner]] = percentage
 
+    return owners.values, matrix
 
-def verify_balances(transactions, verbose, stats):
+def group_sum(np, groups, values, size):
+    """Sum int64 values per group id (exact, unlike bincount's float weights)."""
+    sums = np.zeros(size, dtype=np.int64)
+    np.add.at(sums, groups, values)
+    return sums
+
+def analyse_transactions_vectorised(transactions, control, rules, fixed_point=False):
+    """Vectorised equivalent of analyse_transactions()."""
+    np = import_numpy()
 
-    chronological = list(reversed(transactions))
+    summaries = {}
 
-    first_tx = chronological[0]
+    for category_id in control.categories:
+        summaries[category_id] = (CategorySummary(category=category_id))
 
-    opening_balance = (
-        first_tx.balance
-        - first_tx.credit
-        + first_tx.debit
+    result = AnalysisResult(
+        summaries=summaries,
+        warnings=[],
+        categories=InternPool(control.categories),
     )
+    table = result.table
 
-    running_balance = opening_balance
+    for tx in transactions:
+        table.append(tx)
+
+    compiled = compile_rules(rules)
+
+    # Sub-penny amounts and (without fixed_point) fractional ownership
+    # percentages are not representable in the integer columns
+    ownerships = [control.default_ownership.items()]
+    ownerships.extend(rule.ownership.items() for rule in compiled.rules if rule.ownership)
+    if table.exact_amounts or not (fixed_point or whole_percentages(ownerships)):
+        transactions = [table.transaction(row) for row in range(len(table))]
+        return analyse_transactions(transactions, control, compiled, fixed_point)
+
+    row_count = len(table)
+    strings = table.strings
+
+    credit = int_column(np, table.credit_pence)
+    debit = int_column(np, table.debit_pence)
+    type_ids = int_column(np, table.type_ids)
+    description_ids = int_column(np, table.description_ids)
+    columns = {
+        "amount": np.where(credit != 0, credit, debit),
+        "date": int_column(np, table.date_ordinals),
+        "line": int_column(np, table.line_numbers),
+    }
 
-    checked = 0
+    # Description/prefix conditions, evaluated once per distinct description
+    description_masks = {}
+    for string_id in np.unique(description_ids).tolist():
+        for position in compiled.description_candidates(match_key(strings[string_id])):
+            mask = description_masks.get(position)
+            if mask is None:
+                mask = np.zeros(len(strings), dtype=bool)
+                description_masks[position] = mask
+            mask[string_id] = True
+
+    # First match by priority: each rule only claims rows still unassigned
+    winner = np.full(row_count, NO_RULE, dtype=np.int64)
+    unassigned = np.ones(row_count, dtype=bool)
+
+    for position in sorted(description_masks):
+        rule = compiled.rules[position]
+        mask = unassigned & description_masks[position][description_ids]
+
+        if rule.transaction_types is not None:
+            allowed = [strings.ids[t] for t in rule.transaction_types if t in strings.ids]
+            mask &= np.isin(type_ids, np.array(allowed, dtype=np.int64))
+
+        # Counted where first_match_counted counts: after the description
+        # and transaction-type filters, before the remaining constraints
+        if compiled.evaluated is not None:
+            compiled.evaluated[position] += int(mask.sum())
+
+        if rule.direction == "credit":
+            mask &= credit != 0
+        if rule.direction == "debit":
+            mask &= debit != 0
+
+        if rule.when is not None and mask.any():
+            when_mask = vector_when_mask(np, columns, rule.when)
+            if when_mask is None:
+                # Fall back to the compiled predicates for the remaining rows
+                rows = np.nonzero(mask)[0]
+                mask[rows] = [
+                    match_rule_constraints(table.transaction(row), rule)
+                    for row in rows.tolist()
+                ]
+            else:
+                mask &= when_mask
+
+        if compiled.matched is not None:
+            compiled.matched[position] += int(mask.sum())
+
+        winner[mask] = position
+        unassigned &= ~mask
+        if not unassigned.any():
+            break
+
+    # A matched rule always satisfies its own expect block, so unlike the
+    # per-row engine there are no type/direction warnings to collect here.
+
+    # Resolve each winning rule in order of first appearance, so the pools
+    # are interned in the same order as analyse_transactions() does
+    lookup_size = len(compiled.rules) + 1
+    category_lookup = np.zeros(lookup_size, dtype=np.int64)
+    rule_lookup = np.full(lookup_size, NO_RULE, dtype=np.int64)
+    facet_lookup = np.zeros(lookup_size, dtype=np.int64)
+    ownership_lookup = np.zeros(lookup_size, dtype=np.int64)
+
+    winners, first_rows = np.unique(winner, return_index=True)
+    for position in winners[np.argsort(first_rows)].tolist():
+        matched_rule = None if position == NO_RULE else compiled.rules[position]
 
-    for tx in chronological:
+        if matched_rule is None:
+            category_id = control.default_category
+        else:
+            category_id = matched_rule.category
+        if category_id not in summaries:
+            raise unknown_category_error(matched_rule, category_id)
 
-        calculated_balance = (
-            running_balance
-            + tx.credit
-            - tx.debit
-        )
+        if matched_rule and matched_rule.facets is not None:
+            assigned_facets = matched_rule.facets
+        else:
+            assigned_facets = control.categories[category_id].default_facets
 
-        if calculated_balance != tx.balance:
-            raise RuntimeError(
-                f"Balance mismatch on line "
-                f"{tx.line_number}: "
-                f"expected {tx.balance} "
-                f"calculated {calculated_balance}"
-            )
+        if matched_rule:
+            ownership = resolve_ownership(None, matched_rule, control)
+        else:
+            ownership = control.default_ownership
 
-        running_balance = tx.balance
-        checked += 1
+        slot = position + 1
+        category_lookup[slot] = result.categories.intern(category_id)
+        if matched_rule is not None:
+            rule_lookup[slot] = result.rule_ids.intern(matched_rule.id)
+        facet_lookup[slot] = result.facet_sets.intern(tuple(assigned_facets))
+        ownership_lookup[slot] = result.ownerships.intern(tuple(ownership.items()))
+
+    slots = winner + 1
+    category_column = category_lookup[slots]
+    ownership_column = ownership_lookup[slots]
+    result.category_column.frombytes(category_column.tobytes())
+    result.rule_column.frombytes(rule_lookup[slots].tobytes())
+    result.facet_column.frombytes(facet_lookup[slots].tobytes())
+    result.ownership_column.frombytes(ownership_column.tobytes())
+
+    # Category and per-owner totals as grouped sums over integer pence
+    category_count = len(result.categories)
+    counts = np.bincount(category_column, minlength=category_count)
+    credit_sums = group_sum(np, category_column, credit, category_count)
+    debit_sums = group_sum(np, category_column, debit, category_count)
+
+    owners, matrix = ownership_matrix(np, result)
+    owner_totals = []
+    for owner_index, owner in enumerate(owners):
+        percentages = matrix[ownership_column, owner_index]
+        owner_totals.append((
+            owner,
+            np.bincount(category_column[percentages != 0], minlength=category_count),
+            group_sum(np, category_column, credit * percentages, category_count),
+            group_sum(np, category_column, debit * percentages, category_count),
+        ))
+
+    for category, category_id in enumerate(result.categories.values):
+        if not counts[category]:
+            continue
+        summary = summaries[category_id]
+        summary.transaction_count = int(counts[category])
 
-    closing_balance = chronological[-1].balance
+        if fixed_point:
+            summary.credit_pence = int(credit_sums[category])
+            summary.debit_pence = int(debit_sums[category])
+        else:
+            summary.total_credit = from_pence(int(credit_sums[category]))
+            summary.total_debit = from_pence(int(debit_sums[category]))
 
-    print_pass(
-        f"{checked} balances verified",
-        verbose,
-        stats,
-    )
+        for owner, owner_counts, owner_credits, owner_debits in owner_totals:
+            if not owner_counts[category]:
+                continue
+            summary.owner_counts[owner] = int(owner_counts[category])
+            if fixed_point:
+                summary.owner_credit_units[owner] = int(owner_credits[category])
+                summary.owner_debit_units[owner] = int(owner_debits[category])
+            else:
+                summary.owner_credits[owner] = from_share_units(int(owner_credits[category]))
+                summary.owner_debits[owner] = from_share_units(int(owner_debits[category]))
 
-    return opening_balance, closing_balance
+    return result
 
+def aggregate_facet_totals_vectorised(result, facet_definitions, fixed_point=False):
+    """Vectorised equivalent of aggregate_facet_totals()."""
+    table = result.table
+    if table.exact_amounts or not (fixed_point or whole_percentages(result.ownerships.values)):
+        # Sub-penny amounts and fractional percentages need the Decimal path
+        return aggregate_facet_totals(result, facet_definitions, fixed_point)
 
-def calculate_monthly_totals(transactions):
+    np = import_numpy()
 
-    monthly = defaultdict(
-        lambda: {
-            "money_in": Decimal("0"),
-            "money_out": Decimal("0"),
-        }
-    )
+    credit = int_column(np, table.credit_pence)
+    debit = int_column(np, table.debit_pence)
+    facet_column = int_column(np, result.facet_column)
+    ownership_column = int_column(np, result.ownership_column)
 
-    total_in = Decimal("0")
-    total_out = Decimal("0")
+    owners, matrix = ownership_matrix(np, result)
+    row_percentages = matrix[ownership_column] if len(matrix) else np.zeros((len(table), 0), dtype=np.int64)
 
-    for tx in transactions:
+    facet_totals = {}
+    for group in facet_definitions.values():
+        for code in group["codes"]:
+            # A code listed twice in a facet set counts twice, as in the per-row path
+            set_weights = np.array(
+                [facet_set.count(code) for facet_set in result.facet_sets.values],
+                dtype=np.int64,
+            )
+            weights = set_weights[facet_column] if len(set_weights) else np.zeros(len(table), dtype=np.int64)
+
+            totals = {
+                "count": int(weights.sum()),
+                "total_credit": from_pence(int((credit * weights).sum())),
+                "total_debit": from_pence(int((debit * weights).sum())),
+                "owner_counts": {},
+                "owner_credits": {},
+                "owner_debits": {},
+            }
 
-        month_key = tx.date.strftime("%Y-%m")
+            for owner_index, owner in enumerate(owners):
+                percentages = row_percentages[:, owner_index]
+                owner_count = int((weights * (percentages != 0)).sum())
+                if not owner_count:
+                    continue
+                totals["owner_counts"][owner] = owner_count
+                totals["owner_credits"][owner] = from_share_units(int((credit * percentages * weights).sum()))
+                totals["owner_debits"][owner] = from_share_units(int((debit * percentages * weights).sum()))
 
-        monthly[month_key]["money_in"] += tx.credit
-        monthly[month_key]["money_out"] += tx.debit
+            facet_totals[code] = totals
 
-        total_in += tx.credit
-        total_out += tx.debit
+    return facet_totals
 
-    return monthly, total_in, total_out
+@profiled("calculate_table_monthly_totals")
+def calculate_table_monthly_totals_vectorised(table):
+    """Vectorised equivalent of calculate_table_monthly_totals()."""
+    np = import_numpy()
+
+    credit = int_column(np, table.credit_pence)
+    debit = int_column(np, table.debit_pence)
+
+    ordinals, inverse = np.unique(int_column(np, table.date_ordinals), return_inverse=True)
+    months = InternPool()
+    month_of_ordinal = np.array(
+        [months.intern(datetime.fromordinal(ordinal).strftime("%Y-%m")) for ordinal in ordinals.tolist()],
+        dtype=np.int64,
+    )
+    month_ids = month_of_ordinal[inverse] if len(ordinals) else np.zeros(0, dtype=np.int64)
 
+    sums_in = group_sum(np, month_ids, credit, len(months))
+    sums_out = group_sum(np, month_ids, debit, len(months))
 
+    pence_in = {month_key: int(sums_in[i]) for i, month_key in enumerate(months.values)}
+    pence_out = {month_key: int(sums_out[i]) for i, month_key in enumerate(months.values)}
+
+    return add_exact_amounts(table, *monthly_totals_from_pence(pence_in, pence_out))
+
+@profiled(
+    "analyse_transactions",
+    details=lambda engine, *args, **kwargs: {"engine": engine},
+    counts=lambda result: {
+        "transactions": len(result.table),
+        "uncategorised": len(result.uncategorised_rows()),
+    },
+)
+def analyse_with_engine(engine, transactions, control, rules, fixed_point=False):
+    """Run analyse_transactions, or its vectorised equivalent for engine "vectorised"."""
+    if engine == "vectorised":
+        return analyse_transactions_vectorised(transactions, control, rules, fixed_point)
+    return analyse_transactions(transactions, control, rules, fixed_point)
+
+
+@profiled("print_report")
 def print_report(
     monthly,
     total_in,
@@ -1888,6 +4662,7 @@ def print_report(
     else:
         print("Reconciliation  : FAIL")
 
+@profiled("print_monthly_summary")
 def print_monthly_summary(monthly, total_in, total_out):
     """Print just the monthly summary table (no reconciliation)."""
     MONTH_WIDTH = 10
@@ -1938,9 +4713,139 @@ def print_monthly_summary(monthly, total_in, total_out):
         f"£{net_total:>{AMOUNT_WIDTH-1},.2f}"
     )
 
-def main():
+@profiled(
+    "analyse_statement",
+    details=lambda stmt_type, stmt_file, *args, **kwargs: {"type": stmt_type, "file": stmt_file},
+)
+def analyse_statement(stmt_type, stmt_file, control, verbose, stats, cache=None, fixed_point=False, stream=False,
+                      engine="python", store=None):
+    """
+    Load one statement and analyse it with the rules for its type.
+    With stream, a Lloyds statement is classified as it is read (and the
+    statement cache and analysis store are not used). With store (an
+    AnalysisStore), a stored analysis is patched rather than redone.
+    Problems are reported through print_warning/print_error.
+    Returns an AnalysisResult, or None if the statement could not be used.
+    """
+    try:
+        if stream and stmt_type == "bank-lloyds":
+            # Get rules for this statement type
+            try:
+                rules = get_rules_for_type(stmt_type, control)
+            except ValueError as e:
+                print_error(str(e), stats)
+                return None
+
+            print_pass(f"Analysing statment {stmt_file}", verbose, stats)
+            transactions = run_statement_checks(
+                iter_statement_lloyds(stmt_file),
+                [StatementAccountCheck(stats)],
+            )
+
+            # Analyse this statement
+            analysis = analyse_with_engine(engine, transactions, control, rules, fixed_point)
+            if not len(analysis.table):
+                print_warning(f"No transactions loaded from {stmt_file}", stats)
+                return None
+            return analysis
+
+        # Load the statement
+        transactions = load_statement_by_type(stmt_type, stmt_file, verbose, stats, cache)
+        if not transactions:
+            print_warning(f"No transactions loaded from {stmt_file}", stats)
+            return None
+
+        # Get rules for this statement type
+        try:
+            rules = get_rules_for_type(stmt_type, control)
+        except ValueError as e:
+            print_error(str(e), stats)
+            return None
+
+        # Analyse this statement
+        if store is not None:
+            return analyse_incrementally(
+                store, stmt_file, control.statement_handling[stmt_type], transactions,
+                control, rules, verbose, stats, engine, fixed_point,
+            )
+        return analyse_with_engine(engine, transactions, control, rules, fixed_point)
+
+    except NotImplementedError as e:
+        print_error(str(e), stats)
+        return None
+    except Exception as e:
+        print_error(f"Error processing {stmt_file}: {e}", stats)
+        return None
+
+def analyse_statement_job(stmt_type, stmt_file, control, verbose, cache_path, fixed_point=False, stream=False,
+                          engine="python", profile=False, store_path=None,
+                          classification_cache_size=DEFAULT_CLASSIFICATION_CACHE_SIZE):
+    """
+    Process-pool wrapper around analyse_statement.
+    Captures the printed output and the pass/warning/error counts so the
+    parent can replay them in order.  The worker's classification cache
+    lives on across its jobs; the job's hits, misses and evictions are
+    returned for the parent to add to its own.
+    Returns (AnalysisResult or None, output text, AnalysisResults, profile
+    trace or None, classification cache counts or None).
+    """
+    global _profiler
+
+    set_classification_cache_size(classification_cache_size)
+    cache_counts = _classification_cache.counts() if _classification_cache is not None else None
+
     stats = AnalysisResults()
+    cache = StatementCache(cache_path, stats) if cache_path else None
+    store = AnalysisStore(store_path, stats) if store_path else None
+    output = io.StringIO()
+    trace = None
+
+    if profile:
+        # Reload the rules so this job's counts start from zero, even if
+        # the worker already ran a job for the same rules file
+        _compiled_rules_cache.clear()
+        _profiler = Profiler()
+
+    try:
+        with contextlib.redirect_stdout(output):
+            analysis = analyse_statement(
+                stmt_type, stmt_file, control, verbose, stats, cache, fixed_point, stream, engine, store
+            )
+    finally:
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+        if profile:
+            trace = _profiler.trace()
+            _profiler.stop()
+            _profiler = None
+
+    if cache_counts is not None:
+        cache_counts = tuple(now - before for now, before in zip(_classification_cache.counts(), cache_counts))
+
+    return analysis, output.getvalue(), stats, trace, cache_counts
+
+def main():
+    global _profiler
+
     args = parse_arguments()
+    if not args.config_cache:
+        set_cache_dir(None)
+    if args.watch:
+        return watch_inputs(args)
+    if not args.profile:
+        return run_analyser(args)
+
+    _profiler = Profiler()
+    try:
+        with profile_stage("main"):
+            return run_analyser(args)
+    finally:
+        _profiler.write(args.profile, sys.argv[1:])
+
+def run_analyser(args):
+    stats = AnalysisResults()
     has_facet_errors = False
 
     # ------------------------------------------------------------------
@@ -1950,10 +4855,26 @@ def main():
         print_error("--data-file and --statement are mutually exclusive.", stats)
         return 1
 
+    if args.classification_cache < 0:
+        print_error("--classification-cache must be 0 or more.", stats)
+        return 1
+    set_classification_cache_size(args.classification_cache)
+
+    if args.engine == "vectorised":
+        try:
+            import_numpy()
+        except RuntimeError as e:
+            print_error(str(e), stats)
+            return 1
+
     # ------------------------------------------------------------------
     # 2. DATA-FILE MODE
     # ------------------------------------------------------------------
     if args.data_file:
+        if args.jobs < 1:
+            print_error("--jobs must be at least 1.", stats)
+            return 1
+
         if not os.path.isfile(args.data_file):
             print_error(f"data file not found: {args.data_file}", stats)
             return 1
@@ -1975,8 +4896,22 @@ def main():
                     print_error("No tax years match the filter.", stats)
                     return 1
 
-            # Load control file once (shared across all years)
-            control = load_control_file(control_file_path)
+            if _watch_session is not None:
+                # --watch: statements, analyses and the control file stay in memory
+                control = _watch_session.load_control_file(control_file_path)
+                statement_cache = _watch_session.statement_cache
+                analysis_store = None if args.rule_stats else _watch_session.analysis_store
+            else:
+                # Load control file once (shared across all years)
+                control = load_control_file(control_file_path)
+
+                statement_cache = None
+                if args.statement_cache:
+                    statement_cache = StatementCache(default_statement_cache_path(args.data_file), stats)
+
+                analysis_store = None
+                if args.incremental and not args.rule_stats:
+                    analysis_store = AnalysisStore(default_analysis_store_path(args.data_file), stats)
 
             # Validate --ownership-report owner exists
             if args.ownership_report and isinstance(args.ownership_report, str):
@@ -1984,8 +4919,39 @@ def main():
                     print_error(f"Owner '{args.ownership_report}' not found in control file", stats)
                     return 1
 
+            if args.rule_stats:
+                report_rule_hits(tax_years, control, args.verbose, stats, statement_cache)
+
+                if statement_cache is not None:
+                    statement_cache.close()
+
+                print_summary(stats, args.verbose)
+                return 0
+
+            # With --jobs, load and analyse every statement of every tax
+            # year up front in a process pool; results are consumed below
+            # in data-file order so the output matches a serial run.
+            pending_jobs = None
+            if args.jobs > 1 and _watch_session is None:
+                # A cache the parent could not open is not retried (and warned about) per job
+                cache_path = statement_cache.filename if statement_cache is not None and statement_cache.usable else None
+                store_path = analysis_store.filename if analysis_store is not None and analysis_store.usable else None
+                import concurrent.futures
+
+                pool = concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs)
+                pending_jobs = {}
+                for ty_index, ty in enumerate(tax_years):
+                    for stmt_index, stmt in enumerate(ty.get('statements', [])):
+                        pending_jobs[(ty_index, stmt_index)] = pool.submit(
+                            analyse_statement_job,
+                            stmt['type'], stmt['file'], control, args.verbose, cache_path,
+                            args.fixed_point, args.stream, args.engine, bool(args.profile), store_path,
+                            args.classification_cache,
+                        )
+                pool.shutdown(wait=False)
+
             # Process each tax year
-            for ty in tax_years:
+            for ty_index, ty in enumerate(tax_years):
                 print()
                 print(f"Processing tax year: {ty['year']}")
                 print("-" * 50)
@@ -1993,37 +4959,28 @@ def main():
                 # 2a. Process each statement individually with its own rules
                 cumulative_analysis = None
 
-                for stmt in ty.get('statements', []):
-                    stmt_type = stmt['type']
-                    stmt_file = stmt['file']
-
-                    try:
-                        # Load the statement
-                        transactions = load_statement_by_type(stmt_type, stmt_file, args.verbose, stats)
-                        if not transactions:
-                            print_warning(f"No transactions loaded from {stmt_file}", stats)
-                            continue
-
-                        # Get rules for this statement type
-                        try:
-                            rules = get_rules_for_type(stmt_type, control)
-                        except ValueError as e:
-                            print_error(str(e), stats)
-                            continue
-
-                        # Analyse this statement
-                        analysis = analyse_transactions(transactions, control, rules)
+                for stmt_index, stmt in enumerate(ty.get('statements', [])):
+                    if pending_jobs is not None:
+                        # Replay the worker's output and counts in data-file order
+                        analysis, output, job_stats, trace, cache_counts = pending_jobs[(ty_index, stmt_index)].result()
+                        sys.stdout.write(output)
+                        if trace is not None:
+                            _profiler.merge_worker_trace(trace)
+                        if cache_counts is not None and _classification_cache is not None:
+                            _classification_cache.add_counts(cache_counts)
+                        stats.pass_count += job_stats.pass_count
+                        stats.warning_count += job_stats.warning_count
+                        stats.error_count += job_stats.error_count
+                    else:
+                        analysis = analyse_statement(
+                            stmt['type'], stmt['file'], control, args.verbose, stats, statement_cache,
+                            args.fixed_point, args.stream, args.engine, analysis_store,
+                        )
 
+                    if analysis is not None:
                         # Merge into cumulative result
                         cumulative_analysis = merge_analysis_results(cumulative_analysis, analysis)
 
-                    except NotImplementedError as e:
-                        print_error(str(e), stats)
-                        continue
-                    except Exception as e:
-                        print_error(f"Error processing {stmt_file}: {e}", stats)
-                        continue
-
                 if cumulative_analysis is None:
                     print_warning(f"No transactions processed for {ty['year']}. Skipping.", stats)
                     continue
@@ -2057,7 +5014,10 @@ def main():
                     if not hasattr(control, 'facet_definitions'):
                         print_error("Facet definitions not loaded in control file.", stats)
                     else:
-                        print_facet_summary(analysis, args.facet_report, control.facet_definitions, control, args.ownership_report)
+                        print_facet_summary(
+                            analysis, args.facet_report, control.facet_definitions, control,
+                            args.ownership_report, args.engine, args.fixed_point,
+                        )
 
                 if args.analyse:
                     print_analysis_report(analysis, control, args.ownership_report)
@@ -2081,22 +5041,22 @@ def main():
 
                 # 2g. Monthly summary (without ledger reconciliation)
                 if args.print_report:
-                    monthly, total_in, total_out = calculate_monthly_totals(all_transactions)
+                    if args.engine == "vectorised":
+                        monthly, total_in, total_out = calculate_table_monthly_totals_vectorised(analysis.table)
+                    else:
+                        monthly, total_in, total_out = calculate_table_monthly_totals(analysis.table)
                     print_monthly_summary(monthly, total_in, total_out)
 
                 # Optional: print a separator between years
                 print()
 
+            if statement_cache is not None:
+                statement_cache.close()
+            if analysis_store is not None:
+                analysis_store.close()
+
             # After processing all years, print a final summary
-            print()
-            print("============================================================")
-            print("SUMMARY")
-            print("============================================================")
-            print()
-            if args.verbose:
-                print(f"PASS checks : {stats.pass_count}")
-            print(f"Warnings    : {stats.warning_count}")
-            print(f"Errors      : {stats.error_count}")
+            print_summary(stats, args.verbose)
 
             if has_facet_errors:
                 return 1
@@ -2113,6 +5073,14 @@ def main():
         print_error("Either --statement or --data-file must be provided", stats)
         return 1
 
+    if args.rule_stats:
+        print_error("--rule-stats requires --data-file", stats)
+        return 1
+
+    if args.incremental:
+        print_error("--incremental requires --data-file", stats)
+        return 1
+
     if not os.path.isfile(args.statement):
         print_error(f"statement file not found: {args.statement}", stats)
         return 1
@@ -2154,25 +5122,49 @@ def main():
             return 1
 
     try:
-        # Load the single statement
-        transactions = load_statement_by_type("bank-lloyds", args.statement, args.verbose, stats)
+        if args.stream:
+            # Build a pipeline: rows are checked (and, with --analyse,
+            # classified) as they are read; nothing keeps the whole list.
+            print_pass(f"Analysing statment {args.statement}", args.verbose, stats)
+
+            balance_check = BalanceCheck(args.verbose, stats)
+            monthly_check = MonthlyTotalsCheck(args.fixed_point)
+            transactions = run_statement_checks(
+                iter_statement_lloyds(args.statement),
+                [
+                    StatementAccountCheck(stats),
+                    TransactionCountCheck(args.verbose, stats),
+                    TransactionTypeCheck(args.verbose, stats),
+                    ReverseChronologicalCheck(args.verbose, stats),
+                    TaxYearCheck(args.verbose, stats),
+                    balance_check,
+                    monthly_check,
+                ],
+            )
+        else:
+            # Load the single statement
+            cache = _watch_session.statement_cache if _watch_session is not None else None
+            transactions = load_statement_by_type("bank-lloyds", args.statement, args.verbose, stats, cache)
 
-        if not transactions:
-            raise RuntimeError("statement contains no transactions")
+            if not transactions:
+                raise RuntimeError("statement contains no transactions")
 
-        print_pass(f"{len(transactions)} transactions loaded", args.verbose, stats)
+            print_pass(f"{len(transactions)} transactions loaded", args.verbose, stats)
 
-        validate_transaction_types(transactions, args.verbose, stats)
-        verify_reverse_chronological_order(transactions, args.verbose, stats)
-        verify_tax_year(transactions, args.verbose, stats)
-        opening_balance, closing_balance = verify_balances(transactions, args.verbose, stats)
-        monthly, total_in, total_out = calculate_monthly_totals(transactions)
+            validate_transaction_types(transactions, args.verbose, stats)
+            verify_reverse_chronological_order(transactions, args.verbose, stats)
+            verify_tax_year(transactions, args.verbose, stats)
+            opening_balance, closing_balance = verify_balances(transactions, args.verbose, stats)
+            monthly, total_in, total_out = calculate_monthly_totals(transactions, args.fixed_point)
 
         if args.analyse:
             if not args.control_file:
                 raise RuntimeError("--analyse requires --control-file")
 
-            control = load_control_file(args.control_file)
+            if _watch_session is not None:
+                control = _watch_session.load_control_file(args.control_file)
+            else:
+                control = load_control_file(args.control_file)
 
             # Validate --ownership-report owner exists
             if args.ownership_report and isinstance(args.ownership_report, str):
@@ -2187,16 +5179,26 @@ def main():
                 print_error(str(e), stats)
                 return 1
 
-            analysis = analyse_transactions(transactions, control, rules)
+            analysis = analyse_with_engine(args.engine, transactions, control, rules, args.fixed_point)
 
             if args.facet_report:
                 if not hasattr(control, 'facet_definitions'):
                     print_error("Facet definitions not loaded in control file.", stats)
                 else:
-                    print_facet_summary(analysis, args.facet_report, control.facet_definitions, control, args.ownership_report)
+                    print_facet_summary(
+                        analysis, args.facet_report, control.facet_definitions, control,
+                        args.ownership_report, args.engine, args.fixed_point,
+                    )
 
             print_analysis_report(analysis, control, args.ownership_report)
 
+        if args.stream:
+            # Drain the pipeline if --analyse did not; this runs the final checks
+            apply_statement_checks(transactions, [])
+            opening_balance = balance_check.opening_balance
+            closing_balance = balance_check.closing_balance
+            monthly, total_in, total_out = monthly_check.totals()
+
         if args.print_report:
             print_report(monthly, total_in, total_out, opening_balance, closing_balance)
 
@@ -2230,15 +5232,7 @@ def main():
                 args.display_description_suffix,
             )
 
-        print()
-        print("============================================================")
-        print("SUMMARY")
-        print("============================================================")
-        print()
-        if args.verbose:
-            print(f"PASS checks : {stats.pass_count}")
-        print(f"Warnings    : {stats.warning_count}")
-        print(f"Errors      : {stats.error_count}")
+        print_summary(stats, args.verbose)
 
         if has_facet_errors:
             return 1
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+financial_statement_config.py
+
+YAML loading shared by financial-statement-analyser.py and
+financial-statement-analyser-control-file-checker.py.
+
+    * Parses with libyaml's CSafeLoader when PyYAML was built with it,
+      falling back to the pure-Python SafeLoader otherwise. Both accept
+      the same documents and build the same objects.
+    * Keeps a pickle of every parsed file in a cache directory, named
+      by the SHA-256 of the file's bytes. An unchanged data, control or
+      rules file is then read back without being parsed again, whatever
+      its path or mtime.
+    * Keeps the compiled form of control and rules files too (see
+      load_compiled), named by the SHA-256 of the file's bytes and of a
+      key for everything else the compiled objects depend on, so an
+      unchanged file is not validated and compiled again either.
+
+yaml, hashlib and pickle are imported only when a file is loaded, and
+yaml only when it actually has to be parsed: a run whose configs are all
+cached never loads yaml, and --help loads none of them.
+
+The cache lives in $XDG_CACHE_HOME/financial-statement-analyser/config
+(~/.cache/... when XDG_CACHE_HOME is unset). Entries are never modified
+in place, so concurrent runs can share it; a damaged or unreadable entry
+is ignored and the file is parsed again. Failing to write an entry is not
+an error.
+"""
+
+import io
+import os
+import sys
+
+
+# Bump when the pickled layout changes so old entries are not read back
+CACHE_FORMAT_VERSION = 1
+
+
+def default_cache_dir():
+    """Return the directory used for the parsed-config cache."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "financial-statement-analyser", "config")
+
+
+cache_dir = default_cache_dir()
+
+
+def set_cache_dir(path):
+    """Use PATH for the parsed-config cache; None disables the cache."""
+    global cache_dir
+    cache_dir = path
+
+
+def cache_file(digest):
+    """Return the cache entry for a file whose content hashes to DIGEST."""
+    return os.path.join(cache_dir, f"{digest}.v{CACHE_FORMAT_VERSION}.pickle")
+
+
+def read_cached(digest):
+    """Return (True, parsed) for a usable cache entry, else (False, None)."""
+    import pickle
+
+    try:
+        with open(cache_file(digest), "rb") as f:
+            version, parsed = pickle.load(f)
+    except Exception:
+        return False, None
+    if version != CACHE_FORMAT_VERSION:
+        return False, None
+    return True, parsed
+
+
+def write_cached(digest, parsed):
+    """Store a parsed file under DIGEST, replacing the entry atomically."""
+    import pickle
+    import tempfile
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((CACHE_FORMAT_VERSION, parsed), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_file(digest))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except (OSError, pickle.PicklingError):
+        pass
+
+
+def parse_yaml(data, filename):
+    """
+    Parse DATA (the bytes of FILENAME). libyaml words its errors
+    differently, so a document it rejects is parsed again with the
+    pure-Python loader to raise the usual yaml.safe_load error.
+    """
+    import yaml
+
+    try:
+        from yaml import CSafeLoader as FastSafeLoader
+    except ImportError:
+        FastSafeLoader = yaml.SafeLoader
+
+    stream = io.BytesIO(data)
+    stream.name = filename
+    try:
+        return yaml.load(stream, Loader=FastSafeLoader)
+    except yaml.YAMLError:
+        if FastSafeLoader is yaml.SafeLoader:
+            raise
+    stream.seek(0)
+    return yaml.load(stream, Loader=yaml.SafeLoader)
+
+
+def is_yaml_error(exc):
+    """
+    True if exc is a yaml.YAMLError. yaml is not imported for this: if
+    it has not been imported yet, exc cannot have come from it.
+    """
+    yaml = sys.modules.get("yaml")
+    return yaml is not None and isinstance(exc, yaml.YAMLError)
+
+
+def parse_cached(data, filename, digest):
+    """Parse DATA (whose SHA-256 is DIGEST) through the cache."""
+    found, parsed = read_cached(digest)
+    if found:
+        return parsed
+
+    parsed = parse_yaml(data, filename)
+    write_cached(digest, parsed)
+    return parsed
+
+
+def load_yaml(filename):
+    """
+    Parse a YAML file and return its content, as yaml.safe_load would.
+
+    Raises OSError if the file cannot be read and yaml.YAMLError if it is
+    not valid YAML. Every call returns a fresh object, so callers may
+    modify the result.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    if cache_dir is None:
+        return parse_yaml(data, filename)
+
+    import hashlib
+
+    return parse_cached(data, filename, hashlib.sha256(data).hexdigest())
+
+
+def load_compiled(filename, key, compile):
+    """
+    Parse a YAML file and return compile(parsed), caching the result.
+
+    compile returns (result, cacheable). A cacheable result is kept under
+    the SHA-256 of the file's content and KEY, a string that must name
+    everything else the result depends on (the compiler's version, what
+    the file is checked against). A result that is not cacheable, such
+    as one listing the file's errors, is compiled again on every call.
+
+    Raises as load_yaml does; every call returns a fresh object.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+
+    if cache_dir is None:
+        return compile(parse_yaml(data, filename))[0]
+
+    import hashlib
+
+    digest = hashlib.sha256(data).hexdigest()
+    compiled_digest = hashlib.sha256(f"{digest}\0{key}".encode()).hexdigest()
+    found, result = read_cached(compiled_digest)
+    if found:
+        return result
+
+    result, cacheable = compile(parse_cached(data, filename, digest))
+    if cacheable:
+        write_cached(compiled_digest, result)
+    return result
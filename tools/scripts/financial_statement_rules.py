@@ -0,0 +1,1401 @@
+#!/usr/bin/env python3
+"""
+financial_statement_rules.py
+
+Control-file and rules-file compiler shared by financial-statement-analyser.py
+and financial-statement-analyser-control-file-checker.py.
+
+Each file is checked against the schema below and turned into Person,
+Category, Rule and ControlFile objects in the same pass, so checking a
+file and using it parse and compile it only once:
+
+    * load_control / load_rules read a file (through
+      financial_statement_config, so the config cache applies to the
+      parsed file and, for a file without errors, to its compiled
+      objects) and return (compiled object or None, errors, warnings).
+      The checker reports the errors and warnings.
+    * read_control_file / read_rules_file return the compiled object and
+      raise ConfigError if the file has any errors. The analyser uses
+      these.
+
+Control file schema:
+
+- Required top-level keys: defaults, people, categories, and rules unless
+  statement_handling is given
+- Optional top-level keys: version, facets, validation, statement_handling
+- No unknown keys anywhere, and the allowed keys have the right types
+- direction is inside expect (not at rule level)
+- match, classify, expect, when blocks are correctly structured; match
+  types are those in MATCH_TYPES, when conditions those with a checker or
+  compiler registered
+- Duplicate rule IDs and duplicate statement_handling types
+- Valid direction values
+- Categories, facets and people referenced in rules exist
+- Ownership (defaults and rules) sums to exactly 100
+- No hardcoded transaction type validation (left to the analyser)
+
+A rules file (named in statement_handling) is a mapping with a 'rules'
+list, and optionally 'version'. Its rules follow the same schema; given
+the control file, their category, facet and person references are
+checked against it.
+
+Rules are matched against a transaction's normalised description (see
+normalise_description): upper-cased, with each run of whitespace
+collapsed to one space. description, prefix and contains values are
+normalised the same way when compiled; regex values are kept as written.
+"""
+
+import os
+import re
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+
+from financial_statement_config import is_yaml_error, load_compiled
+
+
+# ----------------------------------------------------------------------
+# Schema: allowed values and key sets
+# ----------------------------------------------------------------------
+
+# Valid direction values
+VALID_DIRECTIONS = {"credit", "debit"}
+
+# Allowed top-level keys
+ALLOWED_TOP_LEVEL_KEYS = {
+    "version",
+    "defaults",
+    "people",
+    "facets",
+    "validation",
+    "categories",
+    "statement_handling",
+    "rules",
+}
+
+# Allowed top-level keys of a rules file
+ALLOWED_RULES_FILE_KEYS = {
+    "version",
+    "rules",
+}
+
+ALLOWED_DEFAULTS_KEYS = {"category", "ownership"}
+ALLOWED_PERSON_KEYS = {"full_name"}
+ALLOWED_CATEGORY_KEYS = {"description", "default_facets"}
+ALLOWED_FACET_GROUP_KEYS = {"description", "codes"}
+ALLOWED_FACET_ITEM_KEYS = {"code", "description", "suppress_in_report"}
+ALLOWED_VALIDATION_KEYS = {"compulsory_facet_prefixes"}
+ALLOWED_STATEMENT_HANDLING_KEYS = {"type", "rules_file"}
+
+# Keys allowed inside a rule
+ALLOWED_RULE_KEYS = {
+    "id",
+    "priority",
+    "match",
+    "expect",
+    "classify",
+    "ownership",
+    "when",
+}
+
+# Keys allowed inside expect
+ALLOWED_EXPECT_KEYS = {
+    "transaction_types",
+    "direction",
+}
+
+# Keys allowed inside classify
+ALLOWED_CLASSIFY_KEYS = {
+    "category",
+    "facets",
+}
+
+# Match condition types, in the order they are listed in messages
+MATCH_TYPES = (
+    "description",
+    "prefix",
+    "contains",
+    "regex",
+)
+
+# Regex conditions are searched for anywhere in the normalised
+# description, ignoring case (as the other match types do in effect)
+REGEX_FLAGS = re.IGNORECASE
+
+WHITESPACE_RUN = re.compile(r"\s+")
+
+
+# ----------------------------------------------------------------------
+# Compiled objects
+# ----------------------------------------------------------------------
+
+@dataclass
+class Person:
+    id: str
+    full_name: str
+
+
+@dataclass
+class Category:
+    id: str
+    description: str
+    default_facets: list[str] = field(default_factory=list)
+
+@dataclass
+class MatchCondition:
+    type: str   # one of MATCH_TYPES
+    value: str  # normalised (see normalise_description), except for regex
+
+@dataclass
+class Rule:
+    id: str
+    priority: int
+    conditions: list[MatchCondition]
+    category: str
+    ownership: dict[str, int]
+    transaction_types: set[str] | None
+    direction: str | None
+    when: list[dict] | None = None
+    facets: list[str] | None = None
+    # "when" groups compiled into predicates by compile_when()
+    when_predicates: list[tuple] | None = None
+
+    def __getstate__(self):
+        # The predicates are closures: pickle the rule without them and
+        # compile them again from "when" when it is unpickled
+        state = dict(self.__dict__)
+        state["when_predicates"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.when_predicates = compile_when(self.when)
+
+@dataclass
+class ControlFile:
+    people: dict[str, Person]
+    categories: dict[str, Category]
+    default_category: str
+    default_ownership: dict[str, int]
+    facet_definitions: dict = field(default_factory=dict)
+    statement_handling: dict[str, str] = field(default_factory=dict)
+
+
+# ----------------------------------------------------------------------
+# Validation results
+# ----------------------------------------------------------------------
+
+class ValidationError:
+    """Represents a validation error with optional line number."""
+
+    def __init__(self, message, line=None, column=None):
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        if self.line is not None:
+            return f"Line {self.line}: {self.message}"
+        return self.message
+
+
+class ValidationWarning:
+    """Represents a validation warning with optional line number."""
+
+    def __init__(self, message, line=None, column=None):
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def __str__(self):
+        if self.line is not None:
+            return f"Line {self.line}: {self.message}"
+        return self.message
+
+
+class ConfigError(ValueError):
+    """A control or rules file that failed validation."""
+
+    def __init__(self, kind, filename, errors):
+        self.kind = kind
+        self.filename = filename
+        self.errors = errors
+        lines = [f"{kind} {filename} is not valid ({len(errors)} error(s)):"]
+        lines.extend(f"  {err}" for err in errors)
+        super().__init__("\n".join(lines))
+
+
+# ----------------------------------------------------------------------
+# Condition checkers for "when" clauses
+# ----------------------------------------------------------------------
+
+CONDITION_CHECKERS = {}
+
+def register_checker(cond_type):
+    """Decorator to register a condition checker function."""
+    def decorator(func):
+        CONDITION_CHECKERS[cond_type] = func
+        return func
+    return decorator
+
+def parse_date(date_str):
+    """Parse a date string in DD-MM-YYYY or YYYY-MM-DD format."""
+    date_str = date_str.strip()
+    # Try YYYY-MM-DD first
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        pass
+    # Try DD-MM-YYYY
+    try:
+        return datetime.strptime(date_str, "%d-%m-%Y")
+    except ValueError:
+        raise ValueError(f"Unrecognised date format: {date_str}")
+
+def parse_tax_year(tax_year_str):
+    """Return (start_date, end_date) for a UK tax year like '2023-2024'."""
+    parts = tax_year_str.split('-')
+    if len(parts) != 2:
+        raise ValueError(f"Invalid tax year format: {tax_year_str}")
+    start_year = int(parts[0])
+    start = datetime(start_year, 4, 6)
+    end = datetime(start_year + 1, 4, 5)
+    return start, end
+
+# Condition checkers
+@register_checker("amount_range")
+def check_amount_range(tx, value):
+    """value is [min, max] inclusive."""
+    min_val, max_val = value
+    amount = tx.credit if tx.credit else tx.debit
+    return min_val <= amount <= max_val
+
+@register_checker("amount_exact")
+def check_amount_exact(tx, value):
+    """value is a single number."""
+    amount = tx.credit if tx.credit else tx.debit
+    return amount == value
+
+@register_checker("line_numbers")
+def check_line_numbers(tx, value):
+    """value is a list of line numbers."""
+    return tx.line_number in value
+
+@register_checker("tax_year")
+def check_tax_year(tx, value):
+    """value is a string like '2023-2024'."""
+    start, end = parse_tax_year(value)
+    return start <= tx.date <= end
+
+@register_checker("date_range")
+def check_date_range(tx, value):
+    """value is [start_date, end_date] as strings."""
+    start_str, end_str = value
+    start = parse_date(start_str)
+    end = parse_date(end_str)
+    return start <= tx.date <= end
+
+# ----------------------------------------------------------------------
+# Condition compilers for "when" clauses
+#
+# A compiler takes the condition value once, at rule load time, and
+# returns a predicate(tx).  Condition types that only have a checker
+# registered still work: they are wrapped so the checker is called
+# with the raw value.
+# ----------------------------------------------------------------------
+
+CONDITION_COMPILERS = {}
+
+def register_compiler(cond_type):
+    """Decorator to register a condition compiler function."""
+    def decorator(func):
+        CONDITION_COMPILERS[cond_type] = func
+        return func
+    return decorator
+
+def to_decimal(value):
+    """Convert a YAML number (int, float or str) to Decimal without float noise."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+@register_compiler("amount_range")
+def compile_amount_range(value):
+    min_val, max_val = (to_decimal(v) for v in value)
+
+    def predicate(tx):
+        amount = tx.credit if tx.credit else tx.debit
+        return min_val <= amount <= max_val
+    return predicate
+
+@register_compiler("amount_exact")
+def compile_amount_exact(value):
+    expected = to_decimal(value)
+
+    def predicate(tx):
+        amount = tx.credit if tx.credit else tx.debit
+        return amount == expected
+    return predicate
+
+@register_compiler("line_numbers")
+def compile_line_numbers(value):
+    line_numbers = frozenset(value)
+
+    def predicate(tx):
+        return tx.line_number in line_numbers
+    return predicate
+
+@register_compiler("tax_year")
+def compile_tax_year(value):
+    start, end = parse_tax_year(value)
+
+    def predicate(tx):
+        return start <= tx.date <= end
+    return predicate
+
+@register_compiler("date_range")
+def compile_date_range(value):
+    start_str, end_str = value
+    start = parse_date(start_str)
+    end = parse_date(end_str)
+
+    def predicate(tx):
+        return start <= tx.date <= end
+    return predicate
+
+def compile_condition(cond_type, cond_value):
+    """Return a predicate(tx) for one "when" condition, or None if the type is unknown."""
+    compiler = CONDITION_COMPILERS.get(cond_type)
+    if compiler is not None:
+        return compiler(cond_value)
+
+    checker = CONDITION_CHECKERS.get(cond_type)
+    if checker is not None:
+        return lambda tx: checker(tx, cond_value)
+
+    return None
+
+def compile_when(when):
+    """
+    Compile a rule's "when" list into a list of predicate tuples.
+
+    Each tuple is one group (all predicates must pass); the rule passes
+    if any group passes.  A group containing an unknown condition type
+    can never pass, so it is dropped.
+    """
+    if when is None:
+        return None
+
+    groups = []
+    for group in when:
+        predicates = []
+        for cond_type, cond_value in group.items():
+            predicate = compile_condition(cond_type, cond_value)
+            if predicate is None:
+                # Unknown condition type – treat as failure to be safe
+                break
+            predicates.append(predicate)
+        else:
+            groups.append(tuple(predicates))
+    return groups
+
+def when_condition_types():
+    """Return the set of condition types a "when" group may use."""
+    return set(CONDITION_COMPILERS) | set(CONDITION_CHECKERS)
+
+
+# ----------------------------------------------------------------------
+# Value checks for "when" conditions
+#
+# Each check returns the end of an error message ("must be ...") or None.
+# They run before the condition is compiled, so that a malformed value
+# is reported rather than raising inside a compiler.
+# ----------------------------------------------------------------------
+
+WHEN_VALUE_CHECKS = {}
+
+def register_value_check(cond_type):
+    """Decorator to register a value check for a "when" condition type."""
+    def decorator(func):
+        WHEN_VALUE_CHECKS[cond_type] = func
+        return func
+    return decorator
+
+def is_number(value):
+    try:
+        Decimal(value)
+    except (ArithmeticError, TypeError, ValueError):
+        return False
+    return True
+
+@register_value_check("amount_range")
+def check_amount_range_value(value):
+    if not isinstance(value, list) or len(value) != 2:
+        return "must be [min, max]"
+    if not (is_number(value[0]) and is_number(value[1])):
+        return "values must be numbers"
+    return None
+
+@register_value_check("amount_exact")
+def check_amount_exact_value(value):
+    if not is_number(value):
+        return "must be a number"
+    return None
+
+@register_value_check("line_numbers")
+def check_line_numbers_value(value):
+    if not isinstance(value, list):
+        return "must be a list of integers"
+    if not all(isinstance(line_number, int) for line_number in value):
+        return "must contain integers"
+    return None
+
+@register_value_check("tax_year")
+def check_tax_year_value(value):
+    if not isinstance(value, str):
+        return "must be a string like '2023-2024'"
+    if "-" not in value:
+        return "must be in format 'YYYY-YYYY'"
+    return None
+
+@register_value_check("date_range")
+def check_date_range_value(value):
+    if not isinstance(value, list) or len(value) != 2:
+        return "must be [start, end]"
+    if not all(isinstance(date, str) for date in value):
+        return "dates must be quoted strings like '2024-04-06'"
+    return None
+
+
+# ----------------------------------------------------------------------
+# Helper functions
+# ----------------------------------------------------------------------
+
+def unknown_keys(data, allowed):
+    """Return the keys of data not in allowed, in file order."""
+    return [key for key in data if key not in allowed]
+
+def is_name(value):
+    """True for a non-empty, non-blank string."""
+    return isinstance(value, str) and bool(value.strip())
+
+def describe_choices(names):
+    """Return "'a' or 'b'" / "'a', 'b' or 'c'" for a sequence of names."""
+    quoted = [f"'{name}'" for name in names]
+    if len(quoted) == 1:
+        return quoted[0]
+    return ", ".join(quoted[:-1]) + " or " + quoted[-1]
+
+def get_rule_identifier(rule_data, idx):
+    """
+    Get a human-readable identifier for a rule.
+
+    Args:
+        rule_data (dict): The rule data.
+        idx (int): The rule index (1-based).
+
+    Returns:
+        str: Either "ID: 'rule_id'" or "#idx" if no ID is present.
+    """
+    if "id" in rule_data and isinstance(rule_data["id"], str) and rule_data["id"].strip():
+        return f"ID: '{rule_data['id']}'"
+    return f"#{idx}"
+
+@dataclass
+class RuleContext:
+    """
+    What rules may refer to. A None set means references of that kind are
+    not checked (a rules file compiled without its control file).
+    """
+    category_ids: set[str] | None = None
+    facet_codes: set[str] | None = None
+    people_ids: set[str] | None = None
+
+def rule_context(control):
+    """Return the RuleContext for rules used with a compiled control file."""
+    facet_codes = set()
+    for group in control.facet_definitions.values():
+        facet_codes.update(group["codes"])
+    return RuleContext(
+        category_ids=set(control.categories),
+        facet_codes=facet_codes,
+        people_ids=set(control.people),
+    )
+
+
+# ----------------------------------------------------------------------
+# Rules
+# ----------------------------------------------------------------------
+
+def match_value_problem(cond_type, cond_value):
+    """Return what is wrong with a match condition's (non-empty string) value, or None."""
+    if cond_type == "regex":
+        try:
+            re.compile(cond_value, REGEX_FLAGS)
+        except re.error as e:
+            return f"is not a valid regular expression: {e}"
+    return None
+
+def normalise_description(text):
+    """Upper-case text and collapse each run of whitespace to one space."""
+    return WHITESPACE_RUN.sub(" ", text.upper())
+
+def make_condition(cond_type, cond_value):
+    """Return the MatchCondition for a valid condition."""
+    if cond_type == "regex":
+        return MatchCondition(type=cond_type, value=cond_value)
+    return MatchCondition(type=cond_type, value=normalise_description(cond_value))
+
+def compile_match(match_data, rule_id, errors):
+    """
+    Validate a rule's 'match' block and return its MatchConditions
+    (see make_condition), or None if it is not valid.
+
+    Args:
+        match_data: The parsed YAML data from the match key.
+        rule_id (str): The rule identifier (for error messages).
+        errors (list): List to append ValidationError objects.
+    """
+    if isinstance(match_data, str):
+        if not match_data.strip():
+            errors.append(ValidationError(f"{rule_id} 'match' cannot be an empty string"))
+            return None
+        # A plain string is a description match (old style)
+        return [make_condition("description", match_data)]
+
+    if isinstance(match_data, dict):
+        # Single condition: must have exactly one key
+        if len(match_data) != 1:
+            errors.append(ValidationError(
+                f"{rule_id} 'match' dictionary must have exactly one key (got {len(match_data)})"
+            ))
+            return None
+
+        cond_type, cond_value = next(iter(match_data.items()))
+        if cond_type not in MATCH_TYPES:
+            errors.append(ValidationError(
+                f"{rule_id} 'match' has unknown condition type: '{cond_type}' (expected {describe_choices(MATCH_TYPES)})"
+            ))
+            return None
+        if not is_name(cond_value):
+            errors.append(ValidationError(
+                f"{rule_id} 'match' value for '{cond_type}' must be a non-empty string"
+            ))
+            return None
+        problem = match_value_problem(cond_type, cond_value)
+        if problem is not None:
+            errors.append(ValidationError(f"{rule_id} 'match' value for '{cond_type}' {problem}"))
+            return None
+        return [make_condition(cond_type, cond_value)]
+
+    if isinstance(match_data, list):
+        conditions = []
+        valid = True
+        for cond_idx, cond in enumerate(match_data, start=1):
+            if not isinstance(cond, dict):
+                errors.append(ValidationError(
+                    f"{rule_id} 'match' condition #{cond_idx} must be a dictionary"
+                ))
+                valid = False
+                continue
+
+            if len(cond) != 1:
+                errors.append(ValidationError(
+                    f"{rule_id} 'match' condition #{cond_idx} must have exactly one key (got {len(cond)})"
+                ))
+                valid = False
+                continue
+
+            cond_type, cond_value = next(iter(cond.items()))
+            if cond_type not in MATCH_TYPES:
+                errors.append(ValidationError(
+                    f"{rule_id} 'match' condition #{cond_idx} has unknown type: '{cond_type}'"
+                ))
+                valid = False
+            elif not is_name(cond_value):
+                errors.append(ValidationError(
+                    f"{rule_id} 'match' condition #{cond_idx} value must be a non-empty string"
+                ))
+                valid = False
+            elif match_value_problem(cond_type, cond_value) is not None:
+                errors.append(ValidationError(
+                    f"{rule_id} 'match' condition #{cond_idx} value "
+                    f"{match_value_problem(cond_type, cond_value)}"
+                ))
+                valid = False
+            else:
+                conditions.append(make_condition(cond_type, cond_value))
+        return conditions if valid else None
+
+    errors.append(ValidationError(
+        f"{rule_id} 'match' must be a string, dict, or list (got {type(match_data).__name__})"
+    ))
+    return None
+
+def check_ownership(ownership, where, people_ids, errors):
+    """Check an ownership mapping: known people, integer percentages summing to 100."""
+    total_ownership = 0
+    for person_id, pct in ownership.items():
+        if people_ids is not None and person_id not in people_ids:
+            errors.append(ValidationError(
+                f"{where} references unknown person: '{person_id}'"
+            ))
+        if not isinstance(pct, int):
+            errors.append(ValidationError(
+                f"{where} for '{person_id}' must be an integer (got {type(pct).__name__})"
+            ))
+            continue
+        if pct < 0 or pct > 100:
+            errors.append(ValidationError(
+                f"{where} for '{person_id}' must be between 0 and 100 (got {pct})"
+            ))
+        total_ownership += pct
+
+    if total_ownership != 100:
+        errors.append(ValidationError(
+            f"{where} totals must sum to exactly 100 (got {total_ownership})"
+        ))
+
+def compile_when_groups(when, rid, errors):
+    """
+    Validate a rule's 'when' list and compile it as compile_when would.
+    Returns the predicate groups, or None if the list is not valid.
+    """
+    if not isinstance(when, list):
+        errors.append(ValidationError(f"{rid} 'when' must be a list"))
+        return None
+
+    valid_conditions = when_condition_types()
+    groups = []
+    valid = True
+    for group_idx, group in enumerate(when, start=1):
+        if not isinstance(group, dict):
+            errors.append(ValidationError(
+                f"{rid} 'when' group #{group_idx} must be a dictionary"
+            ))
+            valid = False
+            continue
+
+        # Each group is a dict of conditions
+        predicates = []
+        for cond_type, cond_value in group.items():
+            if cond_type not in valid_conditions:
+                errors.append(ValidationError(
+                    f"{rid} 'when' group #{group_idx} has unknown condition type: '{cond_type}'"
+                ))
+                valid = False
+                continue
+
+            # Validate value types by condition type
+            value_check = WHEN_VALUE_CHECKS.get(cond_type)
+            problem = value_check(cond_value) if value_check is not None else None
+            if problem is not None:
+                errors.append(ValidationError(
+                    f"{rid} 'when' group #{group_idx}.{cond_type} {problem}"
+                ))
+                valid = False
+                continue
+
+            try:
+                predicates.append(compile_condition(cond_type, cond_value))
+            except (ArithmeticError, TypeError, ValueError) as e:
+                errors.append(ValidationError(
+                    f"{rid} 'when' group #{group_idx}.{cond_type} is not valid: {e}"
+                ))
+                valid = False
+        groups.append(tuple(predicates))
+
+    return groups if valid else None
+
+def compile_rule(rule_data, rid, errors, context, rule_ids):
+    """
+    Validate one rule; return it as a Rule, or None if it has errors.
+    rule_ids holds the IDs seen so far in the list, to report duplicates.
+    """
+    errors_before = len(errors)
+
+    # Check rule-level keys
+    for key in unknown_keys(rule_data, ALLOWED_RULE_KEYS):
+        errors.append(ValidationError(f"{rid} has unknown key: '{key}'"))
+
+    # Validate 'id'
+    if "id" not in rule_data:
+        errors.append(ValidationError(f"{rid} missing 'id'"))
+    elif not is_name(rule_data["id"]):
+        errors.append(ValidationError(f"{rid} has invalid 'id': must be non-empty string"))
+    else:
+        if rule_data["id"] in rule_ids:
+            errors.append(ValidationError(f"Duplicate rule ID: '{rule_data['id']}' (also in {rid})"))
+        rule_ids.add(rule_data["id"])
+
+    # Validate 'priority'
+    if "priority" not in rule_data:
+        errors.append(ValidationError(f"{rid} missing 'priority'"))
+    elif not isinstance(rule_data["priority"], int):
+        priority = rule_data["priority"]
+        errors.append(ValidationError(f"{rid} 'priority' must be an integer (got {type(priority).__name__})"))
+
+    # Validate 'match'
+    conditions = None
+    if "match" not in rule_data:
+        errors.append(ValidationError(f"{rid} missing 'match'"))
+    else:
+        conditions = compile_match(rule_data["match"], rid, errors)
+
+    # Validate 'expect' (optional)
+    expect = rule_data.get("expect", {})
+    if not isinstance(expect, dict):
+        errors.append(ValidationError(f"{rid} 'expect' must be a dictionary"))
+    else:
+        for key in unknown_keys(expect, ALLOWED_EXPECT_KEYS):
+            errors.append(ValidationError(f"{rid} 'expect' has unknown key: '{key}'"))
+
+        if "transaction_types" in expect:
+            tx_types = expect["transaction_types"]
+            if not isinstance(tx_types, list):
+                errors.append(ValidationError(
+                    f"{rid} 'expect.transaction_types' must be a list"
+                ))
+            else:
+                for tx_type in tx_types:
+                    if not is_name(tx_type):
+                        errors.append(ValidationError(
+                            f"{rid} 'expect.transaction_types' contains invalid value: {tx_type}"
+                        ))
+
+        if "direction" in expect:
+            direction = expect["direction"]
+            if not isinstance(direction, str):
+                errors.append(ValidationError(
+                    f"{rid} 'expect.direction' must be a string"
+                ))
+            elif direction not in VALID_DIRECTIONS:
+                errors.append(ValidationError(
+                    f"{rid} 'expect.direction' must be 'credit' or 'debit' (got '{direction}')"
+                ))
+
+    # Validate 'classify'
+    classify = rule_data.get("classify")
+    if "classify" not in rule_data:
+        errors.append(ValidationError(f"{rid} missing 'classify'"))
+    elif not isinstance(classify, dict):
+        errors.append(ValidationError(f"{rid} 'classify' must be a dictionary"))
+    else:
+        for key in unknown_keys(classify, ALLOWED_CLASSIFY_KEYS):
+            errors.append(ValidationError(f"{rid} 'classify' has unknown key: '{key}'"))
+
+        if "category" not in classify:
+            errors.append(ValidationError(f"{rid} 'classify.category' is required"))
+        elif not is_name(classify["category"]):
+            errors.append(ValidationError(
+                f"{rid} 'classify.category' must be a non-empty string"
+            ))
+        elif context.category_ids is not None and classify["category"] not in context.category_ids:
+            errors.append(ValidationError(
+                f"{rid} 'classify.category' references unknown category: '{classify['category']}'"
+            ))
+
+        if "facets" in classify:
+            facets_val = classify["facets"]
+            if isinstance(facets_val, str):
+                if not facets_val.strip():
+                    errors.append(ValidationError(
+                        f"{rid} 'classify.facets' cannot be an empty string"
+                    ))
+                elif context.facet_codes is not None and facets_val not in context.facet_codes:
+                    errors.append(ValidationError(
+                        f"{rid} 'classify.facets' references unknown facet: '{facets_val}'"
+                    ))
+            elif isinstance(facets_val, list):
+                for facet in facets_val:
+                    if not is_name(facet):
+                        errors.append(ValidationError(
+                            f"{rid} 'classify.facets' contains invalid value: {facet}"
+                        ))
+                    elif context.facet_codes is not None and facet not in context.facet_codes:
+                        errors.append(ValidationError(
+                            f"{rid} 'classify.facets' references unknown facet: '{facet}'"
+                        ))
+            else:
+                errors.append(ValidationError(
+                    f"{rid} 'classify.facets' must be a string or list of strings"
+                ))
+
+    # Validate 'ownership' (optional)
+    ownership = rule_data.get("ownership", {})
+    if not isinstance(ownership, dict):
+        errors.append(ValidationError(f"{rid} 'ownership' must be a dictionary"))
+    elif "ownership" in rule_data:
+        check_ownership(ownership, f"{rid} 'ownership'", context.people_ids, errors)
+
+    # Validate and compile 'when' (optional)
+    when = rule_data.get("when")
+    when_predicates = None
+    if "when" in rule_data:
+        when_predicates = compile_when_groups(when, rid, errors)
+
+    if len(errors) != errors_before:
+        return None
+
+    return Rule(
+        id=rule_data["id"],
+        priority=rule_data["priority"],
+        conditions=conditions,
+        category=classify["category"],
+        ownership=ownership,
+        transaction_types=set(expect.get("transaction_types", [])) or None,
+        direction=expect.get("direction"),
+        when=when,
+        facets=classify.get("facets"),
+        when_predicates=when_predicates,
+    )
+
+def compile_rule_list(rules_data, errors, context):
+    """
+    Validate a 'rules' list and compile it. Returns the Rules sorted by
+    priority (highest first, file order among equals); rules with errors
+    are left out.
+    """
+    rules = []
+    rule_ids = set()
+    for idx, rule_data in enumerate(rules_data, start=1):
+        if not isinstance(rule_data, dict):
+            errors.append(ValidationError(f"Rule #{idx} must be a dictionary."))
+            continue
+
+        # Get a human-readable identifier for this rule
+        rid = get_rule_identifier(rule_data, idx)
+
+        rule = compile_rule(rule_data, rid, errors, context, rule_ids)
+        if rule is not None:
+            rules.append(rule)
+
+    rules.sort(key=lambda rule: rule.priority, reverse=True)
+    return rules
+
+
+# ----------------------------------------------------------------------
+# Control file
+# ----------------------------------------------------------------------
+
+def compile_control(raw, filename, errors, warnings):
+    """
+    Validate a parsed control file and compile it.
+
+    Args:
+        raw: The parsed YAML document.
+        filename (str): Path of the file (rules files are relative to it).
+        errors (list): List to append ValidationError objects.
+        warnings (list): List to append ValidationWarning objects.
+
+    Returns:
+        ControlFile, or None if raw is not a mapping. If errors were found
+        the ControlFile holds only the parts that are valid (so that, for
+        example, its statement_handling can still be followed).
+    """
+    if not isinstance(raw, dict):
+        errors.append(ValidationError("Control file must be a mapping of top-level keys."))
+        return None
+
+    # ------------------------------------------------------------------
+    # 1. Check top-level keys
+    # ------------------------------------------------------------------
+    required_keys = ["defaults", "people", "categories"]
+    if "statement_handling" not in raw:
+        required_keys.append("rules")
+    for key in required_keys:
+        if key not in raw:
+            errors.append(ValidationError(f"Missing required top-level key: '{key}'"))
+
+    for key in unknown_keys(raw, ALLOWED_TOP_LEVEL_KEYS):
+        errors.append(ValidationError(f"Unknown top-level key: '{key}'"))
+
+    people = {}
+    people_ids = set()
+    categories = {}
+    category_ids = set()
+    facet_definitions = {}
+    statement_handling = {}
+    facet_definition_codes = set()   # codes defined in facets section
+
+    # ------------------------------------------------------------------
+    # 2. Validate 'defaults'
+    # ------------------------------------------------------------------
+    defaults = raw.get("defaults")
+    if "defaults" in raw:
+        if not isinstance(defaults, dict):
+            errors.append(ValidationError("'defaults' must be a dictionary."))
+        else:
+            if "category" not in defaults:
+                errors.append(ValidationError("'defaults.category' is required."))
+            elif not is_name(defaults["category"]):
+                errors.append(ValidationError("'defaults.category' must be a non-empty string."))
+
+            if "ownership" not in defaults:
+                errors.append(ValidationError("'defaults.ownership' is required."))
+            elif not isinstance(defaults["ownership"], dict):
+                errors.append(ValidationError("'defaults.ownership' must be a dictionary."))
+            # Ownership values are checked once the people are known (step 3)
+
+            for key in unknown_keys(defaults, ALLOWED_DEFAULTS_KEYS):
+                errors.append(ValidationError(f"Unknown key in 'defaults': '{key}'"))
+
+    # ------------------------------------------------------------------
+    # 3. Validate 'people'
+    # ------------------------------------------------------------------
+    if "people" in raw:
+        if not isinstance(raw["people"], dict):
+            errors.append(ValidationError("'people' must be a dictionary."))
+        else:
+            for person_id, person_data in raw["people"].items():
+                if not is_name(person_id):
+                    errors.append(ValidationError(f"Person ID must be a non-empty string (got: {person_id})"))
+                    continue
+
+                if not isinstance(person_data, dict):
+                    errors.append(ValidationError(f"Person '{person_id}' must be a dictionary."))
+                    people_ids.add(person_id)
+                    continue
+
+                if "full_name" not in person_data:
+                    errors.append(ValidationError(f"Person '{person_id}' missing 'full_name'"))
+                elif not is_name(person_data["full_name"]):
+                    errors.append(ValidationError(f"Person '{person_id}' has empty 'full_name'"))
+
+                for key in unknown_keys(person_data, ALLOWED_PERSON_KEYS):
+                    errors.append(ValidationError(f"Person '{person_id}' has unknown key: '{key}'"))
+
+                people_ids.add(person_id)
+                people[person_id] = Person(id=person_id, full_name=person_data.get("full_name"))
+
+    if isinstance(defaults, dict) and isinstance(defaults.get("ownership"), dict):
+        check_ownership(defaults["ownership"], "'defaults.ownership'", people_ids, errors)
+
+    # ------------------------------------------------------------------
+    # 4. Validate 'categories'
+    # ------------------------------------------------------------------
+    if "categories" in raw:
+        if not isinstance(raw["categories"], dict):
+            errors.append(ValidationError("'categories' must be a dictionary."))
+        else:
+            for cat_id, cat_data in raw["categories"].items():
+                if not is_name(cat_id):
+                    errors.append(ValidationError(f"Category ID must be a non-empty string (got: {cat_id})"))
+                    continue
+
+                if not isinstance(cat_data, dict):
+                    errors.append(ValidationError(f"Category '{cat_id}' must be a dictionary."))
+                    category_ids.add(cat_id)
+                    continue
+
+                if "description" not in cat_data:
+                    errors.append(ValidationError(f"Category '{cat_id}' missing 'description'"))
+                elif not is_name(cat_data["description"]):
+                    errors.append(ValidationError(f"Category '{cat_id}' has empty 'description'"))
+
+                default_facets = cat_data.get("default_facets", [])
+                if not isinstance(default_facets, list):
+                    errors.append(ValidationError(
+                        f"Category '{cat_id}'.default_facets must be a list (got {type(default_facets).__name__})"
+                    ))
+                else:
+                    for facet in default_facets:
+                        if not is_name(facet):
+                            errors.append(ValidationError(
+                                f"Category '{cat_id}'.default_facets contains empty or non-string value: {facet}"
+                            ))
+
+                for key in unknown_keys(cat_data, ALLOWED_CATEGORY_KEYS):
+                    errors.append(ValidationError(f"Category '{cat_id}' has unknown key: '{key}'"))
+
+                category_ids.add(cat_id)
+                categories[cat_id] = Category(
+                    id=cat_id,
+                    description=cat_data.get("description"),
+                    default_facets=default_facets,
+                )
+
+    # ------------------------------------------------------------------
+    # 5. Validate 'facets' (if present)
+    # ------------------------------------------------------------------
+    if "facets" in raw:
+        if not isinstance(raw["facets"], dict):
+            errors.append(ValidationError("'facets' must be a dictionary."))
+        else:
+            for group_name, group_data in raw["facets"].items():
+                if not is_name(group_name):
+                    errors.append(ValidationError(f"Facet group name must be a non-empty string (got: {group_name})"))
+                    continue
+
+                if not isinstance(group_data, dict):
+                    errors.append(ValidationError(f"Facet group '{group_name}' must be a dictionary."))
+                    continue
+
+                if "description" not in group_data:
+                    warnings.append(ValidationWarning(
+                        f"Facet group '{group_name}' missing 'description' (optional but recommended)"
+                    ))
+
+                codes_dict = {}
+                if "codes" not in group_data:
+                    errors.append(ValidationError(f"Facet group '{group_name}' missing 'codes'"))
+                elif not isinstance(group_data["codes"], list):
+                    errors.append(ValidationError(
+                        f"Facet group '{group_name}'.codes must be a list (got {type(group_data['codes']).__name__})"
+                    ))
+                else:
+                    for code_item in group_data["codes"]:
+                        if not isinstance(code_item, dict):
+                            errors.append(ValidationError(
+                                f"Facet item in group '{group_name}' must be a dictionary"
+                            ))
+                            continue
+
+                        code = code_item.get("code")
+                        if "code" not in code_item:
+                            errors.append(ValidationError(
+                                f"Facet item in group '{group_name}' missing 'code'"
+                            ))
+                        elif not is_name(code):
+                            errors.append(ValidationError(
+                                f"Facet code in group '{group_name}' must be a non-empty string"
+                            ))
+                        else:
+                            if code in facet_definition_codes:
+                                warnings.append(ValidationWarning(
+                                    f"Duplicate facet code: '{code}' (group '{group_name}')"
+                                ))
+                            facet_definition_codes.add(code)
+
+                        if "description" not in code_item:
+                            warnings.append(ValidationWarning(
+                                f"Facet '{code_item.get('code', 'unknown')}' missing 'description' (optional but recommended)"
+                            ))
+
+                        suppress = code_item.get("suppress_in_report", False)
+                        if not isinstance(suppress, bool):
+                            errors.append(ValidationError(
+                                f"Facet '{code_item.get('code', 'unknown')}'.suppress_in_report must be a boolean"
+                            ))
+
+                        for key in unknown_keys(code_item, ALLOWED_FACET_ITEM_KEYS):
+                            errors.append(ValidationError(
+                                f"Facet '{code_item.get('code', 'unknown')}' has unknown key: '{key}'"
+                            ))
+
+                        if is_name(code):
+                            codes_dict[code] = {
+                                "description": code_item.get("description", ""),
+                                "suppress_in_report": suppress,
+                            }
+
+                for key in unknown_keys(group_data, ALLOWED_FACET_GROUP_KEYS):
+                    errors.append(ValidationError(f"Facet group '{group_name}' has unknown key: '{key}'"))
+
+                facet_definitions[group_name] = {
+                    "description": group_data.get("description", ""),
+                    "codes": codes_dict,
+                }
+
+    # ------------------------------------------------------------------
+    # 6. Validate 'validation' (if present)
+    # ------------------------------------------------------------------
+    if "validation" in raw:
+        validation = raw["validation"]
+        if not isinstance(validation, dict):
+            errors.append(ValidationError("'validation' must be a dictionary."))
+        else:
+            if "compulsory_facet_prefixes" in validation:
+                prefixes = validation["compulsory_facet_prefixes"]
+                if not isinstance(prefixes, list):
+                    errors.append(ValidationError(
+                        "'validation.compulsory_facet_prefixes' must be a list"
+                    ))
+                else:
+                    for prefix in prefixes:
+                        if not is_name(prefix):
+                            errors.append(ValidationError(
+                                f"'validation.compulsory_facet_prefixes' contains invalid value: {prefix}"
+                            ))
+
+            for key in unknown_keys(validation, ALLOWED_VALIDATION_KEYS):
+                errors.append(ValidationError(f"'validation' has unknown key: '{key}'"))
+
+    # ------------------------------------------------------------------
+    # 7. Validate 'statement_handling' (if present)
+    # ------------------------------------------------------------------
+    if "statement_handling" in raw:
+        handling = raw["statement_handling"]
+        if not isinstance(handling, list):
+            errors.append(ValidationError("'statement_handling' must be a list."))
+        else:
+            base_dir = os.path.dirname(filename)
+            for idx, item in enumerate(handling, start=1):
+                where = f"'statement_handling' entry #{idx}"
+                if not isinstance(item, dict):
+                    errors.append(ValidationError(f"{where} must be a dictionary."))
+                    continue
+
+                for key in unknown_keys(item, ALLOWED_STATEMENT_HANDLING_KEYS):
+                    errors.append(ValidationError(f"{where} has unknown key: '{key}'"))
+
+                for key in ("type", "rules_file"):
+                    if key not in item:
+                        errors.append(ValidationError(f"{where} missing '{key}'"))
+                    elif not is_name(item[key]):
+                        errors.append(ValidationError(f"{where} '{key}' must be a non-empty string"))
+
+                stmt_type = item.get("type")
+                rules_file = item.get("rules_file")
+                if is_name(stmt_type) and is_name(rules_file):
+                    if stmt_type in statement_handling:
+                        errors.append(ValidationError(
+                            f"Duplicate statement type in 'statement_handling': '{stmt_type}'"
+                        ))
+                    statement_handling[stmt_type] = os.path.join(base_dir, rules_file)
+
+    # ------------------------------------------------------------------
+    # 8. Validate 'rules'
+    # ------------------------------------------------------------------
+    if "rules" in raw:
+        if not isinstance(raw["rules"], list):
+            errors.append(ValidationError("'rules' must be a list."))
+        else:
+            # Rules in the control file itself are checked but not used:
+            # the analyser takes each statement's rules from its rules file
+            context = RuleContext(
+                category_ids=category_ids,
+                facet_codes=facet_definition_codes,
+                people_ids=people_ids,
+            )
+            compile_rule_list(raw["rules"], errors, context)
+
+    # ------------------------------------------------------------------
+    # 9. Cross-reference: categories.default_facets must exist
+    # ------------------------------------------------------------------
+    if "facets" in raw:
+        for cat_id, category in categories.items():
+            if not isinstance(category.default_facets, list):
+                continue
+            for facet in category.default_facets:
+                if is_name(facet) and facet not in facet_definition_codes:
+                    errors.append(ValidationError(
+                        f"Category '{cat_id}'.default_facets references unknown facet: '{facet}'"
+                    ))
+
+    if not isinstance(defaults, dict):
+        defaults = {}
+
+    return ControlFile(
+        people=people,
+        categories=categories,
+        default_category=defaults.get("category"),
+        default_ownership=defaults.get("ownership", {}),
+        facet_definitions=facet_definitions,
+        statement_handling=statement_handling,
+    )
+
+
+# ----------------------------------------------------------------------
+# Shadowed rules
+#
+# A rule with no expect or when constraints takes every transaction its
+# match conditions accept. A later rule (in priority order) all of whose
+# conditions only accept descriptions that such a rule already takes can
+# never be chosen.
+# ----------------------------------------------------------------------
+
+def is_unconstrained(rule):
+    """True if a rule's match conditions are all that decide whether it matches."""
+    return rule.transaction_types is None and rule.direction is None and rule.when is None
+
+def find_shadowed_rules(rules):
+    """
+    Return [(rule, [(condition, shadowing rule, its condition), ...]), ...]
+    for every rule in rules (priority order) that can never be chosen
+    because each of its match conditions is covered by an earlier
+    unconstrained rule: a prefix that is a prefix of the condition's value,
+    an identical description, or a contains value found within the
+    condition's value. Regex conditions are never taken as covered.
+    """
+    prefix_trie = {}      # char -> node; node[None] = (rule, condition)
+    descriptions = {}     # description -> (rule, condition)
+    contains = {}         # contains value -> (rule, condition)
+    shadowed = []
+
+    for rule in rules:
+        covered = []
+        for cond in rule.conditions:
+            cover = None
+            if cond.type == "description":
+                cover = descriptions.get(cond.value)
+            if cond.type in ("description", "prefix") and cover is None:
+                node = prefix_trie
+                for char in cond.value:
+                    node = node.get(char)
+                    if node is None:
+                        break
+                    if None in node:
+                        cover = node[None]
+                        break
+            if cond.type in ("description", "prefix", "contains") and cover is None:
+                cover = next(
+                    (found for value, found in contains.items() if value in cond.value), None
+                )
+            if cover is None:
+                break
+            covered.append((cond, *cover))
+        else:
+            if covered:
+                shadowed.append((rule, covered))
+
+        if is_unconstrained(rule):
+            for cond in rule.conditions:
+                if cond.type == "description":
+                    descriptions.setdefault(cond.value, (rule, cond))
+                elif cond.type == "prefix":
+                    node = prefix_trie
+                    for char in cond.value:
+                        node = node.setdefault(char, {})
+                    node.setdefault(None, (rule, cond))
+                elif cond.type == "contains":
+                    contains.setdefault(cond.value, (rule, cond))
+
+    return shadowed
+
+
+# ----------------------------------------------------------------------
+# Rules file
+# ----------------------------------------------------------------------
+
+def compile_rules_file(raw, errors, context=None):
+    """
+    Validate a parsed rules file and compile its rules.
+
+    Args:
+        raw: The parsed YAML document.
+        errors (list): List to append ValidationError objects.
+        context (RuleContext): What the rules may refer to (None: unchecked).
+
+    Returns:
+        list of Rule sorted by priority, or None if the file has errors.
+    """
+    if not isinstance(raw, dict):
+        errors.append(ValidationError("Rules file must be a mapping with a 'rules' list."))
+        return None
+
+    for key in unknown_keys(raw, ALLOWED_RULES_FILE_KEYS):
+        errors.append(ValidationError(f"Unknown top-level key: '{key}'"))
+
+    rules_data = raw.get("rules", [])
+    if not isinstance(rules_data, list):
+        errors.append(ValidationError("'rules' must be a list."))
+        return None
+
+    rules = compile_rule_list(rules_data, errors, context or RuleContext())
+    if errors:
+        return None
+    return rules
+
+
+# ----------------------------------------------------------------------
+# Loading files
+# ----------------------------------------------------------------------
+
+_source_digest = None
+
+def compiler_key():
+    """
+    Return what compiled objects depend on besides their file: this
+    module's code and the "when" condition types registered.
+    """
+    global _source_digest
+    if _source_digest is None:
+        import hashlib
+
+        with open(__file__, "rb") as f:
+            _source_digest = hashlib.sha256(f.read()).hexdigest()
+    return f"{_source_digest}:{','.join(sorted(when_condition_types()))}"
+
+def context_key(context):
+    """Return a string identifying what a RuleContext lets rules refer to."""
+    if context is None:
+        return "unchecked"
+    return repr([
+        None if ids is None else sorted(ids)
+        for ids in (context.category_ids, context.facet_codes, context.people_ids)
+    ])
+
+def read_compiled(filename, key, compile):
+    """
+    Read and compile a YAML file through the config cache (see
+    load_compiled). compile(raw) returns (compiled object, errors,
+    warnings); only a result without errors is cached. Problems reading
+    or parsing the file, or an empty file, are reported as ValidationErrors.
+
+    Returns:
+        tuple: (compiled object or None, list of ValidationError, list of ValidationWarning)
+    """
+    def compile_raw(raw):
+        if raw is None:
+            return (None, [ValidationError("File is empty.")], []), False
+        result = compile(raw)
+        return result, not result[1]
+
+    try:
+        return load_compiled(filename, f"{compiler_key()}:{key}", compile_raw)
+    except FileNotFoundError:
+        return None, [ValidationError(f"File not found: {filename}")], []
+    except OSError as e:
+        return None, [ValidationError(f"Cannot read file: {e}")], []
+    except Exception as e:
+        if not is_yaml_error(e):
+            raise
+        return None, [ValidationError(f"YAML syntax error: {e}")], []
+
+def load_control(filename):
+    """
+    Read, validate and compile a control file. If there are errors the
+    ControlFile is partial (see compile_control) or None.
+
+    Returns:
+        tuple: (ControlFile or None, list of ValidationError, list of ValidationWarning)
+    """
+    def compile(raw):
+        errors = []
+        warnings = []
+        control = compile_control(raw, filename, errors, warnings)
+        return control, errors, warnings
+
+    # Rules file paths in the ControlFile are relative to filename
+    return read_compiled(filename, f"control:{filename}", compile)
+
+def load_rules(filename, context=None):
+    """
+    Read, validate and compile a rules file. With context (a RuleContext),
+    references to categories, facets and people are checked against it.
+
+    Returns:
+        tuple: (list of Rule or None, list of ValidationError, list of ValidationWarning)
+    """
+    def compile(raw):
+        errors = []
+        return compile_rules_file(raw, errors, context), errors, []
+
+    return read_compiled(filename, f"rules:{context_key(context)}", compile)
+
+def read_control_file(filename):
+    """Return the compiled control file; raise ConfigError if it has errors."""
+    control, errors, _ = load_control(filename)
+    if errors:
+        raise ConfigError("control file", filename, errors)
+    return control
+
+def read_rules_file(filename, control=None):
+    """Return the compiled rules of a rules file; raise ConfigError if it has errors."""
+    context = rule_context(control) if control is not None else None
+    rules, errors, _ = load_rules(filename, context)
+    if errors:
+        raise ConfigError("rules file", filename, errors)
+    return rules
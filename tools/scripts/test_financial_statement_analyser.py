@@ -0,0 +1,734 @@
+#!/usr/bin/env python3
+"""
+test_financial_statement_analyser.py
+
+Tests for financial-statement-analyser.py, run from this directory with:
+
+    python3 -m unittest test_financial_statement_analyser
+
+Statements are generated (seeded, so every run sees the same ones) as
+Transaction lists and analysed against a small control file and rules
+file written to a temporary directory.
+"""
+
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+from dataclasses import replace
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+import financial_statement_rules
+
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+def load_analyser():
+    """Import financial-statement-analyser.py (its file name is not a module name)."""
+    spec = importlib.util.spec_from_file_location(
+        "financial_statement_analyser",
+        os.path.join(SCRIPT_DIR, "financial-statement-analyser.py"),
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+fsa = load_analyser()
+
+
+CONTROL_FILE = """\
+defaults:
+  category: uncategorised
+  ownership: {ARC: 50, BOB: 50}
+people:
+  ARC: {full_name: A R C}
+  BOB: {full_name: B O B}
+  CAT: {full_name: C A T}
+categories:
+  uncategorised: {description: Unknown, default_facets: [IHT_UNKNOWN]}
+  food: {description: Food, default_facets: [IHT_EXP]}
+  utilities: {description: Utilities, default_facets: [IHT_EXP]}
+  income: {description: Income, default_facets: [IHT_INC]}
+  gifts: {description: Gifts, default_facets: [IHT_GIFT]}
+  transfers: {description: Transfers}
+facets:
+  IHT:
+    description: IHT403
+    codes:
+      - {code: IHT_EXP, description: Expenditure}
+      - {code: IHT_INC, description: Income}
+      - {code: IHT_GIFT, description: Gifts}
+      - {code: IHT_UNKNOWN, description: Unknown}
+      - {code: IHT_XFER, description: Transfers}
+statement_handling:
+  - {type: bank-lloyds, rules_file: rules.yaml}
+"""
+
+# Ownership splits of 33/33/34 and 1/99 leave owners with fractions of
+# a penny on odd amounts, so the splits round unevenly in the reports
+RULES_FILE = """\
+rules:
+  - id: tesco
+    priority: 10
+    match: {prefix: TESCO}
+    expect: {direction: debit}
+    classify: {category: food}
+    ownership: {ARC: 33, BOB: 33, CAT: 34}
+  - id: sainsburys
+    priority: 10
+    match: SAINSBURYS S/MKT
+    classify: {category: food}
+    ownership: {ARC: 100}
+  - id: bills
+    priority: 5
+    match: [{description: EDF ENERGY}, {prefix: COUNCIL}]
+    expect: {transaction_types: [DD]}
+    classify: {category: utilities}
+    ownership: {ARC: 1, BOB: 99}
+  - id: salary-band
+    priority: 20
+    match: {prefix: SALARY}
+    when:
+      - {amount_range: [100, 300]}
+      - {date_range: ["2024-01-01", "2024-03-01"]}
+    classify: {category: income, facets: [IHT_INC, IHT_EXP]}
+    ownership: {ARC: 33, BOB: 67}
+  - id: salary
+    priority: 15
+    match: {prefix: SALARY}
+    classify: {category: income}
+  - id: amazon-2023
+    priority: 8
+    match: {contains: AMAZON}
+    when:
+      - {tax_year: "2023-2024"}
+    classify: {category: gifts}
+    ownership: {ARC: 33, BOB: 33, CAT: 34}
+  - id: gift
+    priority: 6
+    match: {description: GIFT TO BOB}
+    expect: {transaction_types: [FPO], direction: debit}
+    classify: {category: gifts}
+  - id: transfer
+    priority: 1
+    match: {prefix: TFR}
+    classify: {category: transfers, facets: [IHT_XFER]}
+"""
+
+# Adds contains and regex matches, and a "when" condition type with no
+# vectorised form, which the vectorised engine evaluates row by row
+VECTORISED_RULES_FILE = RULES_FILE + """\
+  - id: amazon-weekend
+    priority: 9
+    match: {regex: '^(WWW\\.)?AMAZON'}
+    when:
+      - {weekday: [5, 6]}
+    classify: {category: food}
+    ownership: {ARC: 1, BOB: 99}
+  - id: shops
+    priority: 4
+    match: [{contains: SHOP}, {regex: 'PEN[SC]ION$'}]
+    when:
+      - {weekday: [0, 2, 4], amount_range: [0, 100]}
+      - {line_numbers: [5, 50, 250]}
+    classify: {category: income}
+    ownership: {ARC: 33, BOB: 33, CAT: 34}
+"""
+
+# One rule per bucketed condition type, all on the same descriptions, so
+# which rule wins depends only on where a transaction falls relative to
+# the boundaries (see BOUNDARY_AMOUNTS and friends)
+BOUNDARY_RULES_FILE = """\
+rules:
+  - id: amount-and-date
+    priority: 60
+    match: {prefix: SHOP}
+    when:
+      - {amount_range: [100, 300], date_range: ["2024-01-01", "2024-03-01"]}
+    classify: {category: gifts}
+  - id: amount-exact
+    priority: 50
+    match: {prefix: SHOP}
+    when:
+      - {amount_exact: 5.5}
+    classify: {category: income}
+  - id: line-numbers
+    priority: 40
+    match: [{prefix: SHOP}, {contains: MARKET}]
+    when:
+      - {line_numbers: [5, 50, 250]}
+    classify: {category: transfers}
+  - id: amount-range
+    priority: 30
+    match: {prefix: SHOP}
+    when:
+      - {amount_range: [100, 300]}
+    classify: {category: utilities}
+  - id: tax-year
+    priority: 20
+    match: {prefix: SHOP}
+    when:
+      - {tax_year: "2023-2024"}
+    classify: {category: food}
+  - id: date-range
+    priority: 10
+    match: {contains: MARKET}
+    when:
+      - {date_range: ["2024-01-01", "2024-03-01"]}
+    classify: {category: gifts}
+"""
+
+BOUNDARY_AMOUNTS = [Decimal("5.5"), Decimal("100"), Decimal("300")]
+BOUNDARY_DATES = [datetime(2023, 4, 6), datetime(2024, 4, 5), datetime(2024, 1, 1), datetime(2024, 3, 1)]
+BOUNDARY_LINES = [5, 50, 250]
+
+def around(values, step):
+    """Return each value, and the values one step either side of it."""
+    return [around for value in values for around in (value - step, value, value + step)]
+
+def boundary_transactions():
+    """Return transactions on and either side of every boundary in BOUNDARY_RULES_FILE."""
+    transactions = []
+    for amount in around(BOUNDARY_AMOUNTS, Decimal("0.01")):
+        for date in around(BOUNDARY_DATES, timedelta(days=1)):
+            for line_number in around(BOUNDARY_LINES, 1):
+                for description in ("SHOP 1", "MARKET 2", "SHOP MARKET"):
+                    for debit, credit in ((amount, Decimal("0")), (Decimal("0"), amount)):
+                        transactions.append(fsa.Transaction(
+                            line_number=line_number,
+                            date=date,
+                            transaction_type="DEB",
+                            description=description,
+                            debit=debit,
+                            credit=credit,
+                            balance=Decimal("0"),
+                            sort_code="'30-00-00",
+                            account_number="12345678",
+                        ))
+    return transactions
+
+def check_weekday(tx, value):
+    """value is a list of weekdays (Monday is 0)."""
+    return tx.date.weekday() in value
+
+DESCRIPTIONS = [
+    "TESCO STORES 2041", "TESCO EXPRESS", "SAINSBURYS S/MKT", "EDF ENERGY",
+    "COUNCIL TAX", "SALARY ACME LTD", "AMAZON MKTPLACE", "WWW.AMAZON.CO.UK",
+    "GIFT TO BOB", "TFR TO SAVINGS", "CORNER SHOP", "HMRC PENSION",
+]
+
+TRANSACTION_TYPES = ["DEB", "DD", "FPO", "FPI", "BGC", "CPT", "SO"]
+
+def generate_statement(seed, count=500, amounts=None):
+    """
+    Return count Transactions in date order from 2023-04-01, with
+    amounts of 1p to 500.00 (or drawn from amounts, if given).
+    """
+    rng = random.Random(seed)
+    date = datetime(2023, 4, 1)
+    balance = Decimal("2500.00")
+    transactions = []
+
+    for line_number in range(2, count + 2):
+        if amounts is None:
+            amount = Decimal(rng.randint(1, 50000)).scaleb(-2)
+        else:
+            amount = rng.choice(amounts)
+        if rng.random() < 0.3:
+            debit, credit = Decimal("0"), amount
+        else:
+            debit, credit = amount, Decimal("0")
+        balance += credit - debit
+
+        transactions.append(fsa.Transaction(
+            line_number=line_number,
+            date=date,
+            transaction_type=rng.choice(TRANSACTION_TYPES),
+            description=rng.choice(DESCRIPTIONS),
+            debit=debit,
+            credit=credit,
+            balance=balance,
+            sort_code="'30-00-00",
+            account_number="12345678",
+        ))
+        date += timedelta(days=rng.randint(0, 2))
+
+    return transactions
+
+
+class AnalyserTestCase(unittest.TestCase):
+    """Writes the control and rules files and loads them once per class."""
+
+    rules_file = RULES_FILE
+
+    @classmethod
+    def setUpClass(cls):
+        fsa.set_cache_dir(None)
+        cls.directory = tempfile.mkdtemp()
+        for filename, content in (("control.yaml", CONTROL_FILE), ("rules.yaml", cls.rules_file)):
+            with open(os.path.join(cls.directory, filename), "w") as f:
+                f.write(content)
+        cls.control = fsa.load_control_file(os.path.join(cls.directory, "control.yaml"))
+        cls.rules = fsa.get_rules_for_type("bank-lloyds", cls.control)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def assertSameAnalysis(self, expected, actual):
+        """Check two AnalysisResults classify every row alike and have equal totals."""
+        self.assertEqual(len(expected.table), len(actual.table))
+        for row in range(len(expected.table)):
+            self.assertEqual(expected.category(row), actual.category(row))
+            self.assertEqual(expected.rule_id(row), actual.rule_id(row))
+            self.assertEqual(expected.facets(row), actual.facets(row))
+            self.assertEqual(expected.ownership(row), actual.ownership(row))
+        self.assertEqual(expected.warnings, actual.warnings)
+        self.assertEqual(
+            {cat_id: summary.settled() for cat_id, summary in expected.summaries.items()},
+            {cat_id: summary.settled() for cat_id, summary in actual.summaries.items()},
+        )
+
+    def report(self, result, fixed_point, engine="python"):
+        """Return the printed analysis and IHT facet reports, with all owners."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            fsa.print_analysis_report(result, self.control, True)
+            fsa.print_facet_summary(
+                result, "IHT", self.control.facet_definitions, self.control, True, engine, fixed_point,
+            )
+        return output.getvalue()
+
+
+class FixedPointTest(AnalyserTestCase):
+    """--fixed-point must report exactly what the Decimal path reports."""
+
+    def analyse_both(self, transactions):
+        decimal = fsa.analyse_transactions(transactions, self.control, self.rules)
+        fixed = fsa.analyse_transactions(transactions, self.control, self.rules, fixed_point=True)
+        return decimal, fixed
+
+    def test_category_and_owner_totals(self):
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                decimal, fixed = self.analyse_both(generate_statement(seed))
+                self.assertSameAnalysis(decimal, fixed)
+
+    def test_facet_totals(self):
+        decimal, fixed = self.analyse_both(generate_statement(10))
+        facet_definitions = self.control.facet_definitions
+        self.assertEqual(
+            fsa.aggregate_facet_totals(decimal, facet_definitions),
+            fsa.aggregate_facet_totals(fixed, facet_definitions, fixed_point=True),
+        )
+
+    def test_monthly_totals(self):
+        transactions = generate_statement(20)
+        expected = fsa.calculate_monthly_totals(transactions)
+        self.assertEqual(fsa.calculate_monthly_totals(transactions, fixed_point=True), expected)
+
+        decimal, fixed = self.analyse_both(transactions)
+        self.assertEqual(fsa.calculate_table_monthly_totals(decimal.table), expected)
+        self.assertEqual(fsa.calculate_table_monthly_totals(fixed.table), expected)
+
+    def test_uneven_splits_report_alike(self):
+        # Odd pence only, so every 33/33/34, 1/99 and 33/67 split has fractional pence
+        amounts = [Decimal(pence).scaleb(-2) for pence in (1, 3, 7, 101, 333, 1001, 99999)]
+        decimal, fixed = self.analyse_both(generate_statement(30, amounts=amounts))
+        self.assertSameAnalysis(decimal, fixed)
+        self.assertEqual(self.report(decimal, False), self.report(fixed, True))
+
+    def test_fractional_percentage_needs_decimal_path(self):
+        control = replace(self.control, default_ownership={"ARC": 60.5, "BOB": 39.5})
+        transactions = generate_statement(40, count=50)
+
+        result = fsa.analyse_transactions(transactions, control, [])
+        summary = result.summaries["uncategorised"]
+        self.assertEqual(summary.owner_debits["ARC"], summary.total_debit * Decimal("0.605"))
+        facet_totals = fsa.aggregate_facet_totals(result, control.facet_definitions)
+        self.assertEqual(facet_totals["IHT_UNKNOWN"]["owner_credits"]["BOB"], summary.total_credit * Decimal("0.395"))
+
+        with self.assertRaisesRegex(ValueError, "whole number"):
+            fsa.analyse_transactions(transactions, control, [], fixed_point=True)
+
+    def test_sub_penny_amounts(self):
+        transactions = generate_statement(50, count=50)
+        transactions[10] = replace(transactions[10], debit=Decimal("12.345"), credit=Decimal("0"))
+        line_number = transactions[10].line_number
+
+        result = fsa.analyse_transactions(transactions, self.control, self.rules)
+        self.assertEqual(result.table.transaction(10), transactions[10])
+        self.assertEqual(
+            sum(summary.total_debit for summary in result.summaries.values()),
+            sum(tx.debit for tx in transactions),
+        )
+        self.assertEqual(fsa.calculate_table_monthly_totals(result.table), fsa.calculate_monthly_totals(transactions))
+
+        with self.assertRaisesRegex(ValueError, f"line {line_number}: amount 12.345"):
+            fsa.analyse_transactions(transactions, self.control, self.rules, fixed_point=True)
+
+
+
+@unittest.skipUnless(HAVE_NUMPY, "the vectorised engine needs NumPy")
+class VectorisedEngineTest(AnalyserTestCase):
+    """--engine vectorised must produce exactly what the per-row engine produces."""
+
+    rules_file = VECTORISED_RULES_FILE
+
+    @classmethod
+    def setUpClass(cls):
+        financial_statement_rules.register_checker("weekday")(check_weekday)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        del financial_statement_rules.CONDITION_CHECKERS["weekday"]
+
+    def assertSameResult(self, transactions, fixed_point, control=None):
+        """Analyse transactions with both engines and compare everything they produce."""
+        control = control or self.control
+        expected = fsa.analyse_transactions(transactions, control, self.rules, fixed_point)
+        actual = fsa.analyse_transactions_vectorised(transactions, control, self.rules, fixed_point)
+
+        self.assertSameAnalysis(expected, actual)
+        for name in ("category_column", "rule_column", "facet_column", "ownership_column"):
+            self.assertEqual(getattr(expected, name), getattr(actual, name), name)
+        for name in ("categories", "rule_ids", "facet_sets", "ownerships"):
+            self.assertEqual(getattr(expected, name).values, getattr(actual, name).values, name)
+        self.assertEqual(expected.summaries, actual.summaries)
+
+        self.assertEqual(
+            fsa.aggregate_facet_totals(expected, control.facet_definitions, fixed_point),
+            fsa.aggregate_facet_totals_vectorised(actual, control.facet_definitions, fixed_point),
+        )
+        self.assertEqual(
+            fsa.calculate_table_monthly_totals(expected.table),
+            fsa.calculate_table_monthly_totals_vectorised(actual.table),
+        )
+
+    def test_matches_python_engine(self):
+        self.assertNotIn("weekday", fsa.VECTOR_CONDITIONS)
+        for fixed_point in (False, True):
+            for seed in range(3):
+                with self.subTest(fixed_point=fixed_point, seed=seed):
+                    self.assertSameResult(generate_statement(100 + seed), fixed_point)
+
+    def test_rules_used(self):
+        transactions = generate_statement(100)
+        result = fsa.analyse_transactions_vectorised(transactions, self.control, self.rules)
+        used = {result.rule_id(row) for row in range(len(result.table))}
+        self.assertLessEqual({"amazon-weekend", "shops", "salary-band", "amazon-2023", "tesco"}, used)
+
+    def test_uneven_splits(self):
+        amounts = [Decimal(pence).scaleb(-2) for pence in (1, 3, 7, 101, 333, 1001, 99999)]
+        for fixed_point in (False, True):
+            with self.subTest(fixed_point=fixed_point):
+                self.assertSameResult(generate_statement(110, amounts=amounts), fixed_point)
+
+    def test_fallbacks(self):
+        # Sub-penny amounts and fractional percentages use the per-row path
+        transactions = generate_statement(120, count=100)
+        transactions[5] = replace(transactions[5], debit=Decimal("0"), credit=Decimal("12.345"))
+        self.assertSameResult(transactions, False)
+
+        control = replace(self.control, default_ownership={"ARC": 60.5, "BOB": 39.5})
+        self.assertSameResult(generate_statement(130, count=100), False, control)
+
+    def test_unknown_category(self):
+        # Rules compiled without their control file are not checked against its categories
+        errors = []
+        rules = financial_statement_rules.compile_rule_list(
+            [{"id": "misfiled", "priority": 1, "match": {"prefix": "TESCO"}, "classify": {"category": "groceries"}}],
+            errors,
+            financial_statement_rules.RuleContext(),
+        )
+        self.assertEqual(errors, [])
+        transactions = generate_statement(140, count=50)
+        for analyse in (fsa.analyse_transactions, fsa.analyse_transactions_vectorised):
+            with self.subTest(engine=analyse.__name__):
+                with self.assertRaisesRegex(ValueError, "rule 'misfiled' classifies into unknown category 'groceries'"):
+                    analyse(transactions, self.control, rules)
+
+
+
+def edit(text, old, new):
+    """Return text with its one occurrence of old replaced by new."""
+    assert text.count(old) == 1, old
+    return text.replace(old, new)
+
+# Rules file edits, each of which changes the winner of some generated rows
+RULE_CHANGES = {
+    "category": edit(RULES_FILE, "{prefix: TESCO}\n    expect: {direction: debit}\n    classify: {category: food}",
+                     "{prefix: TESCO}\n    expect: {direction: debit}\n    classify: {category: gifts}"),
+    "ownership": edit(RULES_FILE, "ownership: {ARC: 1, BOB: 99}", "ownership: {CAT: 100}"),
+    "facets": edit(RULES_FILE, "facets: [IHT_XFER]", "facets: [IHT_GIFT]"),
+    "when": edit(RULES_FILE, "{amount_range: [100, 300]}", "{amount_range: [50, 300]}"),
+    "priority": edit(RULES_FILE, "priority: 15", "priority: 25"),
+    "removed": RULES_FILE.split("  - id: transfer")[0],
+    "added": RULES_FILE + """\
+  - id: all-amazon
+    priority: 9
+    match: {contains: AMAZON}
+    classify: {category: food}
+""",
+}
+
+# Control file edits to the settings a match is resolved with
+CONTROL_CHANGES = {
+    "default ownership": edit(CONTROL_FILE, "ownership: {ARC: 50, BOB: 50}", "ownership: {ARC: 25, BOB: 75}"),
+    "default facets": edit(CONTROL_FILE, "{description: Food, default_facets: [IHT_EXP]}",
+                           "{description: Food, default_facets: [IHT_GIFT]}"),
+    "default category": edit(CONTROL_FILE, "category: uncategorised", "category: gifts"),
+}
+
+
+class IncrementalAnalysisTest(AnalyserTestCase):
+    """--incremental must give the same analysis as a full run, however the inputs change."""
+
+    def setUp(self):
+        self.work = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.work)
+        self.control_path = self.write("control.yaml", CONTROL_FILE)
+        self.rules_path = self.write("rules.yaml", RULES_FILE)
+        self.statement = self.write("statement.csv", "statement 1\n")
+        self.store_path = os.path.join(self.work, "statement.analysis-store.sqlite")
+        self.transactions = generate_statement(400)
+
+    def write(self, filename, content):
+        path = os.path.join(self.work, filename)
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def analyse(self, fixed_point=False):
+        """
+        Run analyse_incrementally against the files as they are now, check
+        it matches a full analysis and return the number of rows matched
+        again (None if nothing was reused).
+        """
+        control = fsa.load_control_file(self.control_path)
+        rules = fsa.compile_rules(fsa.read_rules_file(self.rules_path, control))
+        stats = fsa.AnalysisResults()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            store = fsa.AnalysisStore(self.store_path, stats)
+            actual = fsa.analyse_incrementally(
+                store, self.statement, self.rules_path, self.transactions, control, rules, True, stats,
+                fixed_point=fixed_point,
+            )
+            store.close()
+        self.assertEqual(stats.warning_count, 0)
+
+        expected = fsa.analyse_transactions(self.transactions, control, rules, fixed_point)
+        self.assertSameAnalysis(expected, actual)
+        self.control = control
+        self.assertEqual(self.report(expected, fixed_point), self.report(actual, fixed_point))
+
+        match = re.search(r"Reused stored analysis .* \((\d+) of \d+ transactions", output.getvalue())
+        return None if match is None else int(match.group(1))
+
+    def test_matches_full_run(self):
+        for fixed_point in (False, True):
+            with self.subTest(fixed_point=fixed_point):
+                self.assertIsNone(self.analyse(fixed_point))
+                self.assertEqual(self.analyse(fixed_point), 0)
+                os.remove(self.store_path)
+
+    def test_rule_changed(self):
+        for name, rules_file in RULE_CHANGES.items():
+            with self.subTest(change=name):
+                self.write("rules.yaml", RULES_FILE)
+                self.assertIsNone(self.analyse())
+
+                self.write("rules.yaml", rules_file)
+                self.assertGreater(self.analyse(), 0)
+                self.assertEqual(self.analyse(), 0)
+
+                self.write("rules.yaml", RULES_FILE)
+                self.assertGreater(self.analyse(), 0)
+                os.remove(self.store_path)
+
+    def test_control_file_changed(self):
+        for name, control_file in CONTROL_CHANGES.items():
+            with self.subTest(change=name):
+                self.write("control.yaml", CONTROL_FILE)
+                self.assertIsNone(self.analyse())
+
+                self.write("control.yaml", control_file)
+                self.assertIsNone(self.analyse())
+                self.assertEqual(self.analyse(), 0)
+
+        # Settings that cannot change the analysis do not invalidate it
+        self.write("control.yaml", CONTROL_FILE)
+        self.assertIsNone(self.analyse())
+        self.write("control.yaml", edit(CONTROL_FILE, "description: IHT403", "description: IHT 403"))
+        self.assertEqual(self.analyse(), 0)
+
+    def test_fixed_point_changed(self):
+        self.assertIsNone(self.analyse(fixed_point=False))
+        self.assertIsNone(self.analyse(fixed_point=True))
+        self.assertIsNone(self.analyse(fixed_point=False))
+
+    def test_statement_changed(self):
+        self.assertIsNone(self.analyse())
+        mtime_ns = os.stat(self.statement).st_mtime_ns
+
+        # Touched but unchanged: still reused
+        os.utime(self.statement, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+        self.assertEqual(self.analyse(), 0)
+
+        # New contents of the same size
+        self.write("statement.csv", "statement 2\n")
+        os.utime(self.statement, ns=(mtime_ns + 2 * 10**9, mtime_ns + 2 * 10**9))
+        self.transactions = generate_statement(401)
+        self.assertIsNone(self.analyse())
+        self.assertEqual(self.analyse(), 0)
+
+
+class ClassificationCacheTest(AnalyserTestCase):
+    """The classification cache must never change which rule a transaction gets."""
+
+    rules_file = BOUNDARY_RULES_FILE
+
+    def setUp(self):
+        self.addCleanup(fsa.set_classification_cache_size, fsa.DEFAULT_CLASSIFICATION_CACHE_SIZE)
+
+    def fresh_cache(self, size):
+        """Replace the classification cache with an empty one, as --classification-cache N does."""
+        fsa.set_classification_cache_size(0)
+        fsa.set_classification_cache_size(size)
+        return fsa._classification_cache
+
+    def assertCachedMatchesUncached(self, compiled, transactions):
+        for tx in transactions:
+            self.assertIs(compiled.first_match(tx), compiled.find_first_match(tx), tx)
+
+    def test_boundaries(self):
+        cache = self.fresh_cache(fsa.DEFAULT_CLASSIFICATION_CACHE_SIZE)
+        compiled = fsa.compile_rules(self.rules)
+        self.assertIsNotNone(compiled.bucket_points)
+
+        transactions = boundary_transactions()
+        winners = {getattr(compiled.find_first_match(tx), "id", None) for tx in transactions}
+        self.assertEqual({None} | {rule.id for rule in compiled.rules}, winners)
+
+        # Twice, in different orders, so that most lookups are hits on
+        # entries another transaction put there
+        for seed in range(2):
+            random.Random(seed).shuffle(transactions)
+            self.assertCachedMatchesUncached(compiled, transactions)
+
+        hits, misses, evictions = cache.counts()
+        self.assertGreater(hits, misses)
+        self.assertEqual(evictions, 0)
+
+    def test_rule_sets_share_the_cache(self):
+        self.fresh_cache(fsa.DEFAULT_CLASSIFICATION_CACHE_SIZE)
+        first = fsa.compile_rules(self.rules)
+        second = fsa.compile_rules(self.rules.rules[::-1])
+        transactions = boundary_transactions()
+        self.assertCachedMatchesUncached(first, transactions)
+        self.assertCachedMatchesUncached(second, transactions)
+
+    def test_lru_eviction(self):
+        cache = self.fresh_cache(2)
+        compiled = fsa.compile_rules(self.rules)
+        a, b, c = (
+            replace(generate_statement(300, count=1)[0], description=description)
+            for description in ("SHOP A", "SHOP B", "SHOP C")
+        )
+
+        for tx in (a, b, a, c, b):
+            self.assertIs(compiled.first_match(tx), compiled.find_first_match(tx))
+
+        # a hits; c evicts b (least recently used), then b evicts a
+        self.assertEqual(cache.counts(), (1, 4, 2))
+        self.assertEqual(
+            list(cache.entries),
+            [compiled.classification_key(c), compiled.classification_key(b)],
+        )
+
+    def test_unbucketable_condition_not_cached(self):
+        financial_statement_rules.register_checker("weekday")(check_weekday)
+        self.addCleanup(financial_statement_rules.CONDITION_CHECKERS.pop, "weekday")
+        errors = []
+        rules = financial_statement_rules.compile_rule_list(
+            [{"id": "weekend", "priority": 1, "match": {"prefix": "SHOP"},
+              "when": [{"weekday": [5, 6]}], "classify": {"category": "food"}}],
+            errors,
+            financial_statement_rules.RuleContext(),
+        )
+        self.assertEqual(errors, [])
+
+        cache = self.fresh_cache(fsa.DEFAULT_CLASSIFICATION_CACHE_SIZE)
+        compiled = fsa.compile_rules(self.rules.rules + rules)
+        self.assertIsNone(compiled.bucket_points)
+        self.assertCachedMatchesUncached(compiled, boundary_transactions())
+        self.assertEqual(cache.counts(), (0, 0, 0))
+        self.assertEqual(len(cache.entries), 0)
+
+
+class StatementCacheTest(unittest.TestCase):
+    """A statement cache or analysis store that SQLite cannot use is skipped with one warning."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.statement = os.path.join(self.directory, "statement.csv")
+        with open(self.statement, "w") as f:
+            f.write("header\n")
+        self.transactions = generate_statement(200, count=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def open_cache(self, cache_class, filename):
+        stats = fsa.AnalysisResults()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            cache = cache_class(os.path.join(self.directory, filename), stats)
+            self.assertIsNone(cache.get_payload(self.statement))
+            cache.put_payload(self.statement, [])
+            self.assertIsNone(cache.get_payload(self.statement))
+            cache.close()
+        return cache, stats, output.getvalue()
+
+    def test_round_trip(self):
+        stats = fsa.AnalysisResults()
+        cache = fsa.StatementCache(os.path.join(self.directory, "cache.sqlite"), stats)
+        cache.put(self.statement, self.transactions)
+        self.assertEqual(cache.get(self.statement), self.transactions)
+        cache.close()
+        self.assertEqual(stats.warning_count, 0)
+
+    def test_not_a_database(self):
+        for cache_class in (fsa.StatementCache, fsa.AnalysisStore):
+            with self.subTest(cache_class=cache_class.__name__):
+                with open(os.path.join(self.directory, "garbage.sqlite"), "w") as f:
+                    f.write("not a database\n" * 100)
+                cache, stats, output = self.open_cache(cache_class, "garbage.sqlite")
+                self.assertFalse(cache.usable)
+                self.assertEqual(stats.warning_count, 1)
+                self.assertIn("not used: file is not a database", output)
+
+    def test_cannot_open(self):
+        # A directory where the SQLite file should be cannot be opened
+        os.mkdir(os.path.join(self.directory, "cache.sqlite"))
+        cache, stats, output = self.open_cache(fsa.StatementCache, "cache.sqlite")
+        self.assertFalse(cache.usable)
+        self.assertEqual(stats.warning_count, 1)
+        self.assertIn("unable to open database file", output)
+
+
+if __name__ == "__main__":
+    unittest.main()